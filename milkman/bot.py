@@ -2,19 +2,62 @@ import asyncio
 import logging
 import os
 import random
+import time
 from contextlib import asynccontextmanager
+from typing import Optional, Tuple
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
+from discord.ext.commands.hybrid import HybridAppCommand
 from dotenv import load_dotenv
 
 from .util.color_formatter import CustomFormatter
-from .constants import ERROR_COLOR
+from .constants import (
+    COMMAND_STATS_SLOT_SECONDS,
+    COMMAND_STATS_SLOTS,
+    ERROR_COLOR,
+    LOOP_MONITOR_HEARTBEAT_WARNING,
+    LOOP_MONITOR_INTERVAL,
+    LOOP_MONITOR_SLOW_CALLBACK,
+    MEMBER_RESOLVER_CAPACITY,
+    MEMBER_RESOLVER_NEGATIVE_TTL,
+    MEMBER_RESOLVER_TTL,
+    SCHEDULER_BATCH_WINDOW,
+    SCHEDULER_CONCURRENCY,
+    SCHEDULER_MAX_ATTEMPTS,
+    SCHEDULER_RETRY_DELAY,
+)
+from .util.action_scheduler import ActionScheduler
 from .util.database import DatabaseConfig
+from .util.loop_monitor import LoopMonitor
+from .util.member_resolver import MemberResolver
+from .util.metrics import CommandMetrics
+from .util.metrics_server import MetricsServer
 from .util.repositories import DatabaseService
 
 
+class SupervisorTree(app_commands.CommandTree):
+    """
+    The command tree of the bot, which times the app commands that are not hybrid commands. Hybrid
+    commands are timed by the invoke hooks and the command error handler of the bot however they are
+    invoked.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        command = interaction.command
+        if command is not None and not isinstance(command, HybridAppCommand) and "started_at" in interaction.extras:
+            self.client.command_metrics.record(
+                command.qualified_name, time.perf_counter() - interaction.extras["started_at"], failed=True
+            )
+        await super().on_error(interaction, error)
+
+
 class Supervisor(commands.Bot):
     def __init__(
         self,
@@ -23,12 +66,14 @@ class Supervisor(commands.Bot):
         data_path: str,
         logger: logging.Logger,
         db_config: DatabaseConfig,
+        metrics_address: Optional[Tuple[str, int]] = None,
         **kwargs,
     ):
         super().__init__(
             *args,
             command_prefix=commands.when_mentioned_or(bot_prefix),
             help_command=None,
+            tree_cls=SupervisorTree,
             **kwargs,
         )
 
@@ -36,6 +81,28 @@ class Supervisor(commands.Bot):
         self.data_path = data_path
         self.bot_prefix = bot_prefix
         self.db_config = db_config
+        self.member_resolver = MemberResolver(
+            ttl=MEMBER_RESOLVER_TTL,
+            negative_ttl=MEMBER_RESOLVER_NEGATIVE_TTL,
+            capacity=MEMBER_RESOLVER_CAPACITY,
+        )
+        self.action_scheduler = ActionScheduler(
+            self,
+            max_concurrency=SCHEDULER_CONCURRENCY,
+            retry_delay=SCHEDULER_RETRY_DELAY,
+            max_attempts=SCHEDULER_MAX_ATTEMPTS,
+            batch_window=SCHEDULER_BATCH_WINDOW,
+        )
+        self.loop_monitor = LoopMonitor(
+            self,
+            interval=LOOP_MONITOR_INTERVAL,
+            slow_callback=LOOP_MONITOR_SLOW_CALLBACK,
+            heartbeat_warning=LOOP_MONITOR_HEARTBEAT_WARNING,
+        )
+        self.command_metrics = CommandMetrics(COMMAND_STATS_SLOT_SECONDS, COMMAND_STATS_SLOTS)
+        self.metrics_server = MetricsServer(self, *metrics_address) if metrics_address else None
+        self.before_invoke(self.start_command_timer)
+        self.after_invoke(self.record_command)
     
     @asynccontextmanager
     async def get_db_service(self):
@@ -43,6 +110,21 @@ class Supervisor(commands.Bot):
         async with self.db_config.get_session() as session:
             yield DatabaseService(session)
 
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        """
+        Add a cog and let the other cogs know the loaded commands changed.
+        """
+        await super().add_cog(cog, **kwargs)
+        self.dispatch("cogs_changed")
+
+    async def remove_cog(self, name: str, /, **kwargs) -> commands.Cog | None:
+        """
+        Remove a cog and let the other cogs know the loaded commands changed.
+        """
+        cog = await super().remove_cog(name, **kwargs)
+        self.dispatch("cogs_changed")
+        return cog
+
     async def load_cogs(self) -> None:
         """
         Load the cogs by loading each file in the 'cogs/' directory.
@@ -99,10 +181,95 @@ class Supervisor(commands.Bot):
             raise RuntimeError("The bot has not been logged in yet.")
 
         self.logger.info(f"Logged in as {self.user.name}")
+        self.loop_monitor.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
         await self.db_config.create_tables()
         await self.load_cogs()
+        # The cogs register the scheduled action handlers when they load
+        await self.action_scheduler.load()
+        self.action_scheduler.start()
         self.update_status.start()
 
+    async def close(self) -> None:
+        """
+        Stop carrying out scheduled actions, stop the event loop monitor and the metrics server, and
+        close the bot. Pending scheduled actions stay in the database for the next start.
+        """
+        await self.action_scheduler.stop()
+        await self.loop_monitor.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await super().close()
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        """
+        Forget that the member was not in the guild.
+
+        Args:
+            member (discord.Member): The member who joined.
+        """
+        self.member_resolver.invalidate(member.guild.id, member.id)
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        """
+        Forget the member, who may not have been in the member cache.
+
+        Args:
+            payload (discord.RawMemberRemoveEvent): The raw event payload.
+        """
+        self.member_resolver.invalidate(payload.guild_id, payload.user.id)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """
+        Forget the members of a guild the bot left.
+
+        Args:
+            guild (discord.Guild): The guild the bot left.
+        """
+        self.member_resolver.invalidate_guild(guild.id)
+
+    async def start_command_timer(self, ctx: Context) -> None:
+        """
+        Note when a command starts, after its checks and argument conversion passed.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        ctx.started_at = time.perf_counter()
+
+    async def record_command(self, ctx: Context) -> None:
+        """
+        Record the wall time of a command and whether it failed. Runs as an after invoke hook, which
+        prefix commands call even if they raised, and from on_command_error for hybrid commands
+        invoked as slash commands, which skip the hook when they raise.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        started_at = getattr(ctx, "started_at", None)
+        if ctx.command is None or started_at is None:
+            return
+        # Cleared so that a command is not recorded by both the hook and the error handler
+        ctx.started_at = None
+        self.command_metrics.record(ctx.command.qualified_name, time.perf_counter() - started_at, ctx.command_failed)
+
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command: app_commands.Command | app_commands.ContextMenu
+    ) -> None:
+        """
+        Record the wall time of an app command that is not a hybrid command.
+
+        Args:
+            interaction (discord.Interaction): The interaction of the command.
+            command (app_commands.Command | app_commands.ContextMenu): The command.
+        """
+        if isinstance(command, HybridAppCommand) or "started_at" not in interaction.extras:
+            return
+        self.command_metrics.record(
+            command.qualified_name, time.perf_counter() - interaction.extras["started_at"], failed=False
+        )
+
     async def on_command_completion(self, context: Context) -> None:
         """
         The code in this event is executed every time a normal command has been *successfully* executed.
@@ -142,6 +309,9 @@ class Supervisor(commands.Bot):
             ctx (Context): The context of the command that failed.
             exception (Exception): The exception that was raised.
         """
+        if ctx.interaction is not None:
+            await self.record_command(ctx)
+
         if isinstance(exception, commands.CommandOnCooldown):
             minutes, seconds = divmod(exception.retry_after, 60)
             hours, minutes = divmod(minutes, 60)
@@ -228,6 +398,9 @@ async def main() -> None:
     intents = discord.Intents.default()
     intents.message_content = True
     intents.reactions = True
+    # Needed for member join and update events. It turns on the member cache of the whole bot, which
+    # is filled as members join or show up in events rather than up front, as guilds are not chunked
+    intents.members = True
 
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
@@ -276,12 +449,20 @@ async def main() -> None:
 
     db_config = DatabaseConfig(os.path.join(data_dir, "milkman.db"))
 
+    # The metrics endpoint is only served when a port is set
+    metrics_port = os.getenv("METRICS_PORT")
+    metrics_address = (os.getenv("METRICS_HOST", "127.0.0.1"), int(metrics_port)) if metrics_port else None
+
     async with Supervisor(
         data_path=data_dir,
         db_config=db_config,
         bot_prefix=bot_prefix,
+        metrics_address=metrics_address,
         logger=logger,
         intents=intents,
+        chunk_guilds_at_startup=False,
+        # The message log keeps its own compact buffer of the channels that are watched
+        max_messages=None,
     ) as bot:
         await bot.start(discord_token)
 
@@ -0,0 +1,211 @@
+"""
+This cog removes messages that break the word, regex and link rules of a server.
+
+Commands:
+    - automod_add: Add an automod rule.
+    - automod_remove: Remove an automod rule.
+    - automod_list: List the automod rules of the server.
+"""
+
+import asyncio
+import logging
+from typing import Literal
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from milkman.constants import (
+    AUTOMOD_COG_NAME,
+    AUTOMOD_MAX_RULES,
+    AUTOMOD_NOTICE_DELETE_AFTER,
+    ERROR_COLOR,
+    SUCCESS_COLOR,
+)
+from milkman.util import truncate_text
+from milkman.util.automod import Rule, RuleMatcher, validate_rule
+
+logger = logging.getLogger(__name__)
+
+
+class Automod(commands.Cog, name=AUTOMOD_COG_NAME):
+    """
+    This cog checks every message against the rules of its server with a compiled matcher.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.rules: dict[int, dict[int, Rule]] = {}
+        self.matchers: dict[int, RuleMatcher] = {}
+        self.versions: dict[int, int] = {}
+
+    async def cog_load(self) -> None:
+        """
+        Load the rules of every guild and compile their matchers.
+        """
+        async with self.bot.get_db_service() as db:
+            rules = await db.automod_rules.get_all_rules()
+
+        self.rules = {}
+        for rule in rules:
+            self.rules.setdefault(int(rule.guild_id), {})[rule.id] = Rule(rule.id, rule.kind, rule.pattern)
+        for guild_id in self.rules:
+            await self.rebuild(guild_id)
+        logger.info(f"Compiled {len(rules)} automod rules for {len(self.matchers)} guilds")
+
+    async def rebuild(self, guild_id: int) -> None:
+        """
+        Compile the matcher of a guild, only done when its rules change.
+
+        Compiling thousands of rules takes long enough to stall the gateway, so it runs in a thread
+        and the old matcher keeps checking messages until the new one is swapped in.
+
+        Args:
+            guild_id (int): The ID of the guild.
+        """
+        version = self.versions[guild_id] = self.versions.get(guild_id, 0) + 1
+        rules = self.rules.get(guild_id)
+        if not rules:
+            self.rules.pop(guild_id, None)
+            self.matchers.pop(guild_id, None)
+            return
+
+        matcher = await asyncio.to_thread(RuleMatcher, list(rules.values()))
+        # A later change of the rules may have finished compiling first
+        if self.versions[guild_id] == version:
+            self.matchers[guild_id] = matcher
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """
+        Delete the message if it breaks a rule of its server.
+
+        Args:
+            message (discord.Message): The message that was sent.
+        """
+        if message.guild is None or message.author.bot:
+            return
+
+        matcher = self.matchers.get(message.guild.id)
+        if matcher is None or not message.content:
+            return
+        if message.channel.permissions_for(message.author).manage_messages:
+            return
+
+        rule = matcher.match(message.content)
+        if rule is None:
+            return
+
+        try:
+            await message.delete()
+        except discord.HTTPException as e:
+            logger.error(f"Failed to delete message breaking automod rule {rule.id} in {message.guild}: {e}")
+            return
+
+        logger.info(f"Deleted message by {message.author} in {message.guild} breaking automod rule {rule.id}")
+        try:
+            await message.channel.send(
+                f"{message.author.mention}, your message was removed for breaking a server rule.",
+                delete_after=AUTOMOD_NOTICE_DELETE_AFTER,
+            )
+        except discord.HTTPException:
+            pass
+
+    @commands.hybrid_command(name="automod_add", description="Add an automod rule.")
+    @app_commands.describe(
+        kind="word: a whole word, regex: a regular expression, link: a domain and its subdomains.",
+        pattern="The word, regular expression or domain to block.",
+    )
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def automod_add(self, ctx: Context, kind: Literal["word", "regex", "link"], *, pattern: str) -> None:
+        """
+        Add an automod rule.
+
+        Args:
+            ctx (Context): The context of the command.
+            kind (Literal["word", "regex", "link"]): The kind of rule.
+            pattern (str): The word, regular expression or domain to block.
+        """
+        pattern = pattern.strip()
+        if kind == "link":
+            pattern = pattern.lower().removeprefix("https://").removeprefix("http://").strip("/")
+        problem = validate_rule(kind, pattern)
+        if problem is not None:
+            raise commands.BadArgument(problem)
+        if len(self.rules.get(ctx.guild.id, {})) >= AUTOMOD_MAX_RULES:
+            raise commands.BadArgument(f"A server can have at most {AUTOMOD_MAX_RULES} automod rules.")
+
+        async with self.bot.get_db_service() as db:
+            rule = await db.automod_rules.add_rule(str(ctx.guild.id), kind, pattern, str(ctx.author.id))
+            rule_id = rule.id
+
+        self.rules.setdefault(ctx.guild.id, {})[rule_id] = Rule(rule_id, kind, pattern)
+        await self.rebuild(ctx.guild.id)
+
+        embed = discord.Embed(
+            description=f"Added {kind} rule **{rule_id}**: `{truncate_text(pattern, 200)}`",
+            color=SUCCESS_COLOR,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="automod_remove", description="Remove an automod rule.")
+    @app_commands.describe(id="The id of the rule to remove.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def automod_remove(self, ctx: Context, id: int) -> None:
+        """
+        Remove an automod rule.
+
+        Args:
+            ctx (Context): The context of the command.
+            id (int): The id of the rule to remove.
+        """
+        async with self.bot.get_db_service() as db:
+            removed = await db.automod_rules.remove_rule(id, str(ctx.guild.id))
+
+        if not removed:
+            embed = discord.Embed(description=f"No automod rule with ID **{id}** found.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        self.rules.get(ctx.guild.id, {}).pop(id, None)
+        await self.rebuild(ctx.guild.id)
+
+        embed = discord.Embed(description=f"Removed automod rule **{id}**.", color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="automod_list", description="List the automod rules of the server.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def automod_list(self, ctx: Context) -> None:
+        """
+        List the automod rules of the server.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        rules = self.rules.get(ctx.guild.id)
+        if not rules:
+            embed = discord.Embed(description="This server has no automod rules.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        lines = [f"• **{rule.id}** ({rule.kind}): `{truncate_text(rule.pattern, 80)}`" for rule in rules.values()]
+        embed = discord.Embed(
+            title=f"Automod Rules ({len(rules)})",
+            description=truncate_text("\n".join(lines), 4096),
+            color=SUCCESS_COLOR,
+        )
+        await ctx.send(embed=embed)
+
+
+async def setup(bot: commands.Bot) -> None:
+    """
+    Set up the Automod cog.
+
+    Args:
+        bot (commands.Bot): The bot instance.
+    """
+    await bot.add_cog(Automod(bot))
@@ -2,15 +2,34 @@
 This cog contains general commands that are used to help the user.
 
 Commands:
-    - ping: Pings the bot.
-    - help: Shows all commands that the bot has loaded.
+    - ping: Pings the bot and shows the gateway, REST, database and event loop latency.
+    - help: Shows all commands that the bot has loaded, or the details of one command.
 """
 
+import math
+import time
+from typing import NamedTuple, Optional
+
 import discord
+from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
-from milkman.constants import SUCCESS_COLOR, OWNER_COG_NAME, GENERAL_COG_NAME
+from milkman.constants import SUCCESS_COLOR, OWNER_COG_NAME, GENERAL_COG_NAME, PING_HISTORY_SIZE
+from milkman.util import truncate_text
+from milkman.util.metrics import RecentSamples, measure_loop_lag, shard_latencies
+
+# Discord limits the fields of an embed to 25 and 1024 characters each, and an embed to 6000 characters
+HELP_FIELDS_PER_PAGE = 25
+HELP_FIELD_LIMIT = 1024
+HELP_CHARACTERS_PER_PAGE = 5500
+
+
+class HelpContent(NamedTuple):
+    """The help pages seen by an audience, and the detail page of each command they can see."""
+
+    pages: list[discord.Embed]
+    commands: dict[str, discord.Embed]
 
 
 class General(commands.Cog, name=GENERAL_COG_NAME):
@@ -20,56 +39,191 @@ class General(commands.Cog, name=GENERAL_COG_NAME):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        # Keyed by whether the audience is the owner
+        self.help_cache: dict[bool, HelpContent] = {}
+        self.ping_history: dict[str, RecentSamples] = {}
 
-    @commands.hybrid_command(name="ping", description="Pings the bot.")
+    @commands.hybrid_command(name="ping", description="Pings the bot and shows where any slowness comes from.")
     async def ping(self, ctx: Context) -> None:
         """
-        Pings the bot.
+        Pings the bot, measuring the gateway, REST, database and event loop latency separately.
 
         Args:
             ctx (Context): The context of the command.
         """
-        embed = discord.Embed(
-            title="🏓 Pong!",
-            description=f"The bot latency is {round(self.bot.latency * 1000)}ms",
-            color=SUCCESS_COLOR,
-        )
-        await ctx.send(embed=embed)
+        embed = discord.Embed(title="🏓 Pong!", description="Measuring...", color=SUCCESS_COLOR)
+        start = time.perf_counter()
+        message = await ctx.send(embed=embed)
+        measurements = {
+            "Gateway": self.bot.latency,
+            "REST": time.perf_counter() - start,
+            "Database": await self.bot.db_config.ping(),
+            "Event loop": await measure_loop_lag(),
+        }
+
+        lines = []
+        for name, value in measurements.items():
+            history = self.ping_history.setdefault(name, RecentSamples(PING_HISTORY_SIZE))
+            if math.isfinite(value):
+                history.add(value)
+            p50, p95 = history.percentile(50), history.percentile(95)
+            recent = f"p50 {p50 * 1000:.0f} • p95 {p95 * 1000:.0f}" if p50 is not None else ""
+            lines.append(f"{name:<11}{value * 1000:>8.1f}ms  {recent}")
+        embed.description = "```" + "\n".join(lines) + "```"
+
+        shards = shard_latencies(self.bot)
+        if len(shards) > 1:
+            embed.add_field(
+                name="Shards",
+                value="\n".join(f"Shard {shard_id}: {latency * 1000:.0f}ms" for shard_id, latency in shards),
+                inline=False,
+            )
+        embed.set_footer(text=f"Percentiles in ms over the last {len(self.ping_history['REST'])} pings")
+        await message.edit(embed=embed)
 
-    @commands.hybrid_command(
-        name="help", description="Shows all commands that the bot has loaded."
-    )
-    async def help(self, ctx: Context) -> None:
+    def build_help(self, owner: bool) -> HelpContent:
         """
-        Shows all commands that the bot has loaded.
+        Build the help pages and the command detail pages seen by an audience.
 
         Args:
-            ctx (Context): The context of the command.
+            owner (bool): Whether the pages are for the owner, who also sees the owner commands.
+
+        Returns:
+            HelpContent: The pages.
         """
-        embed = discord.Embed(
-            title="Help",
-            description="List of available commands:",
-            color=SUCCESS_COLOR,
-        )
-        for cog_name in self.bot.cogs:
-            if cog_name == OWNER_COG_NAME and not (await self.bot.is_owner(ctx.author)):
+        fields: list[list[tuple[str, str]]] = []
+        details: dict[str, discord.Embed] = {}
+        for cog_name, cog in self.bot.cogs.items():
+            if cog_name == OWNER_COG_NAME and not owner:
                 continue
 
-            cog = self.bot.get_cog(cog_name)
             cog_commands = cog.get_commands()
             data = []
-            if cog_commands:
-                for command in cog_commands:
-                    description = command.description.partition("\n")[0]
-                    data.append(f"`{command.name}` - {description}")
-            else:
+            for command in cog_commands:
+                description = command.description.partition("\n")[0]
+                data.append(f"`{command.name}` - {description}")
+            for command in cog.walk_commands():
+                embed = self.build_command_help(command)
+                details[command.qualified_name] = embed
+                for alias in command.aliases:
+                    details[f"{command.full_parent_name} {alias}".strip()] = embed
+            if not data:
                 data.append("No commands found.")
 
-            help_text = "\n".join(data)
-            embed.add_field(
-                name=cog_name.capitalize(), value=f"```{help_text}```", inline=False
+            # A field holds at most 1024 characters, so long cogs are split over several fields
+            cog_fields = []
+            chunk = ""
+            for line in data:
+                if chunk and len(chunk) + len(line) + 1 > HELP_FIELD_LIMIT - 6:
+                    cog_fields.append(chunk)
+                    chunk = ""
+                chunk = f"{chunk}\n{line}" if chunk else line
+            cog_fields.append(chunk)
+            fields.append(
+                [
+                    (cog_name.capitalize() if i == 0 else f"{cog_name.capitalize()} (continued)", f"```{text}```")
+                    for i, text in enumerate(cog_fields)
+                ]
+            )
+
+        # Pages break between cogs once a page would exceed the field or character limits
+        page_fields: list[list[tuple[str, str]]] = [[]]
+        characters = 0
+        for cog_fields in fields:
+            size = sum(len(name) + len(value) for name, value in cog_fields)
+            if page_fields[-1] and (
+                len(page_fields[-1]) + len(cog_fields) > HELP_FIELDS_PER_PAGE or characters + size > HELP_CHARACTERS_PER_PAGE
+            ):
+                page_fields.append([])
+                characters = 0
+            page_fields[-1].extend(cog_fields)
+            characters += size
+
+        pages = []
+        for number, page in enumerate(page_fields, start=1):
+            embed = discord.Embed(
+                title="Help",
+                description="List of available commands:",
+                color=SUCCESS_COLOR,
             )
+            for name, value in page:
+                embed.add_field(name=name, value=value, inline=False)
+            embed.set_footer(text=f"Page {number}/{len(page_fields)} • Use help <command> for details on a command")
+            pages.append(embed)
+        return HelpContent(pages, details)
+
+    def build_command_help(self, command: commands.Command) -> discord.Embed:
+        """
+        Build the detail page of a command.
 
+        Args:
+            command (commands.Command): The command.
+
+        Returns:
+            discord.Embed: The detail page.
+        """
+        embed = discord.Embed(
+            title=f"Help: {command.qualified_name}",
+            description=command.description or command.short_doc or "No description.",
+            color=SUCCESS_COLOR,
+        )
+        usage = f"{self.bot.bot_prefix}{command.qualified_name} {command.signature}".strip()
+        embed.add_field(name="Usage", value=f"`{usage}`", inline=False)
+
+        app_command = getattr(command, "app_command", None)
+        descriptions = {param.name: param.description for param in app_command.parameters} if app_command else {}
+        parameters = [
+            f"`{name}`{'' if param.required else ' (optional)'} - {descriptions.get(name, '…')}"
+            for name, param in command.clean_params.items()
+        ]
+        if parameters:
+            embed.add_field(name="Parameters", value=truncate_text("\n".join(parameters), HELP_FIELD_LIMIT), inline=False)
+        if command.aliases:
+            embed.add_field(name="Aliases", value=", ".join(f"`{alias}`" for alias in command.aliases), inline=False)
+        if command.cog_name:
+            embed.set_footer(text=f"Category: {command.cog_name.capitalize()}")
+        return embed
+
+    def help_content(self, owner: bool) -> HelpContent:
+        """Get the help pages of an audience, building them if they are not cached."""
+        content = self.help_cache.get(owner)
+        if content is None:
+            content = self.help_cache[owner] = self.build_help(owner)
+        return content
+
+    @commands.Cog.listener()
+    async def on_cogs_changed(self) -> None:
+        """
+        Forget the cached help pages when a cog is loaded, unloaded or reloaded.
+        """
+        self.help_cache.clear()
+
+    @commands.hybrid_command(
+        name="help", description="Shows all commands that the bot has loaded."
+    )
+    @app_commands.describe(query="A page number, or a command to show the details of.")
+    async def help(self, ctx: Context, *, query: Optional[str] = None) -> None:
+        """
+        Shows all commands that the bot has loaded, or the details of one command.
+
+        The pages are built once per audience and cached until the loaded cogs change.
+
+        Args:
+            ctx (Context): The context of the command.
+            query (Optional[str]): A page number, or a command to show the details of.
+        """
+        content = self.help_content(await self.bot.is_owner(ctx.author))
+        if query is None or query.strip().isdigit():
+            number = int(query or 1)
+            if not 1 <= number <= len(content.pages):
+                raise commands.BadArgument(f"There are only {len(content.pages)} help pages.")
+            await ctx.send(embed=content.pages[number - 1])
+            return
+
+        name = query.strip().removeprefix(self.bot.bot_prefix).lower()
+        embed = content.commands.get(name)
+        if embed is None:
+            raise commands.BadArgument(f"There is no command named {name!r}.")
         await ctx.send(embed=embed)
 
 
@@ -0,0 +1,385 @@
+"""
+This cog logs deleted and edited messages of watched channels to a log channel.
+
+Commands:
+    - messagelog_channel: Set or clear the channel deleted and edited messages are logged to.
+    - messagelog_watch: Start logging the deleted and edited messages of a channel.
+    - messagelog_unwatch: Stop logging the deleted and edited messages of a channel.
+    - messagelog_status: Show the message log settings and memory use.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+from discord.ext.commands import Context
+
+from milkman.constants import (
+    ERROR_COLOR,
+    MESSAGE_LOG_CHANNEL_CAPACITY,
+    MESSAGE_LOG_COG_NAME,
+    MESSAGE_LOG_FLUSH_INTERVAL,
+    MESSAGE_LOG_MEMORY_LIMIT,
+    SUCCESS_COLOR,
+)
+from milkman.util import truncate_text
+from milkman.util.message_buffer import CachedMessage, MessageBuffer
+from milkman.util.models import MessageLogSettings
+
+logger = logging.getLogger(__name__)
+
+# Discord allows 10 embeds per message with at most 6000 characters between them
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARACTERS_PER_MESSAGE = 6000
+
+
+def parse_channel_ids(value: str) -> set[int]:
+    """Parse a comma separated list of channel IDs."""
+    return {int(channel_id) for channel_id in value.split(",") if channel_id}
+
+
+def pack_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """
+    Group embeds into as few messages as the embed count and character limits allow.
+
+    Args:
+        embeds (list[discord.Embed]): The embeds, in the order they should be posted.
+
+    Returns:
+        list[list[discord.Embed]]: The embeds of each message.
+    """
+    messages: list[list[discord.Embed]] = []
+    characters = 0
+    for embed in embeds:
+        size = len(embed)
+        if not messages or len(messages[-1]) >= EMBEDS_PER_MESSAGE or characters + size > EMBED_CHARACTERS_PER_MESSAGE:
+            messages.append([])
+            characters = 0
+        messages[-1].append(embed)
+        characters += size
+    return messages
+
+
+class MessageLog(commands.Cog, name=MESSAGE_LOG_COG_NAME):
+    """
+    This cog keeps a compact buffer of the recent messages of watched channels, so that their content
+    can be logged after they are deleted or edited without relying on the message cache of the bot.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.settings: dict[int, MessageLogSettings] = {}
+        self.watched: set[int] = set()
+        self.buffer = MessageBuffer(MESSAGE_LOG_CHANNEL_CAPACITY, MESSAGE_LOG_MEMORY_LIMIT)
+        self.pending: dict[int, list[discord.Embed]] = {}
+
+    async def cog_load(self) -> None:
+        """
+        Load the message log settings of every guild and start posting logged messages.
+        """
+        async with self.bot.get_db_service() as db:
+            all_settings = await db.message_log.get_all_settings()
+
+        self.settings = {int(settings.guild_id): settings for settings in all_settings}
+        self.rebuild_watched()
+        self.flush_loop.start()
+
+    async def cog_unload(self) -> None:
+        """
+        Stop posting logged messages, posting the ones still pending.
+        """
+        self.flush_loop.cancel()
+        await self.flush()
+
+    def rebuild_watched(self) -> None:
+        """
+        Collect the watched channels of every guild with a log channel into one set.
+        """
+        watched = set()
+        for settings in self.settings.values():
+            if settings.log_channel_id is not None:
+                watched |= parse_channel_ids(settings.watched_channel_ids)
+        for channel_id in self.watched - watched:
+            self.buffer.drop_channel(channel_id)
+        self.watched = watched
+
+    def queue(self, guild_id: int, embed: discord.Embed) -> None:
+        """Queue an embed to be posted to the log channel of a guild with the next flush."""
+        self.pending.setdefault(guild_id, []).append(embed)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """
+        Buffer the message if its channel is watched.
+
+        Args:
+            message (discord.Message): The message that was sent.
+        """
+        if message.channel.id not in self.watched or message.author.bot:
+            return
+
+        self.buffer.add(
+            message.channel.id,
+            CachedMessage(
+                message.id,
+                message.author.id,
+                message.created_at.timestamp(),
+                message.content,
+                tuple(attachment.url for attachment in message.attachments),
+            ),
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        """
+        Log a deleted message of a watched channel.
+
+        Args:
+            payload (discord.RawMessageDeleteEvent): The raw event payload.
+        """
+        if payload.channel_id not in self.watched or payload.guild_id is None:
+            return
+        message = self.buffer.pop(payload.channel_id, payload.message_id)
+        if message is None:
+            return
+
+        embed = discord.Embed(
+            title="Message Deleted",
+            description=truncate_text(message.content, 2000) or "*No content*",
+            color=ERROR_COLOR,
+            timestamp=datetime.fromtimestamp(message.created_at, timezone.utc),
+        )
+        embed.add_field(name="Author", value=f"<@{message.author_id}>")
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
+        if message.attachments:
+            embed.add_field(name="Attachments", value=truncate_text("\n".join(message.attachments), 1024), inline=False)
+        self.queue(payload.guild_id, embed)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent) -> None:
+        """
+        Log the buffered messages of a bulk deletion in a watched channel as a single entry.
+
+        Args:
+            payload (discord.RawBulkMessageDeleteEvent): The raw event payload.
+        """
+        if payload.channel_id not in self.watched or payload.guild_id is None:
+            return
+        messages = [self.buffer.pop(payload.channel_id, message_id) for message_id in payload.message_ids]
+        messages = sorted((message for message in messages if message is not None), key=lambda message: message.id)
+        if not messages:
+            return
+
+        lines = [f"<@{message.author_id}>: {truncate_text(message.content, 200) or '*No content*'}" for message in messages]
+        embed = discord.Embed(
+            title=f"{len(payload.message_ids)} Messages Deleted",
+            description=truncate_text("\n".join(lines), 2000),
+            color=ERROR_COLOR,
+        )
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
+        self.queue(payload.guild_id, embed)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        """
+        Log an edited message of a watched channel and remember its new content.
+
+        Args:
+            payload (discord.RawMessageUpdateEvent): The raw event payload.
+        """
+        if payload.channel_id not in self.watched or payload.guild_id is None:
+            return
+        content = payload.data.get("content")
+        if content is None:
+            # Updates such as link embeds being resolved do not change the content
+            return
+        previous = self.buffer.update(payload.channel_id, payload.message_id, content)
+        if previous is None or previous == content:
+            return
+
+        message = self.buffer.get(payload.channel_id, payload.message_id)
+        embed = discord.Embed(
+            title="Message Edited",
+            url=f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}",
+            color=SUCCESS_COLOR,
+            timestamp=discord.utils.utcnow(),
+        )
+        embed.add_field(name="Before", value=truncate_text(previous, 1024) or "*No content*", inline=False)
+        embed.add_field(name="After", value=truncate_text(content, 1024) or "*No content*", inline=False)
+        embed.add_field(name="Author", value=f"<@{message.author_id}>")
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
+        self.queue(payload.guild_id, embed)
+
+    async def flush(self) -> None:
+        """
+        Post the pending log entries of every guild, packing as many embeds into each message as allowed.
+        """
+        pending, self.pending = self.pending, {}
+        for guild_id, embeds in pending.items():
+            settings = self.settings.get(guild_id)
+            if settings is None or settings.log_channel_id is None:
+                continue
+            channel = self.bot.get_channel(int(settings.log_channel_id))
+            if channel is None:
+                continue
+
+            for group in pack_embeds(embeds):
+                try:
+                    await channel.send(embeds=group)
+                except discord.HTTPException as e:
+                    logger.error(f"Failed to post {len(group)} message log entries in {channel}: {e}")
+                    break
+
+    @tasks.loop(seconds=MESSAGE_LOG_FLUSH_INTERVAL)
+    async def flush_loop(self) -> None:
+        """
+        Post the pending log entries periodically, so bursts of deletions are posted together.
+        """
+        await self.flush()
+
+    @flush_loop.before_loop
+    async def before_flush_loop(self) -> None:
+        """
+        Wait for the bot to be ready before posting log entries.
+        """
+        await self.bot.wait_until_ready()
+
+    async def save_settings(self, guild_id: int, settings: MessageLogSettings) -> MessageLogSettings:
+        """Save the message log settings of a guild and update the watched channels."""
+        async with self.bot.get_db_service() as db:
+            settings = await db.message_log.save_settings(settings)
+        self.settings[guild_id] = settings
+        self.rebuild_watched()
+        return settings
+
+    def get_settings(self, guild_id: int) -> MessageLogSettings:
+        """Get the message log settings of a guild, or new empty settings."""
+        settings = self.settings.get(guild_id)
+        if settings is None:
+            settings = MessageLogSettings(guild_id=str(guild_id), log_channel_id=None, watched_channel_ids="")
+        return settings
+
+    @commands.hybrid_command(
+        name="messagelog_channel", description="Set or clear the channel deleted and edited messages are logged to."
+    )
+    @app_commands.describe(channel="The log channel, leave empty to turn the message log off.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def messagelog_channel(self, ctx: Context, channel: Optional[discord.TextChannel] = None) -> None:
+        """
+        Set or clear the channel deleted and edited messages are logged to.
+
+        Args:
+            ctx (Context): The context of the command.
+            channel (Optional[discord.TextChannel]): The log channel, None to turn the message log off.
+        """
+        settings = self.get_settings(ctx.guild.id)
+        settings.log_channel_id = str(channel.id) if channel is not None else None
+        await self.save_settings(ctx.guild.id, settings)
+
+        description = (
+            f"Deleted and edited messages are now logged to {channel.mention}."
+            if channel is not None
+            else "The message log is turned off."
+        )
+        await ctx.send(embed=discord.Embed(description=description, color=SUCCESS_COLOR))
+
+    @commands.hybrid_command(
+        name="messagelog_watch", description="Start logging the deleted and edited messages of a channel."
+    )
+    @app_commands.describe(channel="The channel to watch.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def messagelog_watch(self, ctx: Context, channel: discord.TextChannel) -> None:
+        """
+        Start logging the deleted and edited messages of a channel.
+
+        Args:
+            ctx (Context): The context of the command.
+            channel (discord.TextChannel): The channel to watch.
+        """
+        settings = self.get_settings(ctx.guild.id)
+        if settings.log_channel_id == str(channel.id):
+            raise commands.BadArgument("The log channel cannot be watched.")
+        channel_ids = parse_channel_ids(settings.watched_channel_ids) | {channel.id}
+        settings.watched_channel_ids = ",".join(str(channel_id) for channel_id in sorted(channel_ids))
+        await self.save_settings(ctx.guild.id, settings)
+
+        description = f"Watching {channel.mention}."
+        if settings.log_channel_id is None:
+            description += " Set a log channel with `messagelog_channel` to start logging."
+        await ctx.send(embed=discord.Embed(description=description, color=SUCCESS_COLOR))
+
+    @commands.hybrid_command(
+        name="messagelog_unwatch", description="Stop logging the deleted and edited messages of a channel."
+    )
+    @app_commands.describe(channel="The channel to stop watching.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def messagelog_unwatch(self, ctx: Context, channel: discord.TextChannel) -> None:
+        """
+        Stop logging the deleted and edited messages of a channel.
+
+        Args:
+            ctx (Context): The context of the command.
+            channel (discord.TextChannel): The channel to stop watching.
+        """
+        settings = self.get_settings(ctx.guild.id)
+        channel_ids = parse_channel_ids(settings.watched_channel_ids)
+        if channel.id not in channel_ids:
+            await ctx.send(embed=discord.Embed(description=f"{channel.mention} is not watched.", color=ERROR_COLOR))
+            return
+
+        channel_ids.discard(channel.id)
+        settings.watched_channel_ids = ",".join(str(channel_id) for channel_id in sorted(channel_ids))
+        await self.save_settings(ctx.guild.id, settings)
+        await ctx.send(embed=discord.Embed(description=f"Stopped watching {channel.mention}.", color=SUCCESS_COLOR))
+
+    @commands.hybrid_command(name="messagelog_status", description="Show the message log settings and memory use.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def messagelog_status(self, ctx: Context) -> None:
+        """
+        Show the message log settings of the server and the memory use of the message buffer.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        settings = self.get_settings(ctx.guild.id)
+        channel_ids = sorted(parse_channel_ids(settings.watched_channel_ids))
+        stats = self.buffer.stats()
+
+        embed = discord.Embed(title="Message Log", color=SUCCESS_COLOR)
+        embed.add_field(
+            name="Log Channel",
+            value=f"<#{settings.log_channel_id}>" if settings.log_channel_id else "None, the message log is off",
+            inline=False,
+        )
+        embed.add_field(
+            name="Watched Channels",
+            value=truncate_text(" ".join(f"<#{channel_id}>" for channel_id in channel_ids), 1024) or "None",
+            inline=False,
+        )
+        embed.add_field(
+            name="Buffer (all servers)",
+            value=(
+                f"{stats['messages']} messages in {stats['channels']} channels, "
+                f"{stats['bytes'] / 1024 / 1024:.1f}/{MESSAGE_LOG_MEMORY_LIMIT / 1024 / 1024:.0f} MiB, "
+                f"{stats['evicted']} evicted"
+            ),
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+
+async def setup(bot: commands.Bot) -> None:
+    """
+    Set up the MessageLog cog.
+
+    Args:
+        bot (commands.Bot): The bot instance.
+    """
+    await bot.add_cog(MessageLog(bot))
@@ -4,23 +4,129 @@ This cog contains moderation commands.
 Commands:
     - kick: Kick a user from the server.
     - ban: Ban a user from the server.
+    - masskick: Kick many users from the server.
+    - massban: Ban many users from the server.
+    - tempban: Ban a user from the server for a while.
+    - tempmute: Time out a user for a while.
     - warn: Warn a user.
     - remove_warning: Remove a warning from a user.
     - list_warnings: List all warnings for a user.
-    - purge: Purge messages from the server.
+    - search_warnings: Search the warning reasons of the server.
+    - escalation_add: Add a warning escalation policy.
+    - escalation_remove: Remove a warning escalation policy.
+    - escalation_list: List the warning escalation policies of the server.
+    - purge: Purge messages from the server, optionally filtered by author, content and time.
 """
 
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
-from milkman.constants import SUCCESS_COLOR, ERROR_COLOR, MODERATION_COG_NAME
+from milkman.constants import (
+    SUCCESS_COLOR,
+    ERROR_COLOR,
+    MODERATION_COG_NAME,
+    MODERATION_MASS_ACTION_CONCURRENCY,
+    MODERATION_MASS_ACTION_LIMIT,
+    MODERATION_MAX_TIMEOUT,
+    MODERATION_PROGRESS_INTERVAL,
+    MODERATION_PURGE_SCAN_LIMIT,
+    MODERATION_SEARCH_PAGE_SIZE,
+)
+from milkman.util import parse_duration, truncate_text
+from milkman.util.action_scheduler import to_timestamp
+from milkman.util.models import ScheduledAction, WarningEscalationPolicy
+from milkman.util.progress import ProgressMessage
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+USER_ID_REGEX = re.compile(r"\d{15,20}")
+LINK_REGEX = re.compile(r"https?://\S+", re.IGNORECASE)
+
+# Discord refuses to bulk delete messages older than 14 days, keep a margin for clock skew
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=1)
+BULK_DELETE_MAX_MESSAGES = 100
+
+# Escalation actions from least to most severe, the most severe due action is taken
+ESCALATION_ACTIONS = ("timeout", "kick", "ban")
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Parse a point in time given as a message ID or an ISO 8601 date.
+
+    Args:
+        value (str): The message ID or date, dates without a timezone are taken as UTC.
+
+    Returns:
+        datetime: The aware point in time.
+    """
+    if value.isdigit():
+        return discord.utils.snowflake_time(int(value))
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise commands.BadArgument(f"{value!r} is not a message ID or an ISO 8601 date.")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class WarningSearchFlags(commands.FlagConverter):
+    """
+    A warning search, e.g. `query: "scam links" moderator: @Mod after: 2024-01-01 page: 2`.
+    """
+
+    query: str = commands.flag(
+        description='Words to search for, "quoted phrases", prefix* matches and OR between terms.'
+    )
+    user: Optional[discord.User] = commands.flag(default=None, description="Only warnings of this user.")
+    moderator: Optional[discord.User] = commands.flag(default=None, description="Only warnings by this moderator.")
+    after: Optional[str] = commands.flag(default=None, description="Only warnings after this message ID or ISO date.")
+    before: Optional[str] = commands.flag(default=None, description="Only warnings before this message ID or ISO date.")
+    page: commands.Range[int, 1] = commands.flag(default=1, description="The page of results.")
+
+
+def format_policy(policy: WarningEscalationPolicy) -> str:
+    """Describe a warning escalation policy, e.g. "timeout for 60 minutes after 3 warnings within 7 days"."""
+    action = policy.action
+    if policy.action == "timeout":
+        action += f" for {policy.duration_minutes} minutes"
+    return f"{action} after {policy.threshold} warnings within {policy.window_days} days"
+
+
+class MassActionFlags(commands.FlagConverter):
+    """
+    The targets of a mass moderation action, e.g. `users: @a 123 joined_within: 10 reason: raid`.
+    """
+
+    users: str = commands.flag(default="", description="Mentions or IDs of the users, separated by spaces.")
+    joined_within: Optional[commands.Range[int, 1, None]] = commands.flag(
+        default=None, description="Also target members who joined in the last this many minutes."
+    )
+    reason: str = commands.flag(default="No reason provided.", description="The reason for the action.")
+
+
+class PurgeFlags(commands.FlagConverter):
+    """
+    The filters of a purge, e.g. `user: @spammer links: yes after: 2024-01-01T12:00`.
+    """
+
+    user: Optional[discord.User] = commands.flag(default=None, description="Only delete messages from this user.")
+    contains: Optional[str] = commands.flag(default=None, description="Only delete messages containing this text.")
+    regex: Optional[str] = commands.flag(default=None, description="Only delete messages matching this regex.")
+    links: bool = commands.flag(default=False, description="Only delete messages containing links.")
+    attachments: bool = commands.flag(default=False, description="Only delete messages with attachments.")
+    before: Optional[str] = commands.flag(default=None, description="Only delete messages before this message ID or date.")
+    after: Optional[str] = commands.flag(default=None, description="Only delete messages after this message ID or date.")
+
 
 class Moderation(commands.Cog, name=MODERATION_COG_NAME):
     """
@@ -30,6 +136,45 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        """
+        Register the handlers of the scheduled actions that undo temporary bans and mutes.
+        """
+        self.bot.action_scheduler.register("unban", self.scheduled_unban)
+        self.bot.action_scheduler.register("unmute", self.scheduled_unmute)
+
+    async def cog_unload(self) -> None:
+        """
+        Unregister the scheduled action handlers, their actions wait until the cog is loaded again.
+        """
+        self.bot.action_scheduler.unregister("unban")
+        self.bot.action_scheduler.unregister("unmute")
+
+    async def scheduled_unban(self, guild: discord.Guild, action: ScheduledAction) -> None:
+        """
+        Lift a temporary ban.
+
+        Args:
+            guild (discord.Guild): The guild of the ban.
+            action (ScheduledAction): The scheduled unban.
+        """
+        await guild.unban(discord.Object(int(action.target_id)), reason="Temporary ban expired")
+        logger.info(f"Lifted the temporary ban of {action.target_id} in {guild}")
+
+    async def scheduled_unmute(self, guild: discord.Guild, action: ScheduledAction) -> None:
+        """
+        Lift a temporary mute, in case the timeout was extended or is still running.
+
+        Args:
+            guild (discord.Guild): The guild of the mute.
+            action (ScheduledAction): The scheduled unmute.
+        """
+        member = await self.bot.member_resolver.resolve(guild, int(action.target_id))
+        if member is None or not member.is_timed_out():
+            return
+        await member.timeout(None, reason="Temporary mute expired")
+        logger.info(f"Lifted the temporary mute of {member} in {guild}")
+
     @commands.hybrid_command(name="kick", description="Kick a user from the server.")
     @app_commands.describe(
         user="The user to kick.",
@@ -49,7 +194,14 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
             reason (str): The reason for the kick, defaulting to "No reason provided."
         """
 
-        member = ctx.guild.get_member(user.id) or await ctx.guild.fetch_member(user.id)
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id)
+        if member is None:
+            embed = discord.Embed(
+                description=f"**{user}** is not in the server.",
+                color=ERROR_COLOR,
+            )
+            await ctx.send(embed=embed)
+            return
         if member.guild_permissions.administrator:
             embed = discord.Embed(
                 description="You cannot kick an administrator.",
@@ -105,8 +257,9 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
             reason (str): The reason for the ban, defaulting to "No reason provided."
         """
 
-        member = ctx.guild.get_member(user.id) or await ctx.guild.fetch_member(user.id)
-        if member.guild_permissions.administrator:
+        # Users who are not in the server can still be banned
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id) or user
+        if isinstance(member, discord.Member) and member.guild_permissions.administrator:
             embed = discord.Embed(
                 description="You cannot ban an administrator.",
                 color=ERROR_COLOR,
@@ -130,7 +283,7 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
                     # If the user has DMs disabled, we can't send them a message.
                     pass
 
-                await member.ban(reason=reason)
+                await ctx.guild.ban(member, reason=reason)
             except Exception as e:
                 embed = discord.Embed(
                     description=f"Failed to ban {member.mention} from the server. Please ensure my role is higher than the user's role.",
@@ -142,6 +295,282 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
                     f"Failed to ban {member.mention} from the server. Please ensure my role is higher than the user's role. Error: {e}"
                 )
 
+    def collect_targets(self, ctx: Context, flags: MassActionFlags) -> list[int]:
+        """
+        Collect the IDs targeted by a mass moderation action.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (MassActionFlags): The targets of the action.
+
+        Returns:
+            list[int]: The targeted user IDs in the order they were given, without duplicates.
+        """
+        user_ids = dict.fromkeys(int(match) for match in USER_ID_REGEX.findall(flags.users))
+
+        if flags.joined_within is not None:
+            cutoff = discord.utils.utcnow() - timedelta(minutes=flags.joined_within)
+            for member in ctx.guild.members:
+                if member.joined_at is not None and member.joined_at >= cutoff and not member.bot:
+                    user_ids[member.id] = None
+
+        return list(user_ids)
+
+    def check_target(self, ctx: Context, user_id: int, member: Optional[discord.Member]) -> Optional[str]:
+        """
+        Check whether a user may be targeted by a mass moderation action.
+
+        Returns:
+            Optional[str]: Why the user cannot be targeted, or None if they can.
+        """
+        if user_id in (ctx.author.id, ctx.me.id):
+            return "cannot target yourself or the bot"
+        if member is None:
+            return None
+        if member.guild_permissions.administrator:
+            return "is an administrator"
+        if member.top_role >= ctx.me.top_role:
+            return "has a role higher than or equal to mine"
+        if ctx.author.id != ctx.guild.owner_id and member.top_role >= ctx.author.top_role:
+            return "has a role higher than or equal to yours"
+        return None
+
+    async def mass_action(self, ctx: Context, flags: MassActionFlags, action: Literal["kick", "ban"]) -> None:
+        """
+        Kick or ban many users with bounded concurrency, reporting progress in a single message.
+
+        DMs and kicks run with at most MODERATION_MASS_ACTION_CONCURRENCY requests in flight. Bans are
+        made with a single bulk ban request once the DMs have been sent.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (MassActionFlags): The targets and reason of the action.
+            action (Literal["kick", "ban"]): The action to take.
+        """
+        past_tense = "Kicked" if action == "kick" else "Banned"
+        user_ids = self.collect_targets(ctx, flags)
+
+        if not user_ids:
+            embed = discord.Embed(description="No users matched.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+        if len(user_ids) > MODERATION_MASS_ACTION_LIMIT:
+            embed = discord.Embed(
+                description=f"Too many users matched ({len(user_ids)}), the limit is {MODERATION_MASS_ACTION_LIMIT}.",
+                color=ERROR_COLOR,
+            )
+            await ctx.send(embed=embed)
+            return
+
+        progress = await ProgressMessage.send(
+            ctx,
+            title=f"Mass {action}",
+            description=f"Processing 0/{len(user_ids)} users...",
+            interval=MODERATION_PROGRESS_INTERVAL,
+        )
+
+        # Uncached members are requested over the gateway in chunks instead of one REST call each
+        try:
+            members = await self.bot.member_resolver.resolve_many(ctx.guild, user_ids)
+        except discord.HTTPException as e:
+            embed = discord.Embed(description=f"Failed to look up the users: {e}", color=ERROR_COLOR)
+            await progress.finish(embed)
+            return
+
+        semaphore = asyncio.Semaphore(MODERATION_MASS_ACTION_CONCURRENCY)
+        failures: dict[int, str] = {}
+        to_ban: list[discord.abc.Snowflake] = []
+        done = 0
+
+        async def act(user_id: int) -> None:
+            member = members.get(user_id)
+            problem = self.check_target(ctx, user_id, member)
+            if problem is None and member is None and action == "kick":
+                problem = "is not in the server"
+            if problem is not None:
+                failures[user_id] = problem
+                return
+
+            if member is not None:
+                try:
+                    await member.send(
+                        f"You were {past_tense.lower()} from **{ctx.guild}** by **{ctx.author}**!\n\nReason: {flags.reason}"
+                    )
+                except Exception:
+                    # If the user has DMs disabled, we can't send them a message.
+                    pass
+
+            if action == "kick":
+                try:
+                    await member.kick(reason=flags.reason)
+                except discord.HTTPException as e:
+                    failures[user_id] = str(e)
+            else:
+                to_ban.append(member or discord.Object(id=user_id))
+
+        async def process(user_id: int) -> None:
+            nonlocal done
+            async with semaphore:
+                await act(user_id)
+            done += 1
+            await progress.update(f"Processing {done}/{len(user_ids)} users...")
+
+        await asyncio.gather(*(process(user_id) for user_id in user_ids))
+
+        if to_ban:
+            await progress.update(f"Banning {len(to_ban)} users...", force=True)
+            try:
+                result = await ctx.guild.bulk_ban(to_ban, reason=flags.reason)
+                for user in result.failed:
+                    failures[user.id] = "bulk ban failed"
+            except discord.HTTPException as e:
+                for user in to_ban:
+                    failures[user.id] = str(e)
+
+        succeeded = len(user_ids) - len(failures)
+        embed = discord.Embed(
+            description=f"{past_tense} **{succeeded}** of {len(user_ids)} users by **{ctx.author}**.",
+            color=SUCCESS_COLOR if not failures else ERROR_COLOR,
+        )
+        embed.set_footer(text=f"Reason: {flags.reason}")
+        if failures:
+            lines = "\n".join(f"<@{user_id}>: {problem}" for user_id, problem in failures.items())
+            embed.add_field(name=f"Failed ({len(failures)})", value=truncate_text(lines, 1024), inline=False)
+        await progress.finish(embed)
+
+        logger.info(f"{ctx.author} mass {action}ed {succeeded}/{len(user_ids)} users in {ctx.guild}")
+
+    @commands.hybrid_command(name="masskick", description="Kick many users from the server.")
+    @commands.has_permissions(kick_members=True)
+    @commands.bot_has_permissions(kick_members=True)
+    @commands.guild_only()
+    async def masskick(self, ctx: Context, *, flags: MassActionFlags) -> None:
+        """
+        Kick many users from the server.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (MassActionFlags): The users to kick, as mentions or IDs and/or a join window, and the reason.
+        """
+        await self.mass_action(ctx, flags, "kick")
+
+    @commands.hybrid_command(name="massban", description="Ban many users from the server.")
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    @commands.guild_only()
+    async def massban(self, ctx: Context, *, flags: MassActionFlags) -> None:
+        """
+        Ban many users from the server.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (MassActionFlags): The users to ban, as mentions or IDs and/or a join window, and the reason.
+        """
+        await self.mass_action(ctx, flags, "ban")
+
+    @commands.hybrid_command(name="tempban", description="Ban a user from the server for a while.")
+    @app_commands.describe(
+        user="The user to ban.",
+        duration="How long to ban the user for, e.g. 30m, 12h or 7d.",
+        reason="The reason for the ban.",
+    )
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    @commands.guild_only()
+    async def tempban(
+        self, ctx: Context, user: discord.User, duration: str, reason: str = "No reason provided."
+    ) -> None:
+        """
+        Ban a user from the server and lift the ban once the duration has passed, even across restarts.
+
+        Args:
+            ctx (Context): The context of the command.
+            user (discord.User): The user that is being banned from the server.
+            duration (str): How long to ban the user for.
+            reason (str): The reason for the ban, defaulting to "No reason provided."
+        """
+        delta = parse_duration(duration)
+        if delta is None:
+            raise commands.BadArgument(f"{duration!r} is not a duration, use e.g. 30m, 12h or 7d.")
+
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id)
+        if member is not None:
+            problem = self.check_target(ctx, user.id, member)
+            if problem is not None:
+                embed = discord.Embed(description=f"**{member}** {problem}.", color=ERROR_COLOR)
+                await ctx.send(embed=embed)
+                return
+            try:
+                await member.send(
+                    f"You were banned from **{ctx.guild}** by **{ctx.author}** for {duration}!\n\nReason: {reason}"
+                )
+            except Exception:
+                # If the user has DMs disabled, we can't send them a message.
+                pass
+
+        await ctx.guild.ban(user, reason=reason)
+        action = await self.bot.action_scheduler.schedule(
+            ctx.guild.id, "unban", user.id, delta, ctx.author.id, reason
+        )
+
+        embed = discord.Embed(
+            description=(
+                f"Banned **{user}** from the server by **{ctx.author}** "
+                f"until <t:{int(to_timestamp(action.due_at))}:f>."
+            ),
+            color=SUCCESS_COLOR,
+        )
+        embed.set_footer(text=f"Reason: {reason}")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="tempmute", description="Time out a user for a while.")
+    @app_commands.describe(
+        user="The user to mute.",
+        duration="How long to mute the user for, at most 28 days, e.g. 30m, 12h or 7d.",
+        reason="The reason for the mute.",
+    )
+    @commands.has_permissions(moderate_members=True)
+    @commands.bot_has_permissions(moderate_members=True)
+    @commands.guild_only()
+    async def tempmute(
+        self, ctx: Context, user: discord.User, duration: str, reason: str = "No reason provided."
+    ) -> None:
+        """
+        Time out a user and lift the mute once the duration has passed.
+
+        Args:
+            ctx (Context): The context of the command.
+            user (discord.User): The user that is being muted.
+            duration (str): How long to mute the user for.
+            reason (str): The reason for the mute, defaulting to "No reason provided."
+        """
+        delta = parse_duration(duration)
+        if delta is None:
+            raise commands.BadArgument(f"{duration!r} is not a duration, use e.g. 30m, 12h or 7d.")
+        if delta > timedelta(minutes=MODERATION_MAX_TIMEOUT):
+            raise commands.BadArgument("A mute can last at most 28 days.")
+
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id)
+        problem = "is not in the server" if member is None else self.check_target(ctx, user.id, member)
+        if problem is not None:
+            embed = discord.Embed(description=f"**{user}** {problem}.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        await member.timeout(delta, reason=reason)
+        action = await self.bot.action_scheduler.schedule(
+            ctx.guild.id, "unmute", user.id, delta, ctx.author.id, reason
+        )
+
+        embed = discord.Embed(
+            description=(
+                f"Muted **{member}** by **{ctx.author}** until <t:{int(to_timestamp(action.due_at))}:f>."
+            ),
+            color=SUCCESS_COLOR,
+        )
+        embed.set_footer(text=f"Reason: {reason}")
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command(name="warn", description="Warn a user.")
     @app_commands.describe(
         user="The user to warn.",
@@ -160,14 +589,22 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
             reason (str): The reason for to warn, defaulting to "No reason provided."
         """
 
-        member = ctx.guild.get_member(user.id) or await ctx.guild.fetch_member(user.id)
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id)
+        if member is None:
+            embed = discord.Embed(
+                description=f"**{user}** is not in the server.",
+                color=ERROR_COLOR,
+            )
+            await ctx.send(embed=embed)
+            return
         async with self.bot.get_db_service() as db:
-            await db.warnings.add_warning(
+            warning = await db.warnings.add_warning(
                 str(user.id),
                 str(ctx.guild.id),
                 str(ctx.author.id),
                 reason,
             )
+            warning_id = warning.id
         embed = discord.Embed(
             description=f"Warned **{member}** from the server by **{ctx.author}**.",
             color=SUCCESS_COLOR,
@@ -184,6 +621,78 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
                 f"{member.mention}, you were warned by **{ctx.author}**!\n\nReason: {reason}"
             )
 
+        await self.escalate(ctx, member, warning_id)
+
+    async def escalate(self, ctx: Context, member: discord.Member, warning_id: int) -> None:
+        """
+        Take the action of the most severe escalation policy that a new warning makes due.
+
+        A policy is due when the warnings of the member within its window reach its threshold
+        exactly, so it fires once per crossing. Warnings older than a window no longer count
+        towards it, so old warnings decay. All windows are counted in a single indexed query.
+
+        Args:
+            ctx (Context): The context of the warn command.
+            member (discord.Member): The member who was warned.
+            warning_id (int): The ID of the new warning.
+        """
+        async with self.bot.get_db_service() as db:
+            policies = await db.escalations.get_policies(str(ctx.guild.id))
+            if not policies:
+                return
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            counts = await db.warnings.count_recent_warnings(
+                str(member.id),
+                str(ctx.guild.id),
+                (policy.window_days for policy in policies),
+                now,
+            )
+
+        due = [policy for policy in policies if counts.get(policy.window_days) == policy.threshold]
+        if not due:
+            return
+        policy = max(
+            due,
+            key=lambda policy: (ESCALATION_ACTIONS.index(policy.action), policy.duration_minutes or 0),
+        )
+        count = counts[policy.window_days]
+        reason = f"{count} warnings within {policy.window_days} days (escalation policy {policy.id})"
+
+        error = None
+        if member.guild_permissions.administrator:
+            error = "member is an administrator"
+        else:
+            try:
+                if policy.action == "timeout":
+                    await member.timeout(timedelta(minutes=policy.duration_minutes), reason=reason)
+                elif policy.action == "kick":
+                    await member.kick(reason=reason)
+                elif policy.action == "ban":
+                    await member.ban(reason=reason)
+            except discord.HTTPException as e:
+                error = str(e)
+
+        async with self.bot.get_db_service() as db:
+            await db.escalations.add_action(policy, str(member.id), warning_id, count, error is None, error)
+
+        if error is not None:
+            logger.error(f"Failed to {policy.action} {member} in {ctx.guild} by escalation policy {policy.id}: {error}")
+            embed = discord.Embed(
+                description=f"Failed to {policy.action} **{member}** automatically: {error}",
+                color=ERROR_COLOR,
+            )
+        else:
+            logger.info(f"Escalation policy {policy.id} took action {policy.action} against {member} in {ctx.guild}")
+            action = {"timeout": "Timed out", "kick": "Kicked", "ban": "Banned"}[policy.action]
+            if policy.action == "timeout":
+                action += f" for {policy.duration_minutes} minutes"
+            embed = discord.Embed(
+                description=f"{action} **{member}** automatically.",
+                color=SUCCESS_COLOR,
+            )
+        embed.set_footer(text=f"Reason: {reason}")
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command(
         name="remove_warning", description="Remove a warning from a user."
     )
@@ -201,7 +710,7 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
             user (discord.User): The user to remove a warning from.
             id (int): The id of the warning to remove.
         """
-        member = ctx.guild.get_member(user.id) or await ctx.guild.fetch_member(user.id)
+        member = await self.bot.member_resolver.resolve(ctx.guild, user.id) or user
         async with self.bot.get_db_service() as db:
             await db.warnings.remove_warning(id, str(user.id), str(ctx.guild.id))
         embed = discord.Embed(
@@ -227,6 +736,7 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
         """
         async with self.bot.get_db_service() as db:
             warnings = await db.warnings.get_warnings(str(user.id), str(ctx.guild.id))
+            actions = await db.escalations.get_actions(str(user.id), str(ctx.guild.id))
         if not warnings:
             embed = discord.Embed(
                 description="No warnings found for this user.",
@@ -245,8 +755,158 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
                 description=description,
                 color=SUCCESS_COLOR,
             )
+            if actions:
+                embed.add_field(
+                    name="Automatic Actions",
+                    value=truncate_text(
+                        "\n".join(
+                            f"• {action.action} after {action.warning_count} warnings in {action.window_days} days"
+                            f"{'' if action.succeeded else ' (failed)'} (<t:{int(action.created_at.timestamp())}>)"
+                            for action in actions
+                        ),
+                        1024,
+                    ),
+                    inline=False,
+                )
             await ctx.send(embed=embed)
 
+    @commands.hybrid_command(name="search_warnings", description="Search the warning reasons of the server.")
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def search_warnings(self, ctx: Context, *, flags: WarningSearchFlags) -> None:
+        """
+        Search the warning reasons of the server, best matches first.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (WarningSearchFlags): The search query, filters and page.
+        """
+        # The warning timestamps are stored as naive UTC
+        after = parse_time(flags.after).astimezone(timezone.utc).replace(tzinfo=None) if flags.after else None
+        before = parse_time(flags.before).astimezone(timezone.utc).replace(tzinfo=None) if flags.before else None
+
+        started = time.perf_counter()
+        async with self.bot.get_db_service() as db:
+            matches, total = await db.warnings.search_warnings(
+                str(ctx.guild.id),
+                flags.query,
+                user_id=str(flags.user.id) if flags.user else None,
+                moderator_id=str(flags.moderator.id) if flags.moderator else None,
+                after=after,
+                before=before,
+                limit=MODERATION_SEARCH_PAGE_SIZE,
+                offset=(flags.page - 1) * MODERATION_SEARCH_PAGE_SIZE,
+            )
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if not matches:
+            embed = discord.Embed(
+                description="No warnings found." if total == 0 else f"There are only {total} results.",
+                color=ERROR_COLOR,
+            )
+            await ctx.send(embed=embed)
+            return
+
+        pages = -(-total // MODERATION_SEARCH_PAGE_SIZE)
+        lines = [
+            f"• **{warning.id}** <@{warning.user_id}> by <@{warning.moderator_id}>: "
+            f"{truncate_text(snippet, 200)} (<t:{int(warning.created_at.timestamp())}:d>)"
+            for warning, snippet in matches
+        ]
+        embed = discord.Embed(
+            title=f"Warnings matching {truncate_text(flags.query, 200)}",
+            description=truncate_text("\n".join(lines), 4096),
+            color=SUCCESS_COLOR,
+        )
+        embed.set_footer(text=f"Page {flags.page}/{pages} • {total} results in {elapsed:.0f}ms")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="escalation_add", description="Add a warning escalation policy.")
+    @app_commands.describe(
+        threshold="The number of warnings that triggers the action.",
+        days="The number of days the warnings are counted over.",
+        action="The action to take.",
+        duration="The timeout duration in minutes, only for timeouts.",
+    )
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def escalation_add(
+        self,
+        ctx: Context,
+        threshold: commands.Range[int, 1, 100],
+        days: commands.Range[int, 1, 365],
+        action: Literal["timeout", "kick", "ban"],
+        duration: Optional[commands.Range[int, 1, MODERATION_MAX_TIMEOUT]] = None,
+    ) -> None:
+        """
+        Add a warning escalation policy, e.g. a timeout after 3 warnings within 7 days.
+
+        Args:
+            ctx (Context): The context of the command.
+            threshold (int): The number of warnings that triggers the action.
+            days (int): The number of days the warnings are counted over.
+            action (Literal["timeout", "kick", "ban"]): The action to take.
+            duration (Optional[int]): The timeout duration in minutes, only for timeouts.
+        """
+        if action == "timeout" and duration is None:
+            raise commands.BadArgument("A timeout policy needs a duration in minutes.")
+        if action != "timeout":
+            duration = None
+
+        async with self.bot.get_db_service() as db:
+            policy = await db.escalations.add_policy(
+                str(ctx.guild.id), threshold, days, action, duration, str(ctx.author.id)
+            )
+            policy_id = policy.id
+
+        embed = discord.Embed(
+            description=f"Added escalation policy **{policy_id}**: {format_policy(policy)}.",
+            color=SUCCESS_COLOR,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="escalation_remove", description="Remove a warning escalation policy.")
+    @app_commands.describe(id="The id of the policy to remove.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def escalation_remove(self, ctx: Context, id: int) -> None:
+        """
+        Remove a warning escalation policy.
+
+        Args:
+            ctx (Context): The context of the command.
+            id (int): The id of the policy to remove.
+        """
+        async with self.bot.get_db_service() as db:
+            removed = await db.escalations.remove_policy(id, str(ctx.guild.id))
+        embed = discord.Embed(
+            description=f"Removed escalation policy **{id}**." if removed else f"No escalation policy with ID **{id}** found.",
+            color=SUCCESS_COLOR if removed else ERROR_COLOR,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="escalation_list", description="List the warning escalation policies of the server.")
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def escalation_list(self, ctx: Context) -> None:
+        """
+        List the warning escalation policies of the server.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        async with self.bot.get_db_service() as db:
+            policies = await db.escalations.get_policies(str(ctx.guild.id))
+        if not policies:
+            embed = discord.Embed(description="This server has no escalation policies.", color=ERROR_COLOR)
+        else:
+            embed = discord.Embed(
+                title="Escalation Policies",
+                description="\n".join(f"• **{policy.id}**: {format_policy(policy)}" for policy in policies),
+                color=SUCCESS_COLOR,
+            )
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command(
         name="purge", description="Purge messages from the server."
     )
@@ -254,24 +914,108 @@ class Moderation(commands.Cog, name=MODERATION_COG_NAME):
         amount="The amount of messages to purge.",
     )
     @commands.has_permissions(manage_messages=True)
-    @commands.bot_has_permissions(manage_messages=True)
-    async def purge(self, ctx: Context, amount: int) -> None:
+    @commands.bot_has_permissions(manage_messages=True, read_message_history=True)
+    async def purge(self, ctx: Context, amount: commands.Range[int, 1], *, flags: PurgeFlags) -> None:
         """
         Purge messages from the server.
 
+        The history is read lazily, newest first, until enough matching messages have been found or
+        MODERATION_PURGE_SCAN_LIMIT messages have been looked at. Matching messages are bulk deleted
+        in chunks of 100, messages too old to be bulk deleted are deleted one at a time.
+
         Args:
             ctx (Context): The context of the command.
             amount (int): The amount of messages to purge.
+            flags (PurgeFlags): The filters the messages have to match.
         """
+        try:
+            pattern = re.compile(flags.regex) if flags.regex else None
+        except re.error as e:
+            raise commands.BadArgument(f"Invalid regex: {e}")
+        before = parse_time(flags.before) if flags.before else None
+        after = parse_time(flags.after) if flags.after else None
 
-        await ctx.send("Deleting messages...")
+        def matches(message: discord.Message) -> bool:
+            if message.pinned:
+                return False
+            if flags.user is not None and message.author.id != flags.user.id:
+                return False
+            if flags.contains is not None and flags.contains.lower() not in message.content.lower():
+                return False
+            if pattern is not None and not pattern.search(message.content):
+                return False
+            if flags.links and not LINK_REGEX.search(message.content):
+                return False
+            if flags.attachments and not message.attachments:
+                return False
+            return True
+
+        progress = await ProgressMessage.send(
+            ctx,
+            title="Purge",
+            description="Deleting messages...",
+            interval=MODERATION_PROGRESS_INTERVAL,
+        )
+
+        scanned = 0
+        deleted = 0
+        failed = 0
+        batch: list[discord.Message] = []
+
+        async def flush_batch() -> None:
+            nonlocal deleted, failed
+            if not batch:
+                return
+            try:
+                await ctx.channel.delete_messages(batch, reason=f"Purge by {ctx.author}")
+                deleted += len(batch)
+            except discord.HTTPException as e:
+                logger.error(f"Failed to bulk delete {len(batch)} messages in {ctx.channel}: {e}")
+                failed += len(batch)
+            batch.clear()
+
+        history = ctx.channel.history(
+            limit=MODERATION_PURGE_SCAN_LIMIT,
+            before=before or progress.message,
+            after=after,
+            oldest_first=False,
+        )
+        async for message in history:
+            scanned += 1
+            if message.id == ctx.message.id or not matches(message):
+                continue
+
+            if discord.utils.utcnow() - message.created_at < BULK_DELETE_MAX_AGE:
+                batch.append(message)
+                if len(batch) == BULK_DELETE_MAX_MESSAGES:
+                    await flush_batch()
+            else:
+                # The history is newest first, so every message from here on is too old as well
+                await flush_batch()
+                try:
+                    await message.delete()
+                    deleted += 1
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException as e:
+                    logger.error(f"Failed to delete message {message.id} in {ctx.channel}: {e}")
+                    failed += 1
+
+            if deleted + failed + len(batch) >= amount:
+                break
+            await progress.update(f"Deleted {deleted} messages, looked through {scanned}...")
+
+        await flush_batch()
 
-        purged_messages = await ctx.channel.purge(limit=amount + 1)
         embed = discord.Embed(
-            description=f"**{ctx.author}** purged {len(purged_messages) - 1} messages from the server.",
-            color=SUCCESS_COLOR,
+            description=f"**{ctx.author}** purged {deleted} messages from the server.",
+            color=SUCCESS_COLOR if not failed else ERROR_COLOR,
         )
-        await ctx.send(embed=embed)
+        footer = f"Looked through {scanned} messages."
+        if failed:
+            footer += f" Failed to delete {failed} messages."
+        embed.set_footer(text=footer)
+        await progress.finish(embed)
 
 
 async def setup(bot: commands.Bot) -> None:
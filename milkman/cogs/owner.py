@@ -11,16 +11,31 @@ Commands:
     - say: Says something.
     - embed: Sends an embed.
     - listcogs: Lists all cogs.
+    - stats: Shows the invocations and latency percentiles of each command.
+    - profile: Profiles the bot for a few seconds.
+    - profile_stop: Stops the running profile early.
 """
 
-from typing import Literal
+import io
+import threading
+from typing import Literal, Optional
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 import logging
 
-from milkman.constants import SUCCESS_COLOR, ERROR_COLOR, OWNER_COG_NAME
+from milkman.constants import (
+    SUCCESS_COLOR,
+    ERROR_COLOR,
+    OWNER_COG_NAME,
+    PROFILER_INTERVAL,
+    PROFILER_MAX_DEPTH,
+    PROFILER_MAX_OVERHEAD,
+    PROFILER_MAX_SECONDS,
+)
+from milkman.util import parse_duration, truncate_text
+from milkman.util.profiler import SamplingProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +43,7 @@ logger = logging.getLogger(__name__)
 class Owner(commands.Cog, name=OWNER_COG_NAME):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.profiler: Optional[SamplingProfiler] = None
 
     @commands.command(name="sync", description="Synchronises the slash commands.")
     @app_commands.describe(
@@ -254,6 +270,119 @@ class Owner(commands.Cog, name=OWNER_COG_NAME):
         )
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(name="stats", description="Shows the invocations and latency percentiles of each command.")
+    @app_commands.describe(window="How far back to look, e.g. 5m, 1h or 1d.")
+    @commands.is_owner()
+    async def stats(self, ctx: Context, window: str = "1h") -> None:
+        """
+        Shows the invocations, errors, rate and p50/p95/p99 wall time of each command over a window.
+
+        Args:
+            ctx (Context): The context of the command.
+            window (str): How far back to look, defaulting to an hour.
+        """
+        delta = parse_duration(window)
+        metrics = self.bot.command_metrics
+        if delta is None or delta.total_seconds() > metrics.retention:
+            raise commands.BadArgument(
+                f"{window!r} is not a window, use e.g. 5m, 1h or 1d, up to {metrics.retention / 3600:.0f}h."
+            )
+
+        summaries = metrics.summary(delta.total_seconds())
+        if not summaries:
+            embed = discord.Embed(description=f"No commands were run in the last {window}.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.0f}"
+
+        lines = [f"{'command':<18}{'calls':>6}{'err':>5}{'/min':>6}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for summary in summaries:
+            lines.append(
+                f"{summary.name[:18]:<18}{summary.calls:>6}{summary.errors:>5}{summary.per_minute:>6.1f}"
+                f"{ms(summary.p50):>7}{ms(summary.p95):>7}{ms(summary.p99):>7}"
+            )
+        table = truncate_text("\n".join(lines), 4000)
+        embed = discord.Embed(
+            title=f"Command stats for the last {window}",
+            description=f"```{table}```",
+            color=SUCCESS_COLOR,
+        )
+        embed.set_footer(text="Wall time in ms, from after the checks passed until the command returned")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="profile", description="Profiles the bot for a few seconds.")
+    @app_commands.describe(seconds="How many seconds to profile for.")
+    @commands.is_owner()
+    async def profile(self, ctx: Context, seconds: commands.Range[int, 1, PROFILER_MAX_SECONDS] = 10) -> None:
+        """
+        Samples the stack of the event loop thread for a few seconds, then shows the functions it
+        spent the most time in and attaches the stacks in the collapsed format for flamegraphs.
+
+        Args:
+            ctx (Context): The context of the command.
+            seconds (int): How many seconds to profile for, defaulting to 10.
+        """
+        if self.profiler is not None:
+            embed = discord.Embed(description="A profile is already running.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        self.profiler = SamplingProfiler(
+            threading.get_ident(),
+            interval=PROFILER_INTERVAL,
+            max_overhead=PROFILER_MAX_OVERHEAD,
+            max_depth=PROFILER_MAX_DEPTH,
+        )
+        embed = discord.Embed(description=f"Profiling for {seconds} seconds...", color=SUCCESS_COLOR)
+        msg = await ctx.send(embed=embed)
+        try:
+            result = await self.profiler.run(seconds)
+        finally:
+            self.profiler = None
+
+        if not result.busy:
+            embed.description = f"The bot was idle in all {result.samples} samples."
+            await msg.edit(embed=embed)
+            return
+
+        lines = [f"{'own':>6}{'total':>7}  function"]
+        for function in result.top(15):
+            lines.append(
+                f"{function.own / result.busy:>6.1%}{function.total / result.busy:>7.1%}  {function.name}"
+            )
+        table = truncate_text("\n".join(lines), 4000)
+        embed = discord.Embed(
+            title=f"Profile of {result.duration:.1f} seconds",
+            description=f"```{table}```",
+            color=SUCCESS_COLOR,
+        )
+        embed.set_footer(
+            text=(
+                f"{result.samples} samples, {result.idle / result.samples:.0%} idle, "
+                f"{result.overhead:.1%} sampling overhead. Shares are of the busy samples."
+            )
+        )
+        file = discord.File(io.BytesIO(result.collapsed().encode()), filename="profile.collapsed.txt")
+        await ctx.send(embed=embed, file=file)
+
+    @commands.hybrid_command(name="profile_stop", description="Stops the running profile early.")
+    @commands.is_owner()
+    async def profile_stop(self, ctx: Context) -> None:
+        """
+        Stops the running profile early, its results are sent for the time it ran.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        if self.profiler is None:
+            embed = discord.Embed(description="No profile is running.", color=ERROR_COLOR)
+        else:
+            self.profiler.stop()
+            embed = discord.Embed(description="Stopped the profile.", color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
 
 async def setup(bot: commands.Bot) -> None:
     """
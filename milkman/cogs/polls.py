@@ -0,0 +1,515 @@
+"""
+This cog runs reaction polls and giveaways.
+
+Commands:
+    - poll: Start a poll that members vote on by reacting.
+    - giveaway: Start a giveaway that members enter by reacting.
+    - poll_end: End a poll or giveaway early.
+    - giveaway_reroll: Draw new winners for an ended giveaway.
+"""
+
+import logging
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+from discord.ext.commands import Context
+
+from milkman.constants import (
+    ERROR_COLOR,
+    GIVEAWAY_MAX_WINNERS,
+    POLLS_CHECKPOINT_INTERVAL,
+    POLLS_COG_NAME,
+    POLLS_EMBED_UPDATE_INTERVAL,
+    POLLS_MAX_OPTIONS,
+    SUCCESS_COLOR,
+)
+from milkman.util import parse_duration, truncate_text
+from milkman.util.action_scheduler import to_timestamp, utcnow_naive
+from milkman.util.models import Poll, ScheduledAction
+
+logger = logging.getLogger(__name__)
+
+OPTION_EMOJIS = ("1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟")
+GIVEAWAY_EMOJI = "🎉"
+
+
+class ActivePoll:
+    """
+    A running poll or giveaway, with the voters of each option and the votes not yet checkpointed.
+
+    The voters are kept as sets of user IDs, so a repeated reaction event is counted once and the
+    tally of an option is the size of its set.
+    """
+
+    __slots__ = ("poll", "emojis", "voters", "added", "removed", "changed")
+
+    def __init__(self, poll: Poll):
+        self.poll = poll
+        self.emojis = OPTION_EMOJIS[:len(self.options)] if poll.kind == "poll" else (GIVEAWAY_EMOJI,)
+        self.voters: List[Set[int]] = [set() for _ in self.emojis]
+        self.added: Set[Tuple[int, int]] = set()
+        self.removed: Set[Tuple[int, int]] = set()
+        self.changed = False
+
+    @property
+    def options(self) -> List[str]:
+        """The options of the poll, empty for giveaways."""
+        return self.poll.options.split("\n") if self.poll.options else []
+
+    def option(self, emoji: discord.PartialEmoji) -> Optional[int]:
+        """Get the option an emoji votes for, if any."""
+        if emoji.id is not None or emoji.name not in self.emojis:
+            return None
+        return self.emojis.index(emoji.name)
+
+    def vote(self, option: int, user_id: int) -> None:
+        """Count a vote, unless the user already voted for the option."""
+        voters = self.voters[option]
+        if user_id in voters:
+            return
+        voters.add(user_id)
+        if (option, user_id) in self.removed:
+            self.removed.discard((option, user_id))
+        else:
+            self.added.add((option, user_id))
+        self.changed = True
+
+    def unvote(self, option: int, user_id: int) -> None:
+        """Take back a vote, if the user voted for the option."""
+        voters = self.voters[option]
+        if user_id not in voters:
+            return
+        voters.discard(user_id)
+        if (option, user_id) in self.added:
+            self.added.discard((option, user_id))
+        else:
+            self.removed.add((option, user_id))
+        self.changed = True
+
+    def take_changes(self) -> Tuple[Set[Tuple[int, int]], Set[Tuple[int, int]]]:
+        """Get and reset the votes added and removed since the last checkpoint."""
+        added, removed = self.added, self.removed
+        self.added, self.removed = set(), set()
+        return added, removed
+
+    def restore_changes(self, added: Set[Tuple[int, int]], removed: Set[Tuple[int, int]]) -> None:
+        """Put back changes that failed to be checkpointed, under any changes made since."""
+        self.added |= {vote for vote in added if vote not in self.removed}
+        self.removed |= {vote for vote in removed if vote not in self.added}
+
+    def embed(self, ended: bool = False) -> discord.Embed:
+        """Build the results embed of the poll or giveaway."""
+        ends = f"<t:{int(to_timestamp(self.poll.ends_at))}:R>"
+        if self.poll.kind == "giveaway":
+            entrants = len(self.voters[0])
+            description = (
+                f"**{self.poll.title}**\n\n"
+                + (f"Ended {ends}." if ended else f"React with {GIVEAWAY_EMOJI} to enter! Ends {ends}.")
+                + f"\n\n**Winners:** {self.poll.winners}\n**Entrants:** {entrants}"
+            )
+            return discord.Embed(title="🎉 Giveaway", description=description, color=SUCCESS_COLOR)
+
+        total = sum(len(voters) for voters in self.voters)
+        lines = []
+        for emoji, option, voters in zip(self.emojis, self.options, self.voters):
+            share = len(voters) / total if total else 0.0
+            bar = "█" * round(share * 10) + "░" * (10 - round(share * 10))
+            lines.append(f"{emoji} {option}\n`{bar}` {len(voters)} ({share:.0%})")
+        lines.append(f"\n{total} votes, {'ended' if ended else 'ends'} {ends}.")
+        return discord.Embed(
+            title=f"📊 {truncate_text(self.poll.title, 250)}",
+            description=truncate_text("\n".join(lines), 4096),
+            color=SUCCESS_COLOR,
+        )
+
+
+class Polls(commands.Cog, name=POLLS_COG_NAME):
+    """
+    This cog runs polls and giveaways whose votes are the reactions on their message.
+
+    The votes are tallied in memory from the raw reaction events, so counting them never fetches
+    the reactions. The votes cast since the last checkpoint are written to the database
+    periodically and loaded again on startup, the results embed is edited at a throttled rate, and
+    giveaway winners are drawn from the entrants in memory. The end of each poll is a scheduled
+    action, so it survives restarts.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.polls: Dict[int, ActivePoll] = {}
+
+    async def cog_load(self) -> None:
+        """
+        Load the running polls and their votes, and start the checkpoint and embed update loops.
+        """
+        async with self.bot.get_db_service() as db:
+            polls = await db.polls.get_active_polls()
+            votes = await db.polls.get_votes([poll.id for poll in polls])
+
+        self.polls = {int(poll.message_id): ActivePoll(poll) for poll in polls}
+        by_id = {active.poll.id: active for active in self.polls.values()}
+        for poll_id, option, user_id in votes:
+            active = by_id.get(poll_id)
+            if active is not None and option < len(active.voters):
+                active.voters[option].add(user_id)
+        logger.info(f"Loaded {len(polls)} running polls with {len(votes)} votes")
+
+        self.bot.action_scheduler.register("end_poll", self.scheduled_end)
+        self.checkpoint_loop.start()
+        self.update_loop.start()
+
+    async def cog_unload(self) -> None:
+        """
+        Stop the loops and write the votes not yet checkpointed.
+        """
+        self.bot.action_scheduler.unregister("end_poll")
+        self.checkpoint_loop.cancel()
+        self.update_loop.cancel()
+        await self.checkpoint()
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
+        """
+        Count a vote.
+
+        Args:
+            payload (discord.RawReactionActionEvent): The raw event payload.
+        """
+        active = self.polls.get(payload.message_id)
+        if active is None or payload.user_id == self.bot.user.id:
+            return
+        if payload.member is not None and payload.member.bot:
+            return
+        option = active.option(payload.emoji)
+        if option is not None:
+            active.vote(option, payload.user_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent) -> None:
+        """
+        Take back a vote.
+
+        Args:
+            payload (discord.RawReactionActionEvent): The raw event payload.
+        """
+        active = self.polls.get(payload.message_id)
+        if active is None:
+            return
+        option = active.option(payload.emoji)
+        if option is not None:
+            active.unvote(option, payload.user_id)
+
+    async def checkpoint(self, polls: Optional[List[ActivePoll]] = None) -> None:
+        """
+        Write the votes cast since the last checkpoint to the database in one transaction.
+
+        Args:
+            polls (Optional[List[ActivePoll]]): The polls to checkpoint, all running polls by default.
+        """
+        changes = []
+        for active in polls if polls is not None else list(self.polls.values()):
+            if active.added or active.removed:
+                changes.append((active, *active.take_changes()))
+        if not changes:
+            return
+
+        try:
+            async with self.bot.get_db_service() as db:
+                for active, added, removed in changes:
+                    await db.polls.save_votes(active.poll.id, added, removed)
+        except Exception as e:
+            logger.error(f"Failed to checkpoint the votes of {len(changes)} polls: {e}")
+            for active, added, removed in changes:
+                active.restore_changes(added, removed)
+
+    @tasks.loop(seconds=POLLS_CHECKPOINT_INTERVAL)
+    async def checkpoint_loop(self) -> None:
+        """
+        Write the new votes periodically, so a crash loses at most one interval of votes.
+        """
+        await self.checkpoint()
+
+    @tasks.loop(seconds=POLLS_EMBED_UPDATE_INTERVAL)
+    async def update_loop(self) -> None:
+        """
+        Edit the results embed of every poll whose tally changed since the last edit.
+        """
+        for message_id, active in list(self.polls.items()):
+            if not active.changed:
+                continue
+            active.changed = False
+            channel = self.bot.get_channel(int(active.poll.channel_id))
+            if channel is None:
+                continue
+            try:
+                await channel.get_partial_message(message_id).edit(embed=active.embed())
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to update the results of poll {active.poll.id}: {e}")
+
+    @update_loop.before_loop
+    async def before_update_loop(self) -> None:
+        """
+        Wait for the bot to be ready before editing messages.
+        """
+        await self.bot.wait_until_ready()
+
+    async def scheduled_end(self, guild: discord.Guild, action: ScheduledAction) -> None:
+        """
+        End a poll or giveaway when its time is up.
+
+        Args:
+            guild (discord.Guild): The guild of the poll.
+            action (ScheduledAction): The scheduled end.
+        """
+        active = self.polls.get(int(action.target_id))
+        if active is not None:
+            await self.end(guild, active)
+
+    async def end(self, guild: discord.Guild, active: ActivePoll) -> None:
+        """
+        Stop counting the votes of a poll or giveaway, post the final results and draw the winners.
+
+        Args:
+            guild (discord.Guild): The guild of the poll.
+            active (ActivePoll): The poll.
+        """
+        message_id = int(active.poll.message_id)
+        self.polls.pop(message_id, None)
+        await self.checkpoint([active])
+        async with self.bot.get_db_service() as db:
+            await db.polls.end_poll(active.poll.id)
+
+        channel = guild.get_channel_or_thread(int(active.poll.channel_id))
+        if channel is None:
+            return
+        message = channel.get_partial_message(message_id)
+        try:
+            await message.edit(embed=active.embed(ended=True))
+        except discord.HTTPException as e:
+            # The poll has already ended in the database, so the winners are drawn regardless
+            logger.warning(f"Failed to post the final results of poll {active.poll.id}: {e}")
+
+        if active.poll.kind == "giveaway":
+            winners = await self.draw_winners(guild, active.voters[0], active.poll.winners)
+            try:
+                await self.announce_winners(message, active.poll, winners)
+            except discord.HTTPException as e:
+                logger.error(f"Failed to announce the winners of giveaway {active.poll.id}: {e}")
+
+    async def draw_winners(self, guild: discord.Guild, entrants: Set[int], count: int) -> List[discord.Member]:
+        """
+        Draw random winners from the entrants who are still members of the guild.
+
+        Only the drawn entrants are looked up, a few more than needed at a time, instead of every
+        entrant.
+
+        Args:
+            guild (discord.Guild): The guild of the giveaway.
+            entrants (Set[int]): The user IDs of the entrants.
+            count (int): The number of winners.
+
+        Returns:
+            List[discord.Member]: The winners, fewer than `count` if there are not enough entrants.
+        """
+        pool = list(entrants)
+        random.shuffle(pool)
+        winners: List[discord.Member] = []
+        while pool and len(winners) < count:
+            drawn = [pool.pop() for _ in range(min(len(pool), (count - len(winners)) * 2))]
+            members = await self.bot.member_resolver.resolve_many(guild, drawn)
+            winners.extend(members[user_id] for user_id in drawn if members[user_id] is not None)
+        return winners[:count]
+
+    @staticmethod
+    async def announce_winners(message: discord.PartialMessage, poll: Poll, winners: List[discord.Member]) -> None:
+        """Announce the winners of a giveaway in reply to its message, or on its own if the message is gone."""
+        if winners:
+            content = f"🎉 Congratulations {', '.join(winner.mention for winner in winners)}! You won **{poll.title}**!"
+        else:
+            content = f"Nobody entered the giveaway for **{poll.title}**."
+        await message.channel.send(
+            truncate_text(content, 2000),
+            reference=message.to_reference(fail_if_not_exists=False),
+            allowed_mentions=discord.AllowedMentions(users=True),
+        )
+
+    async def start(
+        self, ctx: Context, kind: str, duration: str, title: str, options: List[str], winners: int
+    ) -> None:
+        """
+        Post a poll or giveaway, save it, add its reactions and schedule its end.
+
+        Args:
+            ctx (Context): The context of the command.
+            kind (str): Either "poll" or "giveaway".
+            duration (str): How long the poll runs.
+            title (str): The question or the prize.
+            options (List[str]): The options of a poll.
+            winners (int): The number of winners of a giveaway.
+        """
+        # Adding the reactions alone can take longer than an interaction may go unanswered
+        await ctx.defer(ephemeral=True)
+
+        delta = parse_duration(duration)
+        if delta is None:
+            raise commands.BadArgument(f"{duration!r} is not a duration, use e.g. 30m, 12h or 7d.")
+
+        placeholder = Poll(
+            kind=kind, title=title, options="\n".join(options), winners=winners, ends_at=utcnow_naive() + delta
+        )
+        active = ActivePoll(placeholder)
+        message = await ctx.channel.send(embed=active.embed())
+
+        async with self.bot.get_db_service() as db:
+            poll = await db.polls.add_poll(
+                str(ctx.guild.id),
+                str(ctx.channel.id),
+                str(message.id),
+                str(ctx.author.id),
+                kind,
+                title,
+                options,
+                winners,
+                placeholder.ends_at,
+            )
+        active.poll = poll
+        self.polls[message.id] = active
+        await self.bot.action_scheduler.schedule(ctx.guild.id, "end_poll", message.id, delta, ctx.author.id)
+
+        for emoji in active.emojis:
+            await message.add_reaction(emoji)
+        if ctx.interaction is not None:
+            await ctx.send(f"Started the {kind}.", ephemeral=True)
+
+    async def find_poll(self, ctx: Context, message_link: str) -> Poll:
+        """Get a poll or giveaway of the guild from a link to its message or its message ID."""
+        message_id = message_link.rstrip("/").rsplit("/", 1)[-1]
+        if not message_id.isdigit():
+            raise commands.BadArgument(f"{message_link!r} is not a message link or ID.")
+        active = self.polls.get(int(message_id))
+        if active is not None and active.poll.guild_id == str(ctx.guild.id):
+            return active.poll
+        async with self.bot.get_db_service() as db:
+            poll = await db.polls.get_poll(message_id, str(ctx.guild.id))
+        if poll is None:
+            raise commands.BadArgument("That message is not a poll or giveaway of this server.")
+        return poll
+
+    @commands.hybrid_command(name="poll", description="Start a poll that members vote on by reacting.")
+    @app_commands.describe(
+        duration="How long the poll runs, e.g. 30m, 12h or 7d.",
+        question="The question of the poll.",
+        options="The options, separated by |.",
+    )
+    @commands.has_permissions(manage_messages=True)
+    @commands.bot_has_permissions(add_reactions=True, embed_links=True)
+    @commands.guild_only()
+    async def poll(self, ctx: Context, duration: str, question: str, *, options: str) -> None:
+        """
+        Start a poll that members vote on by reacting with the number of an option.
+
+        Args:
+            ctx (Context): The context of the command.
+            duration (str): How long the poll runs.
+            question (str): The question of the poll.
+            options (str): The options, separated by |.
+        """
+        choices = [option.strip() for option in options.split("|") if option.strip()]
+        if not 2 <= len(choices) <= POLLS_MAX_OPTIONS:
+            raise commands.BadArgument(f"A poll needs between 2 and {POLLS_MAX_OPTIONS} options, separated by |.")
+        await self.start(ctx, "poll", duration, question, [truncate_text(choice, 200) for choice in choices], 1)
+
+    @commands.hybrid_command(name="giveaway", description="Start a giveaway that members enter by reacting.")
+    @app_commands.describe(
+        duration="How long the giveaway runs, e.g. 30m, 12h or 7d.",
+        winners="The number of winners.",
+        prize="The prize of the giveaway.",
+    )
+    @commands.has_permissions(manage_guild=True)
+    @commands.bot_has_permissions(add_reactions=True, embed_links=True)
+    @commands.guild_only()
+    async def giveaway(
+        self, ctx: Context, duration: str, winners: commands.Range[int, 1, GIVEAWAY_MAX_WINNERS], *, prize: str
+    ) -> None:
+        """
+        Start a giveaway that members enter by reacting.
+
+        Args:
+            ctx (Context): The context of the command.
+            duration (str): How long the giveaway runs.
+            winners (int): The number of winners.
+            prize (str): The prize of the giveaway.
+        """
+        await self.start(ctx, "giveaway", duration, truncate_text(prize, 1000), [], winners)
+
+    @commands.hybrid_command(name="poll_end", description="End a poll or giveaway early.")
+    @app_commands.describe(message_link="A link to the message of the poll or giveaway.")
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def poll_end(self, ctx: Context, message_link: str) -> None:
+        """
+        End a poll or giveaway early.
+
+        Args:
+            ctx (Context): The context of the command.
+            message_link (str): A link to the message of the poll or giveaway.
+        """
+        poll = await self.find_poll(ctx, message_link)
+        active = self.polls.get(int(poll.message_id))
+        if active is None:
+            embed = discord.Embed(description="That poll has already ended.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        await self.bot.action_scheduler.cancel(ctx.guild.id, "end_poll", int(poll.message_id))
+        await self.end(ctx.guild, active)
+        embed = discord.Embed(description=f"Ended the {poll.kind}.", color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="giveaway_reroll", description="Draw new winners for an ended giveaway.")
+    @app_commands.describe(
+        message_link="A link to the message of the giveaway.",
+        winners="The number of winners to draw.",
+    )
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def giveaway_reroll(
+        self, ctx: Context, message_link: str, winners: commands.Range[int, 1, GIVEAWAY_MAX_WINNERS] = 1
+    ) -> None:
+        """
+        Draw new winners for an ended giveaway from its saved entrants.
+
+        Args:
+            ctx (Context): The context of the command.
+            message_link (str): A link to the message of the giveaway.
+            winners (int): The number of winners to draw, defaulting to 1.
+        """
+        await ctx.defer(ephemeral=True)
+
+        poll = await self.find_poll(ctx, message_link)
+        if poll.kind != "giveaway" or int(poll.message_id) in self.polls:
+            raise commands.BadArgument("Only giveaways that have ended can be rerolled.")
+
+        async with self.bot.get_db_service() as db:
+            votes = await db.polls.get_votes([poll.id])
+        drawn = await self.draw_winners(ctx.guild, {user_id for _, _, user_id in votes}, winners)
+
+        channel = ctx.guild.get_channel_or_thread(int(poll.channel_id))
+        if channel is None:
+            raise commands.BadArgument("The channel of that giveaway no longer exists.")
+        await self.announce_winners(channel.get_partial_message(int(poll.message_id)), poll, drawn)
+        if ctx.interaction is not None:
+            await ctx.send("Rerolled the giveaway.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    """
+    Set up the Polls cog.
+
+    Args:
+        bot (commands.Bot): The bot instance.
+    """
+    await bot.add_cog(Polls(bot))
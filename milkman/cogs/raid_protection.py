@@ -0,0 +1,347 @@
+"""
+This cog detects raids from member joins and messages and reacts to them.
+
+Commands:
+    - raidconfig: Configure raid protection for the server.
+    - lockdown: Pause invites to the server, optionally for a while.
+    - unlock: Resume invites to the server.
+"""
+
+import logging
+import re
+import time
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from milkman.constants import (
+    ERROR_COLOR,
+    RAID_ACTION_COOLDOWN,
+    RAID_ACTIONS,
+    RAID_DUPLICATE_MIN_LENGTH,
+    RAID_DUPLICATE_THRESHOLD,
+    RAID_DUPLICATE_WINDOW,
+    RAID_JOIN_THRESHOLD,
+    RAID_JOIN_WINDOW,
+    RAID_PROTECTION_COG_NAME,
+    RAID_SLOWMODE_DELAY,
+    SUCCESS_COLOR,
+)
+from milkman.util import parse_duration
+from milkman.util.action_scheduler import to_timestamp
+from milkman.util.models import RaidProtectionSettings, ScheduledAction
+from milkman.util.sliding_window import DuplicateTracker, SlidingWindowCounter
+
+logger = logging.getLogger(__name__)
+
+VALID_ACTIONS = ("alert", "slowmode", "lockdown")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+class RaidConfigFlags(commands.FlagConverter):
+    """
+    Changes to the raid protection settings, e.g. `enabled: yes join_threshold: 15 actions: alert,lockdown`.
+    """
+
+    enabled: Optional[bool] = commands.flag(default=None, description="Whether raid protection is enabled.")
+    join_threshold: Optional[int] = commands.flag(default=None, description="Joins within the window that count as a raid.")
+    join_window: Optional[int] = commands.flag(default=None, description="The join window in seconds.")
+    duplicate_threshold: Optional[int] = commands.flag(
+        default=None, description="Accounts posting the same message within the window that count as a raid."
+    )
+    duplicate_window: Optional[int] = commands.flag(default=None, description="The duplicate message window in seconds.")
+    actions: Optional[str] = commands.flag(
+        default=None, description="Comma separated actions to take: alert, slowmode, lockdown."
+    )
+    slowmode_delay: Optional[int] = commands.flag(default=None, description="The slowmode delay in seconds.")
+    alert_channel: Optional[discord.TextChannel] = commands.flag(default=None, description="The channel to send alerts to.")
+
+
+class GuildRaidState:
+    """
+    The settings and sliding-window counters of a guild.
+    """
+
+    __slots__ = ("settings", "actions", "joins", "duplicates", "last_triggered")
+
+    def __init__(self, settings: RaidProtectionSettings):
+        self.settings = settings
+        self.actions = frozenset(action for action in settings.actions.split(",") if action)
+        self.joins = SlidingWindowCounter(settings.join_window)
+        self.duplicates = DuplicateTracker(settings.duplicate_window)
+        self.last_triggered: dict[str, float] = {}
+
+    def should_trigger(self, kind: str, now: float) -> bool:
+        """Check whether a kind of raid is off cooldown and start the cooldown if it is."""
+        if now - self.last_triggered.get(kind, 0.0) < RAID_ACTION_COOLDOWN:
+            return False
+        self.last_triggered[kind] = now
+        return True
+
+
+def default_settings(guild_id: int) -> RaidProtectionSettings:
+    """Create the default raid protection settings of a guild."""
+    return RaidProtectionSettings(
+        guild_id=str(guild_id),
+        enabled=False,
+        join_threshold=RAID_JOIN_THRESHOLD,
+        join_window=RAID_JOIN_WINDOW,
+        duplicate_threshold=RAID_DUPLICATE_THRESHOLD,
+        duplicate_window=RAID_DUPLICATE_WINDOW,
+        actions=",".join(RAID_ACTIONS),
+        slowmode_delay=RAID_SLOWMODE_DELAY,
+        alert_channel_id=None,
+    )
+
+
+def copy_settings(settings: RaidProtectionSettings, **changes) -> RaidProtectionSettings:
+    """Copy raid protection settings with some values changed, leaving the original untouched."""
+    values = {column.key: getattr(settings, column.key) for column in RaidProtectionSettings.__table__.columns}
+    return RaidProtectionSettings(**{**values, **changes})
+
+
+class RaidProtection(commands.Cog, name=RAID_PROTECTION_COG_NAME):
+    """
+    This cog detects join floods and duplicate message bursts across accounts and reacts to them.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.guilds: dict[int, GuildRaidState] = {}
+
+    async def cog_load(self) -> None:
+        """
+        Load the raid protection settings of every guild.
+        """
+        async with self.bot.get_db_service() as db:
+            all_settings = await db.raid_protection.get_all_settings()
+
+        self.guilds = {int(settings.guild_id): GuildRaidState(settings) for settings in all_settings}
+        self.bot.action_scheduler.register("unlock", self.scheduled_unlock)
+
+    async def cog_unload(self) -> None:
+        """
+        Unregister the scheduled unlock handler, scheduled unlocks wait until the cog is loaded again.
+        """
+        self.bot.action_scheduler.unregister("unlock")
+
+    async def scheduled_unlock(self, guild: discord.Guild, action: ScheduledAction) -> None:
+        """
+        Resume invites at the end of a timed lockdown.
+
+        Args:
+            guild (discord.Guild): The guild in lockdown.
+            action (ScheduledAction): The scheduled unlock.
+        """
+        await guild.edit(invites_disabled=False, reason="Lockdown expired")
+        logger.info(f"Lifted the lockdown of {guild}")
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        """
+        Count the join and react if the joins within the window reach the threshold.
+
+        Args:
+            member (discord.Member): The member who joined.
+        """
+        state = self.guilds.get(member.guild.id)
+        if state is None or not state.settings.enabled:
+            return
+
+        now = time.monotonic()
+        joins = state.joins.add(now)
+        if joins >= state.settings.join_threshold and state.should_trigger("join", now):
+            await self.respond(
+                member.guild,
+                state,
+                f"{joins} members joined within {state.settings.join_window} seconds.",
+                channel=None,
+            )
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """
+        Count the message content and react if enough accounts posted it within the window.
+
+        Args:
+            message (discord.Message): The message that was sent.
+        """
+        if message.guild is None or message.author.bot:
+            return
+
+        state = self.guilds.get(message.guild.id)
+        if state is None or not state.settings.enabled or len(message.content) < RAID_DUPLICATE_MIN_LENGTH:
+            return
+
+        now = time.monotonic()
+        key = hash(WHITESPACE_REGEX.sub(" ", message.content.lower()).strip())
+        authors = state.duplicates.add(now, key, message.author.id)
+        if authors >= state.settings.duplicate_threshold and state.should_trigger("duplicate", now):
+            state.duplicates.forget(key)
+            await self.respond(
+                message.guild,
+                state,
+                f"{authors} accounts posted the same message within {state.settings.duplicate_window} seconds "
+                f"in {message.channel.mention}.",
+                channel=message.channel,
+            )
+
+    async def respond(
+        self,
+        guild: discord.Guild,
+        state: GuildRaidState,
+        description: str,
+        channel: Optional[discord.abc.Messageable],
+    ) -> None:
+        """
+        Take the configured actions against a detected raid.
+
+        Args:
+            guild (discord.Guild): The guild being raided.
+            state (GuildRaidState): The raid protection state of the guild.
+            description (str): What was detected.
+            channel (Optional[discord.abc.Messageable]): The channel the raid happened in, if any.
+        """
+        logger.warning(f"Raid detected in {guild.name} (ID: {guild.id}): {description}")
+        taken = []
+
+        if "lockdown" in state.actions:
+            try:
+                await guild.edit(invites_disabled=True, reason="Raid detected")
+                taken.append("paused invites")
+            except discord.HTTPException as e:
+                logger.error(f"Failed to pause invites in {guild.name}: {e}")
+
+        if "slowmode" in state.actions and isinstance(channel, discord.TextChannel):
+            try:
+                await channel.edit(slowmode_delay=state.settings.slowmode_delay, reason="Raid detected")
+                taken.append(f"enabled a {state.settings.slowmode_delay}s slowmode in {channel.mention}")
+            except discord.HTTPException as e:
+                logger.error(f"Failed to enable slowmode in {channel}: {e}")
+
+        if "alert" in state.actions:
+            alert_channel = None
+            if state.settings.alert_channel_id is not None:
+                alert_channel = guild.get_channel(int(state.settings.alert_channel_id))
+            alert_channel = alert_channel or guild.system_channel
+
+            if alert_channel is not None:
+                embed = discord.Embed(title="🚨 Raid Detected", description=description, color=ERROR_COLOR)
+                embed.set_footer(text=f"Actions taken: {', '.join(taken) if taken else 'none'}")
+                try:
+                    await alert_channel.send(embed=embed)
+                except discord.HTTPException as e:
+                    logger.error(f"Failed to send raid alert in {guild.name}: {e}")
+
+    @commands.hybrid_command(name="raidconfig", description="Configure raid protection for the server.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def raidconfig(self, ctx: Context, *, flags: RaidConfigFlags) -> None:
+        """
+        Configure raid protection for the server, showing the current settings when nothing is changed.
+
+        Args:
+            ctx (Context): The context of the command.
+            flags (RaidConfigFlags): The settings to change.
+        """
+        state = self.guilds.get(ctx.guild.id)
+        current = state.settings if state is not None else default_settings(ctx.guild.id)
+
+        # Validate every change before touching the settings the listeners are using
+        changes = {}
+        if flags.actions is not None:
+            actions = [action.strip().lower() for action in flags.actions.split(",") if action.strip()]
+            invalid = [action for action in actions if action not in VALID_ACTIONS]
+            if invalid:
+                raise commands.BadArgument(
+                    f"Unknown actions: {', '.join(invalid)}. Valid actions are: {', '.join(VALID_ACTIONS)}."
+                )
+            changes["actions"] = ",".join(actions)
+
+        for name in ("join_threshold", "join_window", "duplicate_threshold", "duplicate_window", "slowmode_delay"):
+            value = getattr(flags, name)
+            if value is not None:
+                if value < 1:
+                    raise commands.BadArgument(f"{name} must be at least 1.")
+                changes[name] = value
+
+        if flags.enabled is not None:
+            changes["enabled"] = flags.enabled
+        if flags.alert_channel is not None:
+            changes["alert_channel_id"] = str(flags.alert_channel.id)
+
+        settings = copy_settings(current, **changes)
+        async with self.bot.get_db_service() as db:
+            settings = await db.raid_protection.save_settings(settings)
+        self.guilds[ctx.guild.id] = GuildRaidState(settings)
+
+        embed = discord.Embed(title="Raid Protection", color=SUCCESS_COLOR)
+        embed.add_field(name="Enabled", value="Yes" if settings.enabled else "No")
+        embed.add_field(name="Join Flood", value=f"{settings.join_threshold} joins in {settings.join_window}s")
+        embed.add_field(
+            name="Duplicate Messages",
+            value=f"{settings.duplicate_threshold} accounts in {settings.duplicate_window}s",
+        )
+        embed.add_field(name="Actions", value=settings.actions.replace(",", ", ") or "None")
+        embed.add_field(name="Slowmode Delay", value=f"{settings.slowmode_delay}s")
+        embed.add_field(
+            name="Alert Channel",
+            value=f"<#{settings.alert_channel_id}>" if settings.alert_channel_id else "System channel",
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="lockdown", description="Pause invites to the server.")
+    @app_commands.describe(duration="How long to pause invites for, e.g. 30m or 2h. Until unlocked if omitted.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.bot_has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def lockdown(self, ctx: Context, duration: Optional[str] = None) -> None:
+        """
+        Pause invites to the server, resuming them automatically after the duration if one is given.
+
+        Args:
+            ctx (Context): The context of the command.
+            duration (Optional[str]): How long to pause invites for.
+        """
+        delta = parse_duration(duration) if duration is not None else None
+        if duration is not None and delta is None:
+            raise commands.BadArgument(f"{duration!r} is not a duration, use e.g. 30m or 2h.")
+
+        await ctx.guild.edit(invites_disabled=True, reason=f"Lockdown by {ctx.author}")
+        if delta is not None:
+            action = await self.bot.action_scheduler.schedule(ctx.guild.id, "unlock", ctx.guild.id, delta, ctx.author.id)
+            description = f"Invites to the server are paused until <t:{int(to_timestamp(action.due_at))}:f>."
+        else:
+            await self.bot.action_scheduler.cancel(ctx.guild.id, "unlock", ctx.guild.id)
+            description = "Invites to the server are paused."
+        embed = discord.Embed(description=description, color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="unlock", description="Resume invites to the server.")
+    @commands.has_permissions(manage_guild=True)
+    @commands.bot_has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def unlock(self, ctx: Context) -> None:
+        """
+        Resume invites to the server, cancelling a scheduled unlock.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        await ctx.guild.edit(invites_disabled=False, reason=f"Unlock by {ctx.author}")
+        await self.bot.action_scheduler.cancel(ctx.guild.id, "unlock", ctx.guild.id)
+        embed = discord.Embed(description="Invites to the server are resumed.", color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
+
+async def setup(bot: commands.Bot) -> None:
+    """
+    Set up the RaidProtection cog.
+
+    Args:
+        bot (commands.Bot): The bot instance.
+    """
+    await bot.add_cog(RaidProtection(bot))
@@ -1,15 +1,376 @@
+"""
+This cog gives members roles for reacting to messages.
+
+Commands:
+    - reactionrole_add: Give a role to members who react to a message with an emoji.
+    - reactionrole_remove: Stop giving a role for a reaction on a message.
+    - reactionrole_list: List the reaction roles of the server.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Union
+
+import discord
+from discord import app_commands
 from discord.ext import commands
+from discord.ext.commands import Context
+
+from milkman.constants import (
+    ERROR_COLOR,
+    REACTION_ROLES_COALESCE_WINDOW,
+    REACTION_ROLES_COG_NAME,
+    REACTION_ROLES_CONCURRENCY,
+    REACTION_ROLES_EDIT_RATE_LIMIT,
+    REACTION_ROLES_RECONCILE_CONCURRENCY,
+    SUCCESS_COLOR,
+)
+from milkman.util import truncate_text
+from milkman.util.role_updates import RoleUpdateCoalescer
 
-from milkman.constants import REACTION_ROLES_COG_NAME
+logger = logging.getLogger(__name__)
+
+
+def emoji_key(emoji: Union[discord.PartialEmoji, discord.Emoji, str]) -> str:
+    """Get the key of an emoji in the index, its ID for custom emojis and the emoji itself otherwise."""
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return str(emoji.id) if emoji.id else emoji.name
+
+
+class BoundMessage:
+    """
+    A message with reaction roles, and the role each emoji on it gives.
+    """
+
+    __slots__ = ("guild_id", "channel_id", "roles")
+
+    def __init__(self, guild_id: int, channel_id: int):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.roles: dict[str, int] = {}
 
 
 class ReactionRoles(commands.Cog, name=REACTION_ROLES_COG_NAME):
     """
     This cog handles adding and removing reaction roles to a message so that users can react to a message to get a role.
+
+    The bindings are held in memory as a message ID -> emoji -> role ID index, so reactions on any
+    other message are rejected with a single dict lookup. The raw reaction events are used, so
+    reactions on messages that are not in the message cache are handled too.
+
+    Role changes are coalesced per member, so a burst of reactions costs one request per member.
+    Reactions added while the bot was offline are picked up by a reconciliation on startup.
     """
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.messages: dict[int, BoundMessage] = {}
+        self.role_updates = RoleUpdateCoalescer(
+            bot,
+            window=REACTION_ROLES_COALESCE_WINDOW,
+            limit=REACTION_ROLES_EDIT_RATE_LIMIT,
+            max_concurrency=REACTION_ROLES_CONCURRENCY,
+        )
+        self.reconcile_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        """
+        Load the reaction role bindings into the index and start the reconciliation in the background.
+        """
+        async with self.bot.get_db_service() as db:
+            bindings = await db.reaction_roles.get_all_bindings()
+
+        self.messages = {}
+        for binding in bindings:
+            self.bind(int(binding.guild_id), int(binding.channel_id), int(binding.message_id), binding.emoji, int(binding.role_id))
+        logger.info(f"Loaded {len(bindings)} reaction roles on {len(self.messages)} messages")
+        self.role_updates.start()
+        self.reconcile_task = asyncio.create_task(self.reconcile())
+
+    async def cog_unload(self) -> None:
+        """
+        Stop the reconciliation and apply the pending role changes.
+        """
+        if self.reconcile_task is not None:
+            self.reconcile_task.cancel()
+        await self.role_updates.stop()
+
+    async def reconcile(self) -> None:
+        """
+        Give the roles of reactions that were added while the bot was offline.
+
+        The reactors of every bound message are paged through a few messages at a time, and the
+        roles are only requested for members who do not have them yet, through the coalescer so
+        that members with several missed reactions get one edit and the requests are paced.
+        Roles are not taken away from members without a reaction, as they may have been given
+        the role another way.
+        """
+        await self.bot.wait_until_ready()
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(REACTION_ROLES_RECONCILE_CONCURRENCY)
+
+        async def reconcile_message(message_id: int, bound: BoundMessage) -> int:
+            async with semaphore:
+                try:
+                    return await self.reconcile_message(message_id, bound)
+                except discord.HTTPException as e:
+                    logger.warning(f"Failed to reconcile the reaction roles of message {message_id}: {e}")
+                    return 0
+
+        messages = list(self.messages.items())
+        queued = await asyncio.gather(*(reconcile_message(message_id, bound) for message_id, bound in messages))
+        logger.info(
+            f"Reconciled {len(messages)} reaction role messages in {time.perf_counter() - started:.1f}s, "
+            f"{sum(queued)} missed roles queued"
+        )
+
+    async def reconcile_message(self, message_id: int, bound: BoundMessage) -> int:
+        """
+        Queue the roles missing from the members who reacted to a bound message.
+
+        Args:
+            message_id (int): The ID of the message.
+            bound (BoundMessage): The bindings of the message.
+
+        Returns:
+            int: The number of roles queued.
+        """
+        guild = self.bot.get_guild(bound.guild_id)
+        channel = guild.get_channel_or_thread(bound.channel_id) if guild is not None else None
+        if channel is None:
+            return 0
+
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            # Deleted while the bot was offline
+            self.messages.pop(message_id, None)
+            async with self.bot.get_db_service() as db:
+                await db.reaction_roles.remove_message_bindings(str(message_id))
+            return 0
+
+        queued = 0
+        for reaction in message.reactions:
+            role_id = bound.roles.get(emoji_key(reaction.emoji))
+            role = guild.get_role(role_id) if role_id is not None else None
+            if role is None:
+                continue
+
+            user_ids = [user.id async for user in reaction.users(limit=None) if not user.bot]
+            members = await self.bot.member_resolver.resolve_many(guild, user_ids)
+            for member in members.values():
+                if member is not None and role not in member.roles:
+                    self.role_updates.request(guild.id, member.id, role.id, True, member)
+                    queued += 1
+        return queued
+
+    def bind(self, guild_id: int, channel_id: int, message_id: int, emoji: str, role_id: int) -> None:
+        """Add a binding to the index."""
+        message = self.messages.get(message_id)
+        if message is None:
+            message = self.messages[message_id] = BoundMessage(guild_id, channel_id)
+        message.roles[emoji] = role_id
+
+    def unbind(self, message_id: int, emoji: str) -> None:
+        """Remove a binding from the index."""
+        message = self.messages.get(message_id)
+        if message is None:
+            return
+        message.roles.pop(emoji, None)
+        if not message.roles:
+            del self.messages[message_id]
+
+    def bound_role(self, payload: discord.RawReactionActionEvent) -> Optional[discord.Role]:
+        """
+        Get the role a reaction gives, if any.
+
+        Args:
+            payload (discord.RawReactionActionEvent): The raw reaction event payload.
+
+        Returns:
+            Optional[discord.Role]: The role, or None if the reaction is not bound to one.
+        """
+        message = self.messages.get(payload.message_id)
+        if message is None:
+            return None
+        role_id = message.roles.get(emoji_key(payload.emoji))
+        if role_id is None or payload.user_id == self.bot.user.id:
+            return None
+        guild = self.bot.get_guild(message.guild_id)
+        return guild.get_role(role_id) if guild is not None else None
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
+        """
+        Queue giving the role bound to the reaction.
+
+        Args:
+            payload (discord.RawReactionActionEvent): The raw event payload.
+        """
+        role = self.bound_role(payload)
+        if role is None or (payload.member is not None and payload.member.bot):
+            return
+        self.role_updates.request(role.guild.id, payload.user_id, role.id, True, payload.member)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent) -> None:
+        """
+        Queue taking away the role bound to the reaction.
+
+        Args:
+            payload (discord.RawReactionActionEvent): The raw event payload.
+        """
+        role = self.bound_role(payload)
+        if role is None:
+            return
+        self.role_updates.request(role.guild.id, payload.user_id, role.id, False)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        """
+        Remove the bindings of a deleted message.
+
+        Args:
+            payload (discord.RawMessageDeleteEvent): The raw event payload.
+        """
+        if self.messages.pop(payload.message_id, None) is None:
+            return
+        async with self.bot.get_db_service() as db:
+            await db.reaction_roles.remove_message_bindings(str(payload.message_id))
+
+    @staticmethod
+    async def fetch_message(ctx: Context, message_link: str) -> discord.Message:
+        """Get a message from a link, a channel-message ID pair or an ID in the current channel."""
+        try:
+            return await commands.MessageConverter().convert(ctx, message_link)
+        except commands.BadArgument:
+            raise commands.BadArgument(f"Could not find the message {message_link!r}, use a message link.")
+
+    @commands.hybrid_command(
+        name="reactionrole_add", description="Give a role to members who react to a message with an emoji."
+    )
+    @app_commands.describe(
+        message_link="A link to the message.",
+        emoji="The emoji to react with.",
+        role="The role to give.",
+    )
+    @commands.has_permissions(manage_roles=True)
+    @commands.bot_has_permissions(manage_roles=True, add_reactions=True)
+    @commands.guild_only()
+    async def reactionrole_add(self, ctx: Context, message_link: str, emoji: str, role: discord.Role) -> None:
+        """
+        Give a role to members who react to a message with an emoji.
+
+        Args:
+            ctx (Context): The context of the command.
+            message_link (str): A link to the message.
+            emoji (str): The emoji to react with.
+            role (discord.Role): The role to give.
+        """
+        message = await self.fetch_message(ctx, message_link)
+        if message.guild != ctx.guild:
+            raise commands.BadArgument("The message must be in this server.")
+        if role.is_default() or role.managed:
+            raise commands.BadArgument("That role cannot be given to members.")
+        if role >= ctx.me.top_role:
+            raise commands.BadArgument("That role is higher than or equal to my highest role.")
+        if ctx.author.id != ctx.guild.owner_id and role >= ctx.author.top_role:
+            raise commands.BadArgument("That role is higher than or equal to your highest role.")
+
+        partial_emoji = discord.PartialEmoji.from_str(emoji.strip())
+        try:
+            await message.add_reaction(partial_emoji)
+        except discord.HTTPException:
+            raise commands.BadArgument(f"I cannot react with {emoji}, use an emoji from this server or a standard one.")
+
+        key = emoji_key(partial_emoji)
+        async with self.bot.get_db_service() as db:
+            await db.reaction_roles.set_binding(
+                str(ctx.guild.id), str(message.channel.id), str(message.id), key, str(role.id)
+            )
+        self.bind(ctx.guild.id, message.channel.id, message.id, key, role.id)
+
+        embed = discord.Embed(
+            description=f"Reacting with {partial_emoji} on [the message]({message.jump_url}) now gives {role.mention}.",
+            color=SUCCESS_COLOR,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="reactionrole_remove", description="Stop giving a role for a reaction on a message."
+    )
+    @app_commands.describe(
+        message_link="A link to the message.",
+        emoji="The emoji of the reaction role.",
+    )
+    @commands.has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def reactionrole_remove(self, ctx: Context, message_link: str, emoji: str) -> None:
+        """
+        Stop giving a role for a reaction on a message.
+
+        Args:
+            ctx (Context): The context of the command.
+            message_link (str): A link to the message.
+            emoji (str): The emoji of the reaction role.
+        """
+        message = await self.fetch_message(ctx, message_link)
+        key = emoji_key(emoji.strip())
+        async with self.bot.get_db_service() as db:
+            removed = await db.reaction_roles.remove_binding(str(message.id), key, str(ctx.guild.id))
+
+        if not removed:
+            embed = discord.Embed(description=f"{emoji} on that message gives no role.", color=ERROR_COLOR)
+            await ctx.send(embed=embed)
+            return
+
+        self.unbind(message.id, key)
+        try:
+            await message.remove_reaction(discord.PartialEmoji.from_str(emoji.strip()), ctx.me)
+        except discord.HTTPException:
+            pass
+        embed = discord.Embed(description=f"Removed the reaction role {emoji}.", color=SUCCESS_COLOR)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="reactionrole_list", description="List the reaction roles of the server.")
+    @commands.has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def reactionrole_list(self, ctx: Context) -> None:
+        """
+        List the reaction roles of the server.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        lines = []
+        for message_id, message in self.messages.items():
+            if message.guild_id != ctx.guild.id:
+                continue
+            link = f"https://discord.com/channels/{message.guild_id}/{message.channel_id}/{message_id}"
+            roles = ", ".join(
+                f"{f'<:_:{emoji}>' if emoji.isdigit() else emoji} → <@&{role_id}>"
+                for emoji, role_id in message.roles.items()
+            )
+            lines.append(f"• [Message]({link}): {roles}")
+
+        if not lines:
+            embed = discord.Embed(description="This server has no reaction roles.", color=ERROR_COLOR)
+        else:
+            embed = discord.Embed(
+                title="Reaction Roles",
+                description=truncate_text("\n".join(lines), 4096),
+                color=SUCCESS_COLOR,
+            )
+            stats = self.role_updates.stats
+            embed.set_footer(
+                text=(
+                    f"{stats.events} reaction events applied with {stats.requests} requests "
+                    f"({stats.saved} saved, throttled {stats.throttled} times for {stats.throttled_seconds:.1f}s)"
+                )
+            )
+        await ctx.send(embed=embed)
 
 
 async def setup(bot: commands.Bot) -> None:
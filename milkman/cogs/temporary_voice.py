@@ -1,17 +1,236 @@
 """
 This cog contains the interaction for creating a temporary voice channel.
+
+Commands:
+    - voicestats: Show temporary voice channel usage for the server.
 """
 
 import asyncio
+import bisect
 import logging
+import time
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple, Optional
 
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
+from discord.ext.commands import Context
 
-from milkman.constants import TEMPORARY_VOICE_COG_NAME, TEMPORARY_VOICE_CHANNEL_NAME
+from milkman.constants import (
+    SUCCESS_COLOR,
+    TEMPORARY_VOICE_ANALYTICS_FLUSH_INTERVAL,
+    TEMPORARY_VOICE_COG_NAME,
+    TEMPORARY_VOICE_CHANNEL_NAME,
+    TEMPORARY_VOICE_DELETE_BATCH_WINDOW,
+    TEMPORARY_VOICE_DELETE_GRACE_PERIOD,
+    TEMPORARY_VOICE_CREATE_RATE_LIMIT,
+    TEMPORARY_VOICE_DELETE_RATE_LIMIT,
+    TEMPORARY_VOICE_EDIT_RATE_LIMIT,
+    TEMPORARY_VOICE_LIFETIME_BUCKETS,
+    TEMPORARY_VOICE_OPERATION_CONCURRENCY,
+    TEMPORARY_VOICE_POOL_CHANNEL_NAME,
+    TEMPORARY_VOICE_POOL_LOW_WATERMARK,
+    TEMPORARY_VOICE_POOL_SIZE,
+    TEMPORARY_VOICE_SWEEP_INTERVAL,
+)
+from milkman.util.action_scheduler import to_timestamp
+from milkman.util.channel_queue import ChannelOperation, ChannelOperationQueue
+from milkman.util.models import TemporaryChannel
+from milkman.util.scheduler import DeadlineScheduler
 
 logger = logging.getLogger(__name__)
 
+
+class SweepReport(NamedTuple):
+    """The outcome of a temporary channel reconciliation sweep."""
+
+    duration: float
+    tracked: int
+    missing: int
+    deleted: int
+    failed: int
+
+
+class TrackedChannel:
+    """
+    The in-memory state of a tracked temporary voice channel.
+    """
+
+    __slots__ = ("channel_id", "guild_id", "owner_id", "created_at", "empty_since")
+
+    def __init__(
+        self,
+        channel_id: int,
+        guild_id: int,
+        owner_id: int,
+        created_at: float,
+        empty_since: Optional[float] = None,
+    ):
+        """
+        Args:
+            channel_id (int): The ID of the voice channel.
+            guild_id (int): The ID of the guild the channel belongs to.
+            owner_id (int): The ID of the member who created the channel.
+            created_at (float): The UNIX timestamp at which the channel was created.
+            empty_since (Optional[float]): The UNIX timestamp at which the channel was last left empty,
+                or None if it is occupied.
+        """
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.owner_id = owner_id
+        self.created_at = created_at
+        self.empty_since = empty_since
+
+    @classmethod
+    def from_model(cls, temporary_channel: TemporaryChannel) -> "TrackedChannel":
+        """Create the state record of a temporary channel row loaded from the database."""
+        created_at = temporary_channel.created_at
+        return cls(
+            channel_id=int(temporary_channel.channel_id),
+            guild_id=int(temporary_channel.guild_id),
+            owner_id=int(temporary_channel.creator_id),
+            created_at=to_timestamp(created_at) if created_at else time.time(),
+        )
+
+
+class ChannelRegistry:
+    """
+    The tracked temporary channels, indexed by channel ID and by guild ID.
+    """
+
+    def __init__(self):
+        self._channels: dict[int, TrackedChannel] = {}
+        self._by_guild: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._channels
+
+    def __iter__(self) -> Iterator[TrackedChannel]:
+        return iter(list(self._channels.values()))
+
+    def get(self, channel_id: int) -> Optional[TrackedChannel]:
+        """Get the state of a tracked channel."""
+        return self._channels.get(channel_id)
+
+    def in_guild(self, guild_id: int) -> list[TrackedChannel]:
+        """Get the tracked channels of a guild."""
+        return [self._channels[channel_id] for channel_id in self._by_guild.get(guild_id, ())]
+
+    def add(self, tracked: TrackedChannel) -> None:
+        """Start tracking a channel, replacing any existing state for it."""
+        self.remove(tracked.channel_id)
+        self._channels[tracked.channel_id] = tracked
+        self._by_guild.setdefault(tracked.guild_id, set()).add(tracked.channel_id)
+
+    def remove(self, channel_id: int) -> Optional[TrackedChannel]:
+        """Stop tracking a channel and return its state, if it was tracked."""
+        tracked = self._channels.pop(channel_id, None)
+        if tracked is not None:
+            guild_channels = self._by_guild[tracked.guild_id]
+            guild_channels.discard(channel_id)
+            if not guild_channels:
+                del self._by_guild[tracked.guild_id]
+        return tracked
+
+
+class HourlyUsage:
+    """
+    The usage counters of a guild for one hour, waiting to be flushed into the rollups.
+    """
+
+    __slots__ = ("created", "deleted", "peak_concurrent", "lifetime_seconds", "lifetimes")
+
+    def __init__(self, concurrent: int):
+        self.created = 0
+        self.deleted = 0
+        self.peak_concurrent = concurrent
+        self.lifetime_seconds = 0
+        self.lifetimes: dict[int, int] = {}
+
+
+class UsageAnalytics:
+    """
+    In-memory temporary channel usage counters, keyed by guild and hour.
+    """
+
+    def __init__(self):
+        self.hours: dict[tuple[int, int], HourlyUsage] = {}
+
+    def hour(self, guild_id: int, concurrent: int) -> HourlyUsage:
+        """Get the counters of the current hour of a guild and account for its current concurrency."""
+        key = (guild_id, int(time.time() // 3600))
+        usage = self.hours.get(key)
+        if usage is None:
+            usage = self.hours[key] = HourlyUsage(concurrent)
+        usage.peak_concurrent = max(usage.peak_concurrent, concurrent)
+        return usage
+
+    def record_created(self, guild_id: int, concurrent: int) -> None:
+        """Count a channel that has been created, with the number of channels the guild has now."""
+        self.hour(guild_id, concurrent).created += 1
+
+    def record_deleted(self, guild_id: int, lifetime: float, concurrent: int) -> None:
+        """Count a channel that has been removed after a lifetime in seconds."""
+        usage = self.hour(guild_id, concurrent)
+        usage.deleted += 1
+        usage.lifetime_seconds += int(lifetime)
+        bucket = bisect.bisect_left(TEMPORARY_VOICE_LIFETIME_BUCKETS, lifetime)
+        usage.lifetimes[bucket] = usage.lifetimes.get(bucket, 0) + 1
+
+    def drain(self) -> dict[tuple[int, int], HourlyUsage]:
+        """Take the counters gathered so far, leaving empty counters behind."""
+        hours, self.hours = self.hours, {}
+        return hours
+
+
+def hour_start(hour: int) -> datetime:
+    """Get the naive UTC datetime at which an hour since the epoch starts, as stored in the rollups."""
+    return datetime.fromtimestamp(hour * 3600, timezone.utc).replace(tzinfo=None)
+
+
+def format_duration(seconds: float) -> str:
+    """Format a number of seconds as a short human readable duration."""
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def median_lifetime(histogram: dict[int, int]) -> Optional[str]:
+    """
+    Get the lifetime bucket that contains the median of a lifetime histogram.
+
+    Args:
+        histogram (dict[int, int]): The counts by lifetime bucket.
+
+    Returns:
+        Optional[str]: The range of the median bucket, or None if the histogram is empty.
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            break
+
+    if bucket == 0:
+        return f"under {format_duration(TEMPORARY_VOICE_LIFETIME_BUCKETS[0])}"
+    if bucket >= len(TEMPORARY_VOICE_LIFETIME_BUCKETS):
+        return f"over {format_duration(TEMPORARY_VOICE_LIFETIME_BUCKETS[-1])}"
+    return (
+        f"{format_duration(TEMPORARY_VOICE_LIFETIME_BUCKETS[bucket - 1])} to "
+        f"{format_duration(TEMPORARY_VOICE_LIFETIME_BUCKETS[bucket])}"
+    )
+
+
 class TemporaryVoice(commands.Cog, name=TEMPORARY_VOICE_COG_NAME):
     """
     A cog for creating temporary voice channels.
@@ -23,44 +242,216 @@ class TemporaryVoice(commands.Cog, name=TEMPORARY_VOICE_COG_NAME):
             bot (commands.Bot): The bot instance to which this cog will be added.
         """
         self.bot = bot
-        self.temporary_channels = {}
+        self.temporary_channels = ChannelRegistry()
+        self.channel_queue = ChannelOperationQueue(
+            {
+                ChannelOperation.CREATE: TEMPORARY_VOICE_CREATE_RATE_LIMIT,
+                ChannelOperation.EDIT: TEMPORARY_VOICE_EDIT_RATE_LIMIT,
+                ChannelOperation.DELETE: TEMPORARY_VOICE_DELETE_RATE_LIMIT,
+            },
+            max_concurrency=TEMPORARY_VOICE_OPERATION_CONCURRENCY,
+        )
+        self.last_sweep: Optional[SweepReport] = None
+        self.channel_pools: dict[int, list[int]] = {}
+        self.analytics = UsageAnalytics()
+        self.refill_tasks: dict[int, asyncio.Task] = {}
+        self.deletion_scheduler: DeadlineScheduler[int] = DeadlineScheduler(
+            self.delete_expired_channels,
+            batch_window=TEMPORARY_VOICE_DELETE_BATCH_WINDOW,
+            name="temporary-voice-deletions",
+        )
 
-    async def clean_up(self):
+    async def reconcile(self, delete_empty: bool = True) -> SweepReport:
         """
-        Cleanup function to remove temporary voice channels that are no longer needed.
+        Reconcile the tracked temporary channels with the database and the gateway cache.
+
+        Active channels in the database that are not tracked are picked up, channels that no longer
+        exist are untracked, and empty channels without a pending deletion are deleted through the
+        channel operation queue. All removals are marked in the database with a single update.
+
+        Args:
+            delete_empty (bool): Whether to delete orphaned empty channels straight away. When False
+                their deletion is scheduled with the usual grace period instead.
+
+        Returns:
+            SweepReport: The duration and counts of the sweep.
         """
-        logger.info("Cleaning up temporary voice channels")
+        started = time.perf_counter()
 
-        channels_to_remove = []
-        for channel_id, temporary_channel in list(self.temporary_channels.items()):
-            channel = self.bot.get_channel(int(temporary_channel.channel_id))
+        async with self.bot.get_db_service() as db:
+            active_channels = await db.temporary_channels.get_active_temporary_channels()
+
+        for temporary_channel in active_channels:
+            if int(temporary_channel.channel_id) not in self.temporary_channels:
+                self.temporary_channels.add(TrackedChannel.from_model(temporary_channel))
+
+        missing = []
+        orphaned = []
+        now = time.time()
+        for tracked in self.temporary_channels:
+            # Leave channels that are still being set up alone
+            if now - tracked.created_at < TEMPORARY_VOICE_DELETE_GRACE_PERIOD:
+                continue
+
+            channel = self.bot.get_channel(tracked.channel_id)
 
             if channel is None:
-                logger.warning(f"Temporary channel {temporary_channel.channel_id} not found in cache, marking for removal")
-                channels_to_remove.append(channel_id)
+                logger.warning(f"Temporary channel {tracked.channel_id} not found in cache, marking for removal")
+                missing.append(tracked.channel_id)
                 continue
 
             assert isinstance(channel, discord.VoiceChannel), "Channel is not a voice channel"
 
-            if len(channel.members) == 0:
-                try:
-                    logger.info(f"Deleting temporary voice channel: {channel.name}")
-                    await channel.delete(reason="Temporary voice channel cleanup")
-                    channels_to_remove.append(channel_id)
-                except (discord.Forbidden, discord.HTTPException) as e:
-                    logger.error(f"Failed to delete temporary voice channel {channel.name}: {e}", exc_info=True)
-        
-        # Remove channels from the dictionary
-        for channel_id in channels_to_remove:
-            if channel_id in self.temporary_channels:
-                logger.info(f"Removing temporary channel {channel_id} from tracking")
-
-                async with self.bot.get_db_service() as db:
-                    await db.temporary_channels.remove_temporary_channel(
-                        channel_id=channel_id,
-                        guild_id=self.temporary_channels[channel_id].guild_id,
-                    )
-                del self.temporary_channels[channel_id]
+            if len(channel.members) > 0:
+                tracked.empty_since = None
+            elif tracked.channel_id not in self.deletion_scheduler:
+                if delete_empty:
+                    orphaned.append(channel)
+                else:
+                    logger.info(f"Scheduling deletion of empty temporary voice channel: {channel.name}")
+                    self.schedule_deletion(tracked)
+
+        deleted, failed = await self.delete_channels(orphaned, reason="Temporary voice channel cleanup")
+        await self.untrack_channels(missing + deleted)
+
+        report = SweepReport(
+            duration=time.perf_counter() - started,
+            tracked=len(self.temporary_channels),
+            missing=len(missing),
+            deleted=len(deleted),
+            failed=failed,
+        )
+        self.last_sweep = report
+        logger.info(
+            f"Reconciled temporary voice channels in {report.duration * 1000:.1f}ms: "
+            f"{report.tracked} tracked, {report.missing} missing, {report.deleted} deleted, {report.failed} failed, "
+            f"{self.channel_queue.depth} channel operations queued"
+        )
+        return report
+
+    @tasks.loop(minutes=TEMPORARY_VOICE_SWEEP_INTERVAL)
+    async def sweep(self):
+        """
+        Periodically reconcile the temporary channels to catch any missed voice state updates.
+        """
+        await self.reconcile()
+
+    @sweep.before_loop
+    async def before_sweep(self):
+        """
+        Wait for the channel cache to be populated and rebuild the pending deletions before the
+        first sweep, as channels cannot be looked up before the bot is ready.
+        """
+        await self.bot.wait_until_ready()
+        await self.reconcile(delete_empty=False)
+
+        if TEMPORARY_VOICE_POOL_SIZE > 0:
+            for guild in self.bot.guilds:
+                self.discover_pool(guild)
+                hub = discord.utils.get(guild.voice_channels, name=TEMPORARY_VOICE_CHANNEL_NAME)
+                if hub is not None:
+                    self.request_refill(hub)
+
+    async def delete_channels(self, channels: list[discord.VoiceChannel], reason: str) -> tuple[list[int], int]:
+        """
+        Delete channels through the channel operation queue. Each guild's deletions run one after
+        another within its rate limits, while different guilds are worked through side by side with
+        at most TEMPORARY_VOICE_OPERATION_CONCURRENCY requests in flight.
+
+        Args:
+            channels (list[discord.VoiceChannel]): The channels to delete.
+            reason (str): The audit log reason for the deletion.
+
+        Returns:
+            tuple[list[int], int]: The IDs of the channels that are gone and the number of failures.
+        """
+        results = await asyncio.gather(
+            *(
+                self.channel_queue.submit(
+                    channel.guild.id,
+                    ChannelOperation.DELETE,
+                    channel.id,
+                    lambda channel=channel: channel.delete(reason=reason),
+                )
+                for channel in channels
+            ),
+            return_exceptions=True,
+        )
+
+        deleted = []
+        for channel, result in zip(channels, results):
+            if isinstance(result, discord.NotFound) or not isinstance(result, BaseException):
+                logger.info(f"Deleted temporary voice channel: {channel.name}")
+                deleted.append(channel.id)
+            else:
+                logger.error(f"Failed to delete temporary voice channel {channel.name}: {result}", exc_info=result)
+        return deleted, len(channels) - len(deleted)
+
+    def schedule_deletion(self, tracked: TrackedChannel) -> None:
+        """
+        Mark a tracked channel as empty and schedule its deletion after the grace period.
+
+        Args:
+            tracked (TrackedChannel): The channel that has been left empty.
+        """
+        tracked.empty_since = time.time()
+        self.deletion_scheduler.schedule(
+            tracked.channel_id, when=tracked.empty_since + TEMPORARY_VOICE_DELETE_GRACE_PERIOD
+        )
+
+    async def untrack_channels(self, channel_ids: list[int]):
+        """
+        Stop tracking temporary channels and mark them as deleted in the database in one batch.
+
+        Args:
+            channel_ids (list[int]): The IDs of the channels to stop tracking.
+        """
+        if not channel_ids:
+            return
+
+        now = time.time()
+        for channel_id in channel_ids:
+            self.deletion_scheduler.cancel(channel_id)
+            tracked = self.temporary_channels.remove(channel_id)
+            if tracked is not None:
+                self.analytics.record_deleted(
+                    tracked.guild_id,
+                    lifetime=now - tracked.created_at,
+                    concurrent=len(self.temporary_channels.in_guild(tracked.guild_id)),
+                )
+
+        async with self.bot.get_db_service() as db:
+            await db.temporary_channels.remove_temporary_channels([str(channel_id) for channel_id in channel_ids])
+
+        logger.info(f"Removed {len(channel_ids)} temporary channels from tracking")
+
+    async def delete_expired_channels(self, channel_ids: list[int]):
+        """
+        Delete temporary channels whose grace period has expired.
+
+        Channels that have been rejoined in the meantime are kept, as the rejoin should have
+        cancelled their deletion but a missed voice state update must not delete an occupied channel.
+
+        Args:
+            channel_ids (list[int]): The IDs of the channels whose deletion is due.
+        """
+        to_delete = []
+        missing = []
+        for channel_id in channel_ids:
+            tracked = self.temporary_channels.get(channel_id)
+            if tracked is None:
+                continue
+
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                missing.append(channel_id)
+            elif len(channel.members) == 0:
+                to_delete.append(channel)
+            else:
+                tracked.empty_since = None
+
+        deleted, _ = await self.delete_channels(to_delete, reason="Temporary voice channel empty")
+        await self.untrack_channels(missing + deleted)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -74,51 +465,304 @@ class TemporaryVoice(commands.Cog, name=TEMPORARY_VOICE_COG_NAME):
         """
         logger.debug(f"Voice state update for {member.name}: {before} -> {after}")
         
+        if before.channel == after.channel:
+            return
+
+        # Cancel the pending deletion of a temporary channel that has been rejoined
+        if after.channel is not None:
+            tracked = self.temporary_channels.get(after.channel.id)
+
+            if tracked is not None:
+                tracked.empty_since = None
+                if self.deletion_scheduler.cancel(tracked.channel_id):
+                    logger.info(f"Cancelled deletion of temporary voice channel: {after.channel.name} as it was rejoined")
+
+        if before.channel is not None:
+            # Check if the channel being left is a temporary channel
+            tracked = self.temporary_channels.get(before.channel.id)
+
+            if tracked is not None and len(before.channel.members) == 0:
+                logger.info(f"Scheduling deletion of temporary voice channel: {before.channel.name} as it is empty")
+                self.schedule_deletion(tracked)
+
+            # The member left the hub before their channel was created, so the queued create is
+            # dropped and no request is made
+            if self.channel_queue.cancel_pending(member.guild.id, ChannelOperation.CREATE, member.id):
+                logger.info(f"Cancelled temporary voice channel creation for {member.name} as they left the hub")
+
         # Check if the member has moved to a temporary voice channel and create one if needed
         if after.channel is not None and after.channel.name == TEMPORARY_VOICE_CHANNEL_NAME:
-            member_name = member.nick or member.name 
-            temporary_channel_name = f"{member_name}'s Area"
+            await self.create_temporary_channel(member, after.channel)
+
+    def discover_pool(self, guild: discord.Guild) -> None:
+        """
+        Pick up the pool channels of a guild that were created before the cog was loaded.
+
+        Args:
+            guild (discord.Guild): The guild to look for pool channels in.
+        """
+        pool = self.channel_pools.setdefault(guild.id, [])
+        for channel in guild.voice_channels:
+            if channel.name == TEMPORARY_VOICE_POOL_CHANNEL_NAME and channel.id not in pool:
+                pool.append(channel.id)
+
+    def request_refill(self, hub: discord.VoiceChannel) -> None:
+        """
+        Refill the pool of a guild in the background if it is at or below the low watermark.
+
+        Args:
+            hub (discord.VoiceChannel): The hub channel the pool channels are modelled on.
+        """
+        if TEMPORARY_VOICE_POOL_SIZE <= 0:
+            return
+
+        guild_id = hub.guild.id
+        if len(self.channel_pools.get(guild_id, ())) > TEMPORARY_VOICE_POOL_LOW_WATERMARK:
+            return
+
+        task = self.refill_tasks.get(guild_id)
+        if task is None or task.done():
+            self.refill_tasks[guild_id] = asyncio.create_task(self.refill_pool(hub))
+
+    async def refill_pool(self, hub: discord.VoiceChannel):
+        """
+        Create hidden voice channels next to the hub until the pool of its guild is full.
+
+        Args:
+            hub (discord.VoiceChannel): The hub channel the pool channels are modelled on.
+        """
+        guild = hub.guild
+        pool = self.channel_pools.setdefault(guild.id, [])
+
+        overwrites = dict(hub.overwrites)
+        overwrites[guild.default_role] = discord.PermissionOverwrite(view_channel=False, connect=False)
+        overwrites[guild.me] = discord.PermissionOverwrite(view_channel=True, connect=True, manage_channels=True)
+
+        while len(pool) < TEMPORARY_VOICE_POOL_SIZE:
+            try:
+                channel = await self.channel_queue.submit(
+                    guild.id,
+                    ChannelOperation.CREATE,
+                    ("pool", len(pool)),
+                    lambda: guild.create_voice_channel(
+                        TEMPORARY_VOICE_POOL_CHANNEL_NAME,
+                        category=hub.category,
+                        bitrate=hub.bitrate,
+                        user_limit=hub.user_limit,
+                        overwrites=overwrites,
+                        reason="Temporary voice channel pool",
+                    ),
+                )
+            except (discord.Forbidden, discord.HTTPException) as e:
+                logger.error(f"Failed to refill the temporary voice channel pool in {guild.name}: {e}", exc_info=True)
+                return
+
+            pool.append(channel.id)
+            logger.debug(f"Added channel {channel.id} to the temporary voice channel pool of {guild.name}")
+
+    def take_pool_channel(self, guild: discord.Guild) -> Optional[discord.VoiceChannel]:
+        """
+        Take a channel out of the pool of a guild.
+
+        Args:
+            guild (discord.Guild): The guild to take a pool channel from.
 
+        Returns:
+            Optional[discord.VoiceChannel]: The pool channel, or None if the pool is empty.
+        """
+        pool = self.channel_pools.get(guild.id)
+        while pool:
+            channel = guild.get_channel(pool.pop())
+            if isinstance(channel, discord.VoiceChannel):
+                return channel
+        return None
+
+    async def open_channel(self, member: discord.Member, hub: discord.VoiceChannel, name: str) -> tuple[discord.VoiceChannel, bool]:
+        """
+        Get a voice channel for a member, by claiming a pool channel and revealing it with a single
+        edit when one is available or by cloning the hub otherwise.
+
+        Args:
+            member (discord.Member): The member the channel is for.
+            hub (discord.VoiceChannel): The hub channel the member joined.
+            name (str): The name of the channel.
+
+        Returns:
+            tuple[discord.VoiceChannel, bool]: The channel and whether it was claimed from the pool, in
+                which case the member's permissions are already set.
+        """
+        channel = self.take_pool_channel(member.guild)
+        if channel is not None:
+            overwrites = dict(hub.overwrites)
+            overwrites[member] = discord.PermissionOverwrite(manage_channels=True)
+            try:
+                await channel.edit(name=name, overwrites=overwrites, reason="Temporary voice channel")
+                return channel, True
+            except discord.NotFound:
+                logger.warning(f"Pool channel {channel.id} no longer exists, cloning the hub instead")
+
+        return await hub.clone(name=name, reason="Temporary voice channel"), False
+
+    async def create_temporary_channel(self, member: discord.Member, hub: discord.VoiceChannel):
+        """
+        Create a temporary voice channel for a member who joined the hub and move them into it.
+
+        Args:
+            member (discord.Member): The member who joined the hub.
+            hub (discord.VoiceChannel): The hub channel the temporary channel is cloned from.
+        """
+        member_name = member.nick or member.name
+        temporary_channel_name = f"{member_name}'s Area"
+
+        # Claiming a pool channel goes through the create bucket as it stands in for a create
+        opened = await self.channel_queue.submit(
+            member.guild.id,
+            ChannelOperation.CREATE,
+            member.id,
+            lambda: self.open_channel(member, hub, temporary_channel_name),
+        )
+        if opened is None:
+            return
+
+        temporary_channel, claimed = opened
+        self.request_refill(hub)
 
-            temporary_channel = await after.channel.clone(
-                name=temporary_channel_name,
-                reason="Temporary voice channel",
+        tracked = TrackedChannel(
+            channel_id=temporary_channel.id,
+            guild_id=temporary_channel.guild.id,
+            owner_id=member.id,
+            created_at=time.time(),
+        )
+        self.temporary_channels.add(tracked)
+        self.analytics.record_created(tracked.guild_id, len(self.temporary_channels.in_guild(tracked.guild_id)))
+
+        # Set the channel's permissions, move the member, and add it to the database.
+        async with self.bot.get_db_service() as db:
+            await db.temporary_channels.add_temporary_channel(
+                channel_id=str(temporary_channel.id),
+                guild_id=str(temporary_channel.guild.id),
+                creator_id=str(member.id),
             )
-            
-            # Set the channel's permissions, move the member, and add it to the database.
-            async with self.bot.get_db_service() as db:
-                await db.temporary_channels.add_temporary_channel(
-                    channel_id=str(temporary_channel.id),
-                    guild_id=str(temporary_channel.guild.id),
-                    creator_id=str(member.id),
+
+        setup = [member.move_to(temporary_channel)]
+        if not claimed:
+            setup.append(
+                self.channel_queue.submit(
+                    member.guild.id,
+                    ChannelOperation.EDIT,
+                    temporary_channel.id,
+                    lambda: temporary_channel.set_permissions(member, manage_channels=True),
                 )
-            
-            channel = asyncio.gather(
-                temporary_channel.set_permissions(member, manage_channels=True),
-                member.move_to(temporary_channel)
             )
-            
-            self.temporary_channels[str(temporary_channel.id)] = channel
-            logger.info(f"Created temporary voice channel: {temporary_channel.name} for {member.name}")
-            
-        
-        # Check if the member has left a temporary voice channel
-        if before.channel is not None:
-            # Check if the channel being left is a temporary channel
-            channel_id = str(before.channel.id)
 
-            if channel_id in self.temporary_channels and len(before.channel.members) == 0:
-                logger.info(f"Deleting temporary voice channel: {before.channel.name} as it is empty")
+        results = await asyncio.gather(*setup, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to set up temporary voice channel {temporary_channel.name}: {result}", exc_info=result)
 
-                await before.channel.delete(reason="Temporary voice channel empty")
-                async with self.bot.get_db_service() as db:
-                    await db.temporary_channels.remove_temporary_channel(
-                        channel_id=str(before.channel.id),
-                        guild_id=str(before.channel.guild.id),
-                    )
+        if len(temporary_channel.members) == 0 and (member.voice is None or member.voice.channel != temporary_channel):
+            logger.info(f"Scheduling deletion of temporary voice channel: {temporary_channel.name} as it was never joined")
+            self.schedule_deletion(tracked)
+        else:
+            logger.info(
+                f"{'Claimed' if claimed else 'Created'} temporary voice channel: {temporary_channel.name} for {member.name}"
+            )
 
-                # Remove the channel from the dictionary
-                del self.temporary_channels[channel_id]
+    async def flush_analytics(self):
+        """
+        Flush the in-memory usage counters into the hourly rollup tables.
+        """
+        # Make sure hours without any creates or deletes still record the channels carried over
+        guild_ids = {tracked.guild_id for tracked in self.temporary_channels}
+        for guild_id in guild_ids:
+            self.analytics.hour(guild_id, len(self.temporary_channels.in_guild(guild_id)))
+
+        hours = self.analytics.drain()
+        if not hours:
+            return
+
+        async with self.bot.get_db_service() as db:
+            for (guild_id, hour), usage in hours.items():
+                await db.temporary_channel_stats.add_hourly_usage(
+                    guild_id=str(guild_id),
+                    hour_start=hour_start(hour),
+                    created=usage.created,
+                    deleted=usage.deleted,
+                    peak_concurrent=usage.peak_concurrent,
+                    lifetime_seconds=usage.lifetime_seconds,
+                )
+                await db.temporary_channel_stats.add_lifetimes(
+                    guild_id=str(guild_id),
+                    hour_start=hour_start(hour),
+                    counts=usage.lifetimes,
+                )
+
+        logger.debug(f"Flushed {len(hours)} hours of temporary voice usage")
+
+    @tasks.loop(minutes=TEMPORARY_VOICE_ANALYTICS_FLUSH_INTERVAL)
+    async def flush_analytics_loop(self):
+        """
+        Periodically flush the usage counters into the hourly rollups.
+        """
+        try:
+            await self.flush_analytics()
+        except Exception as e:
+            logger.error(f"Failed to flush temporary voice usage: {e}", exc_info=True)
+
+    @commands.hybrid_command(
+        name="voicestats", description="Show temporary voice channel usage for the server."
+    )
+    @app_commands.describe(days="The number of days to show the usage for, up to 30.")
+    @commands.guild_only()
+    async def voicestats(self, ctx: Context, days: commands.Range[int, 1, 30] = 7) -> None:
+        """
+        Show temporary voice channel usage for the server.
+
+        Args:
+            ctx (Context): The context of the command.
+            days (int): The number of days to show the usage for.
+        """
+        await self.flush_analytics()
+
+        guild_id = str(ctx.guild.id)
+        since = hour_start(int(time.time() // 3600) - days * 24 + 1)
+        async with self.bot.get_db_service() as db:
+            created, deleted, peak, lifetime_seconds = await db.temporary_channel_stats.get_usage_totals(guild_id, since)
+            busiest_hours = await db.temporary_channel_stats.get_busiest_hours(guild_id, since)
+            histogram = await db.temporary_channel_stats.get_lifetime_histogram(guild_id, since)
+
+        midnight = int(time.time() // 86400 * 86400)
+        busiest = ", ".join(f"<t:{midnight + hour * 3600}:t> ({count})" for hour, count in busiest_hours)
+
+        embed = discord.Embed(
+            title="Temporary Voice Usage",
+            description=f"Usage over the last {days} day{'s' if days != 1 else ''}.",
+            color=SUCCESS_COLOR,
+        )
+        embed.add_field(name="Channels Created", value=str(created))
+        embed.add_field(name="Peak Concurrent", value=str(peak))
+        embed.add_field(name="Active Now", value=str(len(self.temporary_channels.in_guild(ctx.guild.id))))
+        embed.add_field(name="Median Lifetime", value=median_lifetime(histogram) or "No data")
+        embed.add_field(
+            name="Average Lifetime",
+            value=format_duration(lifetime_seconds / deleted) if deleted else "No data",
+        )
+        embed.add_field(name="Busiest Hours", value=busiest or "No data", inline=False)
+
+        queue = self.channel_queue.guilds.get(ctx.guild.id)
+        if queue is not None:
+            stats = queue.stats
+            embed.add_field(
+                name="Channel Queue",
+                value=(
+                    f"{queue.depth} waiting, oldest for {queue.oldest_wait():.1f}s\n"
+                    f"{stats.processed} run, {stats.failed} failed, {stats.collapsed} collapsed\n"
+                    f"Waited {stats.average_wait:.2f}s on average, {stats.max_wait:.2f}s at most\n"
+                    f"Throttled {stats.throttled} times for {stats.throttled_seconds:.1f}s"
+                ),
+                inline=False,
+            )
+        await ctx.send(embed=embed)
 
     async def cog_load(self):
         """
@@ -127,16 +771,28 @@ class TemporaryVoice(commands.Cog, name=TEMPORARY_VOICE_COG_NAME):
         async with self.bot.get_db_service() as db:
             active_channels = await db.temporary_channels.get_active_temporary_channels()
 
-        # Convert list to dictionary with channel_id as key
-        self.temporary_channels = {str(channel.channel_id): channel for channel in active_channels}
-        
-        await self.clean_up()
+        for temporary_channel in active_channels:
+            self.temporary_channels.add(TrackedChannel.from_model(temporary_channel))
+
+        self.deletion_scheduler.start()
+        self.sweep.start()
+        self.flush_analytics_loop.start()
 
     async def cog_unload(self):
         """
         Cleanup when the cog is unloaded.
+
+        Pending deletions are dropped rather than executed, the channels are still active in the
+        database and their deletions are rescheduled when the cog is loaded again. Pool channels are
+        kept and picked up again by name.
         """
-        await self.clean_up()
+        self.sweep.cancel()
+        self.flush_analytics_loop.cancel()
+        await self.flush_analytics()
+        for task in self.refill_tasks.values():
+            task.cancel()
+        await self.deletion_scheduler.stop()
+        await self.channel_queue.close()
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -8,11 +8,128 @@ REACTION_ROLES_COG_NAME = "reaction_roles"
 MODERATION_COG_NAME = "moderation"
 FUN_COG_NAME = "fun"
 TEMPORARY_VOICE_COG_NAME = "temporary_voice"
+RAID_PROTECTION_COG_NAME = "raid_protection"
+AUTOMOD_COG_NAME = "automod"
+MESSAGE_LOG_COG_NAME = "message_log"
+POLLS_COG_NAME = "polls"
 
 SUCCESS_COLOR = 0xBEBEFE
 ERROR_COLOR = 0xE02B2B
 
 TEMPORARY_VOICE_CHANNEL_NAME = "🕳️ Blackhole"
+# Seconds an empty temporary voice channel is kept around before it is deleted.
+TEMPORARY_VOICE_DELETE_GRACE_PERIOD = 30.0
+# Seconds to wait after the first expired deletion so that nearby expiries are deleted together.
+TEMPORARY_VOICE_DELETE_BATCH_WINDOW = 1.0
+# Minutes between reconciliation sweeps of the temporary voice channels.
+TEMPORARY_VOICE_SWEEP_INTERVAL = 5.0
+# Maximum number of temporary voice channel operations in flight at once across all guilds, each guild runs one at a time.
+TEMPORARY_VOICE_OPERATION_CONCURRENCY = 3
+# Channel operations allowed per window of seconds in each guild, as (limit, window).
+TEMPORARY_VOICE_CREATE_RATE_LIMIT = (5, 10.0)
+TEMPORARY_VOICE_EDIT_RATE_LIMIT = (5, 10.0)
+TEMPORARY_VOICE_DELETE_RATE_LIMIT = (5, 10.0)
+# Number of hidden voice channels pre-created per guild for the hub to claim, 0 disables the pool.
+TEMPORARY_VOICE_POOL_SIZE = 0
+# The pool is refilled once it holds this many channels or fewer.
+TEMPORARY_VOICE_POOL_LOW_WATERMARK = 1
+TEMPORARY_VOICE_POOL_CHANNEL_NAME = "🕳️ Reserved"
+# Minutes between flushes of the temporary voice usage counters into the hourly rollups.
+TEMPORARY_VOICE_ANALYTICS_FLUSH_INTERVAL = 5.0
+# Upper bounds in seconds of the temporary voice channel lifetime histogram buckets.
+TEMPORARY_VOICE_LIFETIME_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400)
+
+# Maximum number of DMs and kicks in flight at once during a mass moderation action.
+MODERATION_MASS_ACTION_CONCURRENCY = 5
+# Maximum number of users a single mass moderation action can target, the bulk ban limit.
+MODERATION_MASS_ACTION_LIMIT = 200
+# Minimum number of seconds between edits of a moderation progress message.
+MODERATION_PROGRESS_INTERVAL = 2.0
+# Maximum number of messages a purge looks through to find the messages to delete.
+MODERATION_PURGE_SCAN_LIMIT = 5000
+# Seconds a member fetched for a moderation command is cached.
+MEMBER_RESOLVER_TTL = 300.0
+# Seconds a user who is not in a guild is remembered as such.
+MEMBER_RESOLVER_NEGATIVE_TTL = 60.0
+# Maximum number of member lookups cached across all guilds.
+MEMBER_RESOLVER_CAPACITY = 2000
+# Maximum number of scheduled moderation actions carried out at once.
+SCHEDULER_CONCURRENCY = 5
+# Seconds before a failed scheduled action is tried again.
+SCHEDULER_RETRY_DELAY = 60.0
+# Number of attempts after which a failing scheduled action is dropped.
+SCHEDULER_MAX_ATTEMPTS = 5
+# Seconds to wait after an action is due so that actions due together run in one batch.
+SCHEDULER_BATCH_WINDOW = 1.0
+# Number of results per page of a warning search.
+MODERATION_SEARCH_PAGE_SIZE = 10
+# Longest timeout in minutes, the Discord limit of 28 days.
+MODERATION_MAX_TIMEOUT = 40320
+
+# Default raid protection settings of a guild, windows are in seconds.
+RAID_JOIN_THRESHOLD = 10
+RAID_JOIN_WINDOW = 30
+RAID_DUPLICATE_THRESHOLD = 4
+RAID_DUPLICATE_WINDOW = 30
+RAID_ACTIONS = ("alert",)
+RAID_SLOWMODE_DELAY = 30
+# Seconds after a raid action before the same kind of raid can trigger again in a guild.
+RAID_ACTION_COOLDOWN = 300
+# Messages shorter than this are too common to count as duplicates.
+RAID_DUPLICATE_MIN_LENGTH = 10
+
+# Maximum number of automod rules per guild.
+AUTOMOD_MAX_RULES = 5000
+# Seconds before the automod notice of a removed message is deleted.
+AUTOMOD_NOTICE_DELETE_AFTER = 5.0
+
+# Maximum number of recent messages kept per watched channel for the message log.
+MESSAGE_LOG_CHANNEL_CAPACITY = 500
+# Approximate maximum number of bytes of messages kept across all watched channels.
+MESSAGE_LOG_MEMORY_LIMIT = 16 * 1024 * 1024
+# Seconds between posts of the logged deletions and edits to the log channels.
+MESSAGE_LOG_FLUSH_INTERVAL = 5.0
+
+# Seconds the reaction role changes of a member are collected before they are applied together.
+REACTION_ROLES_COALESCE_WINDOW = 1.5
+# Member role edits allowed per window of seconds in each guild, as (limit, window).
+REACTION_ROLES_EDIT_RATE_LIMIT = (10, 10.0)
+# Maximum number of member role edits in flight at once across all guilds.
+REACTION_ROLES_CONCURRENCY = 3
+# Number of reaction role messages checked at once for reactions missed while offline.
+REACTION_ROLES_RECONCILE_CONCURRENCY = 4
+
+# Seconds between writes of the votes cast since the last checkpoint to the database.
+POLLS_CHECKPOINT_INTERVAL = 30.0
+# Seconds between edits of the results embed of a poll or giveaway whose tally changed.
+POLLS_EMBED_UPDATE_INTERVAL = 10.0
+# Maximum number of options of a poll, one per number emoji.
+POLLS_MAX_OPTIONS = 10
+# Maximum number of winners of a giveaway.
+GIVEAWAY_MAX_WINNERS = 20
+
+# Number of recent ping measurements the latency percentiles of the ping command are taken over.
+PING_HISTORY_SIZE = 50
+
+# Seconds between measurements of the event loop lag.
+LOOP_MONITOR_INTERVAL = 0.5
+# Seconds the event loop must be blocked for before the blocking task and stack are logged.
+LOOP_MONITOR_SLOW_CALLBACK = 0.25
+# Fraction of the gateway heartbeat interval above which event loop lag is warned about.
+LOOP_MONITOR_HEARTBEAT_WARNING = 0.5
+
+# Seconds per slot of the rolling command latency histograms, and the number of slots kept (a day).
+COMMAND_STATS_SLOT_SECONDS = 60.0
+COMMAND_STATS_SLOTS = 1440
+
+# Seconds between stack samples of the profile command when sampling is cheap.
+PROFILER_INTERVAL = 0.005
+# Largest share of the wall time the profiler may spend taking samples.
+PROFILER_MAX_OVERHEAD = 0.02
+# Most frames kept per sample, counted from the innermost frame.
+PROFILER_MAX_DEPTH = 64
+# Longest a profile can run for, in seconds.
+PROFILER_MAX_SECONDS = 60
 
 LYRICS_API_URL = "https://api.lyrics.ovh/v1/{artist}/{title}"
 
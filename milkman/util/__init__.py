@@ -1,3 +1,3 @@
-from .common import truncate_text, deduplicate_newlines
+from .common import truncate_text, deduplicate_newlines, parse_duration
 
-__all__ = ["truncate_text", "deduplicate_newlines"]
+__all__ = ["truncate_text", "deduplicate_newlines", "parse_duration"]
@@ -0,0 +1,236 @@
+"""
+Durable scheduling of timed moderation actions, such as lifting a temporary ban.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+
+from milkman.util.models import ScheduledAction
+from milkman.util.scheduler import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+ActionHandler = Callable[[discord.Guild, ScheduledAction], Awaitable[None]]
+
+
+def utcnow_naive() -> datetime:
+    """Get the current time as a naive UTC datetime, the way the database stores it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_timestamp(value: datetime) -> float:
+    """Convert a naive UTC datetime from the database to a UNIX timestamp."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ActionScheduler:
+    """
+    Carries out scheduled actions when they are due.
+
+    Every pending action is a row in the database and an entry in an in-memory min-heap, and the
+    runner sleeps until the earliest one is due. The rows are loaded again on startup, so actions
+    survive restarts, and actions that became due while the bot was offline run as one batch.
+
+    Cogs register a handler per kind of action. A handler that raises is retried a few times.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        max_concurrency: int,
+        retry_delay: float,
+        max_attempts: int,
+        batch_window: float = 0.0,
+    ):
+        """
+        Args:
+            bot (commands.Bot): The bot instance.
+            max_concurrency (int): The maximum number of actions carried out at once.
+            retry_delay (float): Seconds before a failed action is tried again.
+            max_attempts (int): The number of attempts after which a failing action is dropped.
+            batch_window (float): Extra seconds to wait after an action is due so that actions due
+                around the same time are carried out in one batch.
+        """
+        self.bot = bot
+        self.max_concurrency = max_concurrency
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.handlers: Dict[str, ActionHandler] = {}
+        self.actions: Dict[int, ScheduledAction] = {}
+        self.scheduler: DeadlineScheduler[int] = DeadlineScheduler(
+            self.run_due,
+            batch_window=batch_window,
+            name="action-scheduler",
+        )
+        self._start_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def register(self, action: str, handler: ActionHandler) -> None:
+        """Set the handler that carries out a kind of action and re-arm the actions waiting for it."""
+        self.handlers[action] = handler
+        for pending in self.actions.values():
+            if pending.action == action:
+                self.scheduler.schedule(pending.id, when=to_timestamp(pending.due_at))
+
+    def unregister(self, action: str) -> None:
+        """Remove the handler of a kind of action, its actions wait until a handler is registered."""
+        self.handlers.pop(action, None)
+
+    def pending(self, guild_id: int) -> List[ScheduledAction]:
+        """Get the pending actions of a guild, earliest first."""
+        return sorted(
+            (action for action in self.actions.values() if action.guild_id == str(guild_id)),
+            key=lambda action: action.due_at,
+        )
+
+    async def load(self) -> None:
+        """
+        Load the pending actions from the database.
+        """
+        async with self.bot.get_db_service() as db:
+            actions = await db.scheduled_actions.get_pending_actions()
+
+        now = utcnow_naive()
+        for action in actions:
+            self._track(action)
+        overdue = sum(1 for action in actions if action.due_at <= now)
+        logger.info(f"Loaded {len(actions)} scheduled actions, {overdue} overdue")
+
+    def start(self) -> None:
+        """Start carrying out actions once the bot is ready, the guilds are needed to do so."""
+
+        async def start_when_ready() -> None:
+            await self.bot.wait_until_ready()
+            self.scheduler.start()
+
+        if self._start_task is None or self._start_task.done():
+            self._start_task = asyncio.create_task(start_when_ready())
+
+    async def stop(self) -> None:
+        """Stop carrying out actions. Pending actions are kept."""
+        if self._start_task is not None:
+            self._start_task.cancel()
+        await self.scheduler.stop()
+
+    def _track(self, action: ScheduledAction) -> None:
+        self.actions[action.id] = action
+        self.scheduler.schedule(action.id, when=to_timestamp(action.due_at))
+
+    async def schedule(
+        self,
+        guild_id: int,
+        action: str,
+        target_id: int,
+        delay: timedelta,
+        created_by: int,
+        reason: Optional[str] = None,
+    ) -> ScheduledAction:
+        """
+        Schedule an action, replacing any pending action of the same kind on the same target.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            action (str): The kind of action.
+            target_id (int): The ID of the user or channel the action is on.
+            delay (timedelta): How long from now the action is due.
+            created_by (int): The ID of the moderator who scheduled the action.
+            reason (Optional[str]): The reason of the action.
+
+        Returns:
+            ScheduledAction: The scheduled action.
+        """
+        async with self.bot.get_db_service() as db:
+            replaced = await db.scheduled_actions.remove_target_actions(str(guild_id), action, str(target_id))
+            scheduled = await db.scheduled_actions.add_action(
+                str(guild_id),
+                action,
+                str(target_id),
+                utcnow_naive() + delay,
+                str(created_by),
+                reason,
+            )
+
+        for action_id in replaced:
+            self.actions.pop(action_id, None)
+            self.scheduler.cancel(action_id)
+        self._track(scheduled)
+        return scheduled
+
+    async def cancel(self, guild_id: int, action: str, target_id: int) -> bool:
+        """
+        Cancel the pending actions of a kind on a target.
+
+        Returns:
+            bool: True if an action was pending, False otherwise.
+        """
+        async with self.bot.get_db_service() as db:
+            removed = await db.scheduled_actions.remove_target_actions(str(guild_id), action, str(target_id))
+
+        for action_id in removed:
+            self.actions.pop(action_id, None)
+            self.scheduler.cancel(action_id)
+        return bool(removed)
+
+    async def run_due(self, action_ids: List[int]) -> None:
+        """
+        Carry out a batch of due actions with bounded concurrency, then update the database once.
+
+        Args:
+            action_ids (List[int]): The IDs of the due actions.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        finished: List[int] = []
+        retries: List[ScheduledAction] = []
+
+        async def run(action: ScheduledAction) -> None:
+            guild = self.bot.get_guild(int(action.guild_id))
+            if guild is None:
+                logger.warning(f"Dropping scheduled {action.action} {action.id}, guild {action.guild_id} is unavailable")
+                finished.append(action.id)
+                return
+
+            handler = self.handlers.get(action.action)
+            if handler is None:
+                # Kept pending and re-armed when a handler is registered, e.g. when its cog is reloaded
+                logger.warning(f"No handler for scheduled {action.action} {action.id}, waiting for one to be registered")
+                return
+
+            try:
+                async with semaphore:
+                    await handler(guild, action)
+            except discord.NotFound:
+                # The target is already gone, e.g. the user was unbanned by hand
+                pass
+            except Exception as e:
+                if action.attempts + 1 < self.max_attempts:
+                    logger.warning(f"Scheduled {action.action} {action.id} in {guild} failed, retrying: {e}")
+                    retries.append(action)
+                    return
+                logger.error(f"Scheduled {action.action} {action.id} in {guild} failed {self.max_attempts} times, dropping it: {e}")
+            finished.append(action.id)
+
+        actions = [self.actions[action_id] for action_id in action_ids if action_id in self.actions]
+        await asyncio.gather(*(run(action) for action in actions))
+
+        retry_at = utcnow_naive() + timedelta(seconds=self.retry_delay)
+        async with self.bot.get_db_service() as db:
+            await db.scheduled_actions.remove_actions(finished)
+            await db.scheduled_actions.retry_actions([action.id for action in retries], retry_at)
+
+        for action_id in finished:
+            self.actions.pop(action_id, None)
+        for action in retries:
+            action.attempts += 1
+            action.due_at = retry_at
+            self._track(action)
+
+        if len(actions) > 1:
+            logger.info(f"Carried out {len(finished)} scheduled actions, {len(retries)} to retry")
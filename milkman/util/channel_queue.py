@@ -0,0 +1,344 @@
+"""
+Per-guild queueing of channel operations so that bursts stay within Discord's rate limits.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelOperation(IntEnum):
+    """The kind of a queued channel operation, lower values are run first."""
+
+    CREATE = 0
+    EDIT = 1
+    DELETE = 2
+
+
+class RateLimitBucket:
+    """
+    A token bucket that allows a number of operations per window.
+    """
+
+    def __init__(self, limit: int, window: float):
+        """
+        Args:
+            limit (int): The number of operations allowed per window.
+            window (float): The length of the window in seconds.
+        """
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self) -> float:
+        """Get the number of seconds until an operation may run, 0 if it may run now."""
+        now = time.monotonic()
+        self.tokens = min(self.limit, self.tokens + (now - self.updated_at) * self.limit / self.window)
+        self.updated_at = now
+
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.window / self.limit
+
+    def consume(self) -> None:
+        """Take a token for an operation that is about to run."""
+        self.tokens -= 1
+
+    def block(self, retry_after: float) -> None:
+        """Block the bucket after Discord answered with a rate limit."""
+        self.blocked_until = time.monotonic() + retry_after
+        self.tokens = 0.0
+
+
+class QueuedOperation:
+    """
+    A channel operation waiting in a guild queue.
+    """
+
+    __slots__ = ("kind", "key", "factory", "future", "enqueued_at", "cancelled")
+
+    def __init__(
+        self,
+        kind: ChannelOperation,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        future: asyncio.Future,
+    ):
+        self.kind = kind
+        self.key = key
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+
+class QueueStats:
+    """
+    Counters describing the operations that went through a guild queue.
+    """
+
+    __slots__ = ("processed", "failed", "collapsed", "throttled", "throttled_seconds", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.collapsed = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """The average number of seconds an operation waited before it ran."""
+        return self.total_wait / self.processed if self.processed else 0.0
+
+    def merge(self, other: "QueueStats") -> None:
+        """Add the counters of another queue to these."""
+        self.processed += other.processed
+        self.failed += other.failed
+        self.collapsed += other.collapsed
+        self.throttled += other.throttled
+        self.throttled_seconds += other.throttled_seconds
+        self.total_wait += other.total_wait
+        self.max_wait = max(self.max_wait, other.max_wait)
+
+
+class GuildOperationQueue:
+    """
+    The queue of channel operations for a single guild, drained by one worker task that runs the
+    operations one at a time.
+    """
+
+    def __init__(self, guild_id: int, limits: Dict[ChannelOperation, Tuple[int, float]], semaphore: asyncio.Semaphore):
+        """
+        Args:
+            guild_id (int): The ID of the guild the queue belongs to.
+            limits (Dict[ChannelOperation, Tuple[int, float]]): The number of operations allowed per
+                window in seconds, for each kind of operation.
+            semaphore (asyncio.Semaphore): Bounds the operations in flight across all guilds.
+        """
+        self.guild_id = guild_id
+        self.buckets = {kind: RateLimitBucket(*limit) for kind, limit in limits.items()}
+        self.semaphore = semaphore
+        self.stats = QueueStats()
+
+        self._heap: List[Tuple[int, int, QueuedOperation]] = []
+        self._pending: Dict[Tuple[ChannelOperation, Hashable], QueuedOperation] = {}
+        self._counter = itertools.count()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """The number of operations waiting to run."""
+        return len(self._pending)
+
+    def oldest_wait(self) -> float:
+        """The number of seconds the oldest waiting operation has been queued for."""
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - min(operation.enqueued_at for operation in self._pending.values())
+
+    def is_pending(self, kind: ChannelOperation, key: Hashable) -> bool:
+        """Check whether an operation is waiting to run."""
+        return (kind, key) in self._pending
+
+    def cancel_pending(self, kind: ChannelOperation, key: Hashable) -> bool:
+        """
+        Cancel an operation that has not run yet, its future resolves to None.
+
+        Args:
+            kind (ChannelOperation): The kind of the operation.
+            key (Hashable): Identifies what the operation acts on.
+
+        Returns:
+            bool: Whether an operation was waiting and has been cancelled.
+        """
+        operation = self._pending.pop((kind, key), None)
+        if operation is None:
+            return False
+
+        operation.cancelled = True
+        if not operation.future.done():
+            operation.future.set_result(None)
+        self.stats.collapsed += 1
+        return True
+
+    def submit(self, kind: ChannelOperation, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Queue an operation.
+
+        An operation for a key that already has the same kind of operation waiting replaces it.
+
+        Args:
+            kind (ChannelOperation): The kind of the operation.
+            key (Hashable): Identifies what the operation acts on.
+            factory (Callable): Creates the coroutine that performs the operation.
+
+        Returns:
+            asyncio.Future: Resolves to the result of the operation once it has run.
+        """
+        existing = self._pending.get((kind, key))
+        if existing is not None:
+            existing.factory = factory
+            self.stats.collapsed += 1
+            return existing.future
+
+        future = asyncio.get_running_loop().create_future()
+        operation = QueuedOperation(kind, key, factory, future)
+        self._pending[(kind, key)] = operation
+        heapq.heappush(self._heap, (int(kind), next(self._counter), operation))
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain(), name=f"channel-queue-{self.guild_id}")
+        return future
+
+    async def close(self) -> None:
+        """Stop the worker and cancel the operations that have not run."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        for operation in self._pending.values():
+            operation.future.cancel()
+        self._pending.clear()
+        self._heap.clear()
+
+    async def _drain(self) -> None:
+        while self._heap:
+            _, _, operation = self._heap[0]
+            if operation.cancelled:
+                heapq.heappop(self._heap)
+                continue
+
+            bucket = self.buckets.get(operation.kind)
+            delay = bucket.delay() if bucket is not None else 0.0
+            if delay > 0:
+                # Sleep and look again, a higher priority operation may have been queued meanwhile.
+                # discord.py retries 429 responses itself, so the time spent waiting on the buckets
+                # is what shows how often the queue holds operations back
+                self.stats.throttled += 1
+                self.stats.throttled_seconds += delay
+                await asyncio.sleep(delay)
+                continue
+
+            heapq.heappop(self._heap)
+            del self._pending[(operation.kind, operation.key)]
+            if bucket is not None:
+                bucket.consume()
+
+            wait = time.monotonic() - operation.enqueued_at
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+            self.stats.processed += 1
+
+            try:
+                async with self.semaphore:
+                    result = await operation.factory()
+            except asyncio.CancelledError:
+                # The queue is closing, the operation was already taken off the pending operations
+                # so close() cannot reach it
+                operation.future.cancel()
+                raise
+            except discord.HTTPException as e:
+                if e.status == 429 and bucket is not None:
+                    retry_after = float(e.response.headers.get("Retry-After", bucket.window))
+                    bucket.block(retry_after)
+                    logger.warning(
+                        f"Rate limited on {operation.kind.name.lower()} in guild {self.guild_id}, "
+                        f"retrying in {retry_after:.1f}s"
+                    )
+                    self._pending[(operation.kind, operation.key)] = operation
+                    heapq.heappush(self._heap, (int(operation.kind), next(self._counter), operation))
+                    continue
+                self.stats.failed += 1
+                if not operation.future.done():
+                    operation.future.set_exception(e)
+            except Exception as e:
+                self.stats.failed += 1
+                if not operation.future.done():
+                    operation.future.set_exception(e)
+            else:
+                if not operation.future.done():
+                    operation.future.set_result(result)
+
+
+class ChannelOperationQueue:
+    """
+    Routes channel operations to a queue per guild.
+    """
+
+    def __init__(self, limits: Dict[ChannelOperation, Tuple[int, float]], max_concurrency: int):
+        """
+        Args:
+            limits (Dict[ChannelOperation, Tuple[int, float]]): The number of operations allowed per
+                window in seconds in each guild, for each kind of operation.
+            max_concurrency (int): The maximum number of operations in flight across all guilds.
+        """
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.guilds: Dict[int, GuildOperationQueue] = {}
+
+    def guild(self, guild_id: int) -> GuildOperationQueue:
+        """Get the queue of a guild, creating it if needed."""
+        queue = self.guilds.get(guild_id)
+        if queue is None:
+            queue = self.guilds[guild_id] = GuildOperationQueue(guild_id, self.limits, self.semaphore)
+        return queue
+
+    def submit(
+        self,
+        guild_id: int,
+        kind: ChannelOperation,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> asyncio.Future:
+        """Queue an operation in the queue of a guild, see GuildOperationQueue.submit."""
+        return self.guild(guild_id).submit(kind, key, factory)
+
+    def is_pending(self, guild_id: int, kind: ChannelOperation, key: Hashable) -> bool:
+        """Check whether an operation is waiting to run in the queue of a guild."""
+        queue = self.guilds.get(guild_id)
+        return queue is not None and queue.is_pending(kind, key)
+
+    def cancel_pending(self, guild_id: int, kind: ChannelOperation, key: Hashable) -> bool:
+        """Cancel an operation waiting in the queue of a guild, see GuildOperationQueue.cancel_pending."""
+        queue = self.guilds.get(guild_id)
+        return queue is not None and queue.cancel_pending(kind, key)
+
+    @property
+    def depth(self) -> int:
+        """The number of operations waiting to run across all guilds."""
+        return sum(queue.depth for queue in self.guilds.values())
+
+    def oldest_wait(self) -> float:
+        """The number of seconds the oldest waiting operation across all guilds has been queued for."""
+        return max((queue.oldest_wait() for queue in self.guilds.values()), default=0.0)
+
+    def stats(self) -> QueueStats:
+        """The counters of every guild queue added together."""
+        stats = QueueStats()
+        for queue in self.guilds.values():
+            stats.merge(queue.stats)
+        return stats
+
+    async def close(self) -> None:
+        """Stop every guild queue."""
+        await asyncio.gather(*(queue.close() for queue in self.guilds.values()))
+        self.guilds.clear()
@@ -1,6 +1,10 @@
 import re
+from datetime import timedelta
+from typing import Optional
 
 NEWLINE_REGEX = re.compile(r"\n+")
+DURATION_REGEX = re.compile(r"(\d+)\s*([smhdw])", re.IGNORECASE)
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
 
 
 def truncate_text(text: str, max_length: int) -> str:
@@ -30,3 +34,21 @@ def deduplicate_newlines(text: str) -> str:
         str: The text with deduplicated newlines.
     """
     return NEWLINE_REGEX.sub("\n", text)
+
+
+def parse_duration(text: str) -> Optional[timedelta]:
+    """
+    Parse a duration such as "30m", "1h30m" or "7d".
+
+    Args:
+        text (str): The duration, as numbers followed by s, m, h, d or w.
+
+    Returns:
+        Optional[timedelta]: The duration, or None if the text is not a valid duration.
+    """
+    text = text.strip().replace(" ", "")
+    parts = DURATION_REGEX.findall(text)
+    if not parts or "".join(number + unit for number, unit in parts).lower() != text.lower():
+        return None
+    seconds = sum(int(number) * DURATION_UNITS[unit.lower()] for number, unit in parts)
+    return timedelta(seconds=seconds) if seconds > 0 else None
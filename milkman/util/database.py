@@ -2,13 +2,42 @@
 SQLAlchemy-based database management for the Discord bot.
 """
 
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict
 
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from .metrics import Histogram
 from .models import Base
 
+# An external content FTS5 index over the warning reasons, kept in sync with the warns table by
+# triggers. The prefix indexes make prefix queries like `scam*` as fast as whole words.
+WARNING_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS warns_fts USING fts5(
+        reason, content='warns', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warns_fts_insert AFTER INSERT ON warns BEGIN
+        INSERT INTO warns_fts(rowid, reason) VALUES (new.id, new.reason);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warns_fts_delete AFTER DELETE ON warns BEGIN
+        INSERT INTO warns_fts(warns_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warns_fts_update AFTER UPDATE OF reason ON warns BEGIN
+        INSERT INTO warns_fts(warns_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+        INSERT INTO warns_fts(rowid, reason) VALUES (new.id, new.reason);
+    END
+    """,
+)
+
 
 class DatabaseConfig:
     """Configuration class for database settings."""
@@ -21,12 +50,55 @@ class DatabaseConfig:
             class_=AsyncSession,
             expire_on_commit=False
         )
+        # Query wall time per kind of statement, e.g. "select", recorded by the cursor events
+        self.query_timings: Dict[str, Histogram] = {}
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(self.engine.sync_engine, "handle_error", self._handle_error)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        kind = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        histogram = self.query_timings.get(kind)
+        if histogram is None:
+            histogram = self.query_timings[kind] = Histogram()
+        histogram.observe(elapsed)
+
+    @staticmethod
+    def _handle_error(context) -> None:
+        # A failed statement has no after_cursor_execute, so its start time is dropped here
+        started = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started:
+            started.pop()
     
     async def create_tables(self) -> None:
-        """Create all tables defined in the models."""
+        """Create all tables defined in the models, and indexes added to existing tables."""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(self._create_missing_indexes)
+            await self._create_search_index(conn)
+
+    @staticmethod
+    def _create_missing_indexes(conn) -> None:
+        """Create indexes that create_all skips because their table already exists."""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
     
+    @staticmethod
+    async def _create_search_index(conn) -> None:
+        """Create the full-text index over the warning reasons, indexing existing warnings the first time."""
+        result = await conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'warns_fts'"))
+        exists = result.first() is not None
+        for statement in WARNING_SEARCH_DDL:
+            await conn.execute(text(statement))
+        if not exists:
+            await conn.execute(text("INSERT INTO warns_fts(warns_fts) VALUES ('rebuild')"))
+
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
         """Get an async database session."""
@@ -40,6 +112,13 @@ class DatabaseConfig:
             finally:
                 await session.close()
     
+    async def ping(self) -> float:
+        """Run a trivial query and return how many seconds it took, including getting a connection."""
+        start = time.perf_counter()
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return time.perf_counter() - start
+
     async def close(self) -> None:
         """Close the database engine."""
         await self.engine.dispose()
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Monitoring of the event loop, which everything in the bot shares, for lag and blocking callbacks.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from discord.ext import commands
+
+from milkman.util.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# The heartbeat interval Discord has sent for years, used until the gateway has sent the real one
+DEFAULT_HEARTBEAT_INTERVAL = 41.25
+
+
+class LoopMonitor:
+    """
+    Measures the scheduling lag of the event loop continuously and reports what blocks it.
+
+    A task sleeps for a fixed interval and records how much later than asked it woke up. A watchdog
+    thread notices when that task has not run for longer than the slow callback threshold and logs
+    the task and stack the loop thread is stuck in at that moment, which names the offender while
+    it is still blocking, without the overhead of the asyncio debug mode.
+    """
+
+    def __init__(self, bot: commands.Bot, *, interval: float, slow_callback: float, heartbeat_warning: float):
+        """
+        Args:
+            bot (commands.Bot): The bot instance.
+            interval (float): Seconds between lag measurements.
+            slow_callback (float): Seconds the loop must be blocked for before it is reported.
+            heartbeat_warning (float): The fraction of the gateway heartbeat interval above which
+                lag is warned about, since the gateway disconnects when heartbeats are missed.
+        """
+        self.bot = bot
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.heartbeat_warning = heartbeat_warning
+        self.histogram = Histogram()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._tick = time.monotonic()
+        self._reported_tick: Optional[float] = None
+
+    def start(self) -> None:
+        """Start measuring on the running loop and start the watchdog thread."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._tick = time.monotonic()
+        self._task = asyncio.create_task(self._measure(), name="loop-monitor")
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def stop(self) -> None:
+        """Stop measuring and stop the watchdog thread."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """The gateway heartbeat interval in seconds."""
+        # discord.py does not expose the interval sent by the gateway publicly
+        keep_alive = getattr(getattr(self.bot, "ws", None), "_keep_alive", None)
+        return getattr(keep_alive, "interval", None) or DEFAULT_HEARTBEAT_INTERVAL
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._tick = time.monotonic()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+
+            if lag >= self.heartbeat_interval * self.heartbeat_warning:
+                logger.warning(
+                    f"The event loop lagged {lag:.2f}s, close to the gateway heartbeat interval of "
+                    f"{self.heartbeat_interval:.1f}s, the gateway may disconnect"
+                )
+            elif lag >= self.slow_callback:
+                logger.info(f"The event loop lagged {lag:.2f}s")
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.slow_callback / 2):
+            tick = self._tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked < self.slow_callback or self._reported_tick == tick:
+                continue
+            self._reported_tick = tick
+            self.stalls += 1
+            logger.warning(f"The event loop has been blocked for {blocked:.2f}s by {self._describe_blocker()}")
+
+    def _describe_blocker(self) -> str:
+        """Describe the task and code the loop thread is running right now."""
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            coro = task.get_coro()
+            owner = f"task {task.get_name()!r} ({getattr(coro, '__qualname__', coro)})"
+        else:
+            owner = "a callback"
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return owner
+        stack = traceback.extract_stack(frame)[-3:]
+        where = " <- ".join(f"{entry.name} ({entry.filename}:{entry.lineno})" for entry in reversed(stack))
+        return f"{owner} at {where}"
@@ -0,0 +1,170 @@
+"""
+Resolution of guild members that are not in the member cache, without a REST call per member.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# The most user IDs a single gateway member chunk request can ask for
+QUERY_MEMBERS_LIMIT = 100
+
+
+class ResolverStats:
+    """
+    Counters of how member lookups were answered.
+    """
+
+    __slots__ = ("cached", "hits", "negative_hits", "misses", "queries", "fetches")
+
+    def __init__(self):
+        self.cached = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.fetches = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups answered without asking Discord."""
+        lookups = self.cached + self.hits + self.negative_hits + self.misses
+        return (lookups - self.misses) / lookups if lookups else 0.0
+
+
+class MemberResolver:
+    """
+    Resolves members from the member cache, then from an LRU of previously fetched members, and
+    finally by asking Discord for all missing members at once over the gateway.
+
+    Members who are not in the guild are remembered for a shorter time, so repeated lookups of users
+    who left do not ask Discord every time.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, capacity: int):
+        """
+        Args:
+            ttl (float): Seconds a fetched member is kept.
+            negative_ttl (float): Seconds a user who is not in the guild is remembered as such.
+            capacity (int): The maximum number of remembered lookups.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.capacity = capacity
+        self.stats = ResolverStats()
+        self._entries: OrderedDict[Tuple[int, int], Tuple[float, Optional[discord.Member]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, guild: discord.Guild, user_id: int) -> Tuple[bool, Optional[discord.Member]]:
+        member = guild.get_member(user_id)
+        if member is not None:
+            self.stats.cached += 1
+            return True, member
+
+        key = (guild.id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, member = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return False, None
+
+        self._entries.move_to_end(key)
+        if member is None:
+            self.stats.negative_hits += 1
+        else:
+            self.stats.hits += 1
+        return True, member
+
+    def _store(self, guild_id: int, user_id: int, member: Optional[discord.Member]) -> None:
+        ttl = self.ttl if member is not None else self.negative_ttl
+        key = (guild_id, user_id)
+        self._entries[key] = (time.monotonic() + ttl, member)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id: int, user_id: int) -> None:
+        """Forget a lookup, e.g. because the user joined or left the guild."""
+        self._entries.pop((guild_id, user_id), None)
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        """Forget all lookups in a guild."""
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """
+        Resolve a single member.
+
+        Args:
+            guild (discord.Guild): The guild of the member.
+            user_id (int): The ID of the user.
+
+        Returns:
+            Optional[discord.Member]: The member, or None if the user is not in the guild.
+        """
+        return (await self.resolve_many(guild, [user_id]))[user_id]
+
+    async def resolve_many(self, guild: discord.Guild, user_ids: Iterable[int]) -> Dict[int, Optional[discord.Member]]:
+        """
+        Resolve several members, asking Discord for the missing ones in chunks of 100 over the gateway.
+
+        Args:
+            guild (discord.Guild): The guild of the members.
+            user_ids (Iterable[int]): The IDs of the users.
+
+        Returns:
+            Dict[int, Optional[discord.Member]]: The members by user ID, None for users not in the guild.
+        """
+        members: Dict[int, Optional[discord.Member]] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            found, member = self._lookup(guild, user_id)
+            if found:
+                members[user_id] = member
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return members
+        self.stats.misses += len(missing)
+
+        for start in range(0, len(missing), QUERY_MEMBERS_LIMIT):
+            chunk = missing[start : start + QUERY_MEMBERS_LIMIT]
+            fetched = await self._query(guild, chunk)
+            for user_id in chunk:
+                member = fetched.get(user_id)
+                members[user_id] = member
+                self._store(guild.id, user_id, member)
+
+        return members
+
+    async def _query(self, guild: discord.Guild, user_ids: list[int]) -> Dict[int, discord.Member]:
+        """
+        Ask Discord for members, falling back to one REST call per member if the gateway request fails.
+        """
+        try:
+            self.stats.queries += 1
+            found = await guild.query_members(user_ids=user_ids, limit=len(user_ids), cache=False)
+            return {member.id: member for member in found}
+        except (asyncio.TimeoutError, discord.ClientException) as e:
+            logger.warning(f"Member chunk request for {len(user_ids)} users in {guild} failed, fetching instead: {e}")
+
+        fetched = {}
+        for user_id in user_ids:
+            self.stats.fetches += 1
+            try:
+                fetched[user_id] = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                pass
+        return fetched
@@ -0,0 +1,131 @@
+"""
+Compact per-channel buffers of recent messages with a global memory limit.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Rough size of a cached message without its strings, the slots object and its dict entry
+MESSAGE_OVERHEAD = 200
+
+
+class CachedMessage:
+    """
+    The parts of a message needed to show it after it was edited or deleted.
+    """
+
+    __slots__ = ("id", "author_id", "created_at", "content", "attachments")
+
+    def __init__(self, id: int, author_id: int, created_at: float, content: str, attachments: Tuple[str, ...]):
+        self.id = id
+        self.author_id = author_id
+        self.created_at = created_at
+        self.content = content
+        self.attachments = attachments
+
+    @property
+    def size(self) -> int:
+        """The approximate number of bytes the message takes up."""
+        return (
+            MESSAGE_OVERHEAD
+            + sys.getsizeof(self.content)
+            + sum(sys.getsizeof(url) for url in self.attachments)
+        )
+
+
+class MessageBuffer:
+    """
+    Keeps the most recent messages of each watched channel in a ring buffer.
+
+    Each channel keeps at most `channel_capacity` messages. When all channels together use more
+    than `memory_limit` bytes, the oldest messages of the least recently active channels are
+    evicted first, so quiet channels give up their memory before busy ones.
+    """
+
+    def __init__(self, channel_capacity: int, memory_limit: int):
+        """
+        Args:
+            channel_capacity (int): The maximum number of messages kept per channel.
+            memory_limit (int): The approximate maximum number of bytes used by all channels.
+        """
+        self.channel_capacity = channel_capacity
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.evicted = 0
+        # Least recently active channel first
+        self._channels: OrderedDict[int, OrderedDict[int, CachedMessage]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._channels.values())
+
+    def add(self, channel_id: int, message: CachedMessage) -> None:
+        """Buffer a new message, evicting old messages if a limit is reached."""
+        messages = self._channels.get(channel_id)
+        if messages is None:
+            messages = self._channels[channel_id] = OrderedDict()
+        else:
+            self._channels.move_to_end(channel_id)
+
+        messages[message.id] = message
+        self.size += message.size
+        if len(messages) > self.channel_capacity:
+            _, oldest = messages.popitem(last=False)
+            self.size -= oldest.size
+            self.evicted += 1
+
+        while self.size > self.memory_limit and self._channels:
+            quietest_id, quietest = next(iter(self._channels.items()))
+            _, oldest = quietest.popitem(last=False)
+            self.size -= oldest.size
+            self.evicted += 1
+            if not quietest:
+                del self._channels[quietest_id]
+
+    def get(self, channel_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Get a buffered message."""
+        messages = self._channels.get(channel_id)
+        return messages.get(message_id) if messages is not None else None
+
+    def pop(self, channel_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Remove and return a buffered message, e.g. because it was deleted."""
+        messages = self._channels.get(channel_id)
+        if messages is None:
+            return None
+        message = messages.pop(message_id, None)
+        if message is not None:
+            self.size -= message.size
+            if not messages:
+                del self._channels[channel_id]
+        return message
+
+    def update(self, channel_id: int, message_id: int, content: str) -> Optional[str]:
+        """
+        Replace the content of a buffered message.
+
+        Returns:
+            Optional[str]: The previous content, or None if the message is not buffered.
+        """
+        message = self.get(channel_id, message_id)
+        if message is None:
+            return None
+        previous = message.content
+        self.size -= message.size
+        message.content = content
+        self.size += message.size
+        return previous
+
+    def drop_channel(self, channel_id: int) -> None:
+        """Forget the messages of a channel, e.g. because it is no longer watched."""
+        messages = self._channels.pop(channel_id, None)
+        if messages is not None:
+            self.size -= sum(message.size for message in messages.values())
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of channels and messages buffered, the bytes used and the messages evicted."""
+        return {
+            "channels": len(self._channels),
+            "messages": len(self),
+            "bytes": self.size,
+            "evicted": self.evicted,
+        }
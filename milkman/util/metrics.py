@@ -0,0 +1,250 @@
+"""
+Lightweight in-process metrics for latency diagnostics.
+"""
+
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import discord
+
+# Upper bounds in seconds of the latency histogram buckets, from a millisecond to ten seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """
+    Get a percentile of some values with the nearest-rank method.
+
+    Args:
+        values (Iterable[float]): The values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The percentile, or None if there are no values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class RecentSamples:
+    """
+    Keeps the most recent samples of a measurement to report its percentiles.
+    """
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size (int): The number of samples kept.
+        """
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, value: float) -> None:
+        """Record a sample, forgetting the oldest one if the window is full."""
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Get a percentile of the recent samples, or None if there are none."""
+        return percentile(self.samples, q)
+
+
+class Histogram:
+    """
+    Counts observations in fixed buckets, so recording is constant time and memory whatever the
+    number of observations. Percentiles are estimated by interpolating within a bucket, clamped to
+    the smallest and largest observation.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            buckets (Sequence[float]): The upper bounds of the buckets, a bucket for larger values is added.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        """Record an observation in the first bucket whose upper bound is at least the value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the observations of a histogram with the same buckets."""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a percentile of the observations.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            Optional[float]: The estimate, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = max(self.buckets[i - 1] if i else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        """The mean of the observations, or None if nothing was observed."""
+        return self.sum / self.count if self.count else None
+
+
+class RollingHistogram:
+    """
+    A histogram per time slot, so observations can be reported over any recent window as well as
+    since startup. Slots are only created when something is observed in them.
+    """
+
+    def __init__(self, slot_seconds: float, slots: int, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            slot_seconds (float): The length of a slot in seconds.
+            slots (int): The number of slots kept, so observations are kept for `slot_seconds * slots` seconds.
+            buckets (Sequence[float]): The upper bounds of the buckets.
+        """
+        self.slot_seconds = slot_seconds
+        self.buckets = buckets
+        self.total = Histogram(buckets)
+        self._slots: Deque[Tuple[int, Histogram]] = deque(maxlen=slots)
+
+    def observe(self, value: float, now: Optional[float] = None) -> None:
+        """Record an observation in the slot of the current time."""
+        slot = int((time.time() if now is None else now) // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots.append((slot, Histogram(self.buckets)))
+        self._slots[-1][1].observe(value)
+        self.total.observe(value)
+
+    def window(self, seconds: float, now: Optional[float] = None) -> Histogram:
+        """Merge the slots of the last `seconds` seconds, rounded up to whole slots, into one histogram."""
+        oldest = int(((time.time() if now is None else now) - seconds) // self.slot_seconds)
+        merged = Histogram(self.buckets)
+        for slot, histogram in reversed(self._slots):
+            if slot <= oldest:
+                break
+            merged.merge(histogram)
+        return merged
+
+
+class CommandSummary(NamedTuple):
+    """The invocations of a command over a window, with its latency percentiles in seconds."""
+
+    name: str
+    calls: int
+    errors: int
+    per_minute: float
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+
+class CommandMetrics:
+    """
+    Wall time and failures of every command, in rolling histograms per command.
+    """
+
+    def __init__(self, slot_seconds: float, slots: int):
+        """
+        Args:
+            slot_seconds (float): The length of a slot in seconds.
+            slots (int): The number of slots kept per command.
+        """
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        # Command name -> (wall time of every invocation, wall time of failed invocations)
+        self.commands: Dict[str, Tuple[RollingHistogram, RollingHistogram]] = {}
+
+    @property
+    def retention(self) -> float:
+        """The number of seconds the observations are kept for."""
+        return self.slot_seconds * self.slots
+
+    def record(self, name: str, seconds: float, failed: bool) -> None:
+        """Record an invocation of a command."""
+        histograms = self.commands.get(name)
+        if histograms is None:
+            histograms = self.commands[name] = (
+                RollingHistogram(self.slot_seconds, self.slots),
+                RollingHistogram(self.slot_seconds, self.slots),
+            )
+        now = time.time()
+        histograms[0].observe(seconds, now)
+        if failed:
+            histograms[1].observe(seconds, now)
+
+    def summary(self, window: float) -> List[CommandSummary]:
+        """
+        Summarise the invocations of every command over the last `window` seconds, most invoked first.
+        """
+        now = time.time()
+        summaries = []
+        for name, (calls, errors) in self.commands.items():
+            histogram = calls.window(window, now)
+            if not histogram.count:
+                continue
+            summaries.append(
+                CommandSummary(
+                    name,
+                    histogram.count,
+                    errors.window(window, now).count,
+                    histogram.count / (window / 60),
+                    histogram.percentile(50),
+                    histogram.percentile(95),
+                    histogram.percentile(99),
+                )
+            )
+        return sorted(summaries, key=lambda summary: summary.calls, reverse=True)
+
+
+def shard_latencies(client: discord.Client) -> List[Tuple[int, float]]:
+    """Get the heartbeat latency of each shard, only auto-sharded clients have more than one."""
+    if isinstance(client, discord.AutoShardedClient):
+        return client.latencies
+    return [(client.shard_id or 0, client.latency)]
+
+
+async def measure_loop_lag() -> float:
+    """
+    Measure how long the event loop takes to get back to a task that yields.
+
+    Returns:
+        float: The seconds between yielding and resuming, which grows when callbacks block the loop.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.sleep(0)
+    return loop.time() - start
@@ -0,0 +1,245 @@
+"""
+A Prometheus text format endpoint for the metrics of the bot.
+"""
+
+import logging
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+from discord.ext import commands
+
+from milkman.constants import TEMPORARY_VOICE_COG_NAME
+from milkman.util.metrics import Histogram, shard_latencies
+
+logger = logging.getLogger(__name__)
+
+Labels = Dict[str, str]
+
+
+def escape_label_value(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    """Format labels as `{name="value",...}`."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value: float) -> str:
+    """Format a sample value, including the special values of the text format."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    """
+    Builds a page of metrics in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    def _header(self, name: str, kind: str, description: str) -> str:
+        name = f"{self.prefix}_{name}"
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def gauge(self, name: str, description: str, samples: Iterable[Tuple[Labels, float]]) -> None:
+        """Write a gauge with a sample per set of labels."""
+        name = self._header(name, "gauge", description)
+        self.lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+
+    def counter(self, name: str, description: str, samples: Iterable[Tuple[Labels, float]]) -> None:
+        """Write a counter with a sample per set of labels, `name` without the `_total` suffix."""
+        name = self._header(name, "counter", description)
+        self.lines.extend(f"{name}_total{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+
+    def histogram(self, name: str, description: str, samples: Iterable[Tuple[Labels, Histogram]]) -> None:
+        """Write a histogram with cumulative buckets per set of labels."""
+        name = self._header(name, "histogram", description)
+        for labels, histogram in samples:
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": format_value(float(bound))}
+                self.lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+            self.lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+            self.lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+    def text(self) -> str:
+        """Get the page."""
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(bot: commands.Bot) -> str:
+    """
+    Collect the metrics of the bot. Everything is read from counters and histograms the bot keeps
+    anyway, so nothing is measured until a scrape asks for it.
+
+    Args:
+        bot (commands.Bot): The bot instance.
+
+    Returns:
+        str: The metrics in the Prometheus text format.
+    """
+    writer = MetricsWriter("milkman")
+
+    writer.gauge(
+        "gateway_latency_seconds",
+        "Latency between a gateway heartbeat and its acknowledgement.",
+        (({"shard": str(shard_id)}, latency) for shard_id, latency in shard_latencies(bot)),
+    )
+    writer.gauge("guilds", "Guilds the bot is in.", [({}, len(bot.guilds))])
+    writer.gauge(
+        "members",
+        "Members of the guilds the bot is in, as reported by Discord.",
+        [({}, sum(guild.member_count or 0 for guild in bot.guilds))],
+    )
+
+    command_metrics = bot.command_metrics.commands
+    writer.counter(
+        "commands",
+        "Commands invoked.",
+        (({"command": name}, calls.total.count) for name, (calls, _) in command_metrics.items()),
+    )
+    writer.counter(
+        "command_errors",
+        "Commands that raised an error.",
+        (({"command": name}, errors.total.count) for name, (_, errors) in command_metrics.items()),
+    )
+    writer.histogram(
+        "command_duration_seconds",
+        "Wall time of commands from after their checks until they returned.",
+        (({"command": name}, calls.total) for name, (calls, _) in command_metrics.items()),
+    )
+
+    writer.histogram(
+        "db_query_duration_seconds",
+        "Wall time of database statements by kind.",
+        (({"statement": kind}, histogram) for kind, histogram in bot.db_config.query_timings.items()),
+    )
+
+    temporary_voice = bot.get_cog(TEMPORARY_VOICE_COG_NAME)
+    if temporary_voice is not None:
+        writer.gauge(
+            "temporary_channels_active",
+            "Temporary voice channels that currently exist.",
+            [({}, len(temporary_voice.temporary_channels))],
+        )
+
+        channel_queue = temporary_voice.channel_queue
+        queue_stats = channel_queue.stats()
+        writer.gauge("channel_queue_depth", "Channel operations waiting to run.", [({}, channel_queue.depth)])
+        writer.gauge(
+            "channel_queue_oldest_wait_seconds",
+            "How long the oldest waiting channel operation has been queued for.",
+            [({}, channel_queue.oldest_wait())],
+        )
+        writer.counter(
+            "channel_operations",
+            "Channel operations by how they left the queue.",
+            [
+                ({"result": "processed"}, queue_stats.processed),
+                ({"result": "failed"}, queue_stats.failed),
+                ({"result": "collapsed"}, queue_stats.collapsed),
+            ],
+        )
+        writer.counter(
+            "channel_operation_wait_seconds",
+            "Seconds channel operations spent queued before they ran.",
+            [({}, queue_stats.total_wait)],
+        )
+        writer.gauge(
+            "channel_operation_max_wait_seconds",
+            "The longest a channel operation has been queued for before it ran.",
+            [({}, queue_stats.max_wait)],
+        )
+        writer.counter(
+            "channel_queue_throttles",
+            "Times a channel queue waited for its rate limit bucket.",
+            [({}, queue_stats.throttled)],
+        )
+        writer.counter(
+            "channel_queue_throttled_seconds",
+            "Seconds channel queues spent waiting for their rate limit buckets.",
+            [({}, queue_stats.throttled_seconds)],
+        )
+
+    resolver = bot.member_resolver
+    writer.counter(
+        "member_resolver_lookups",
+        "Member lookups by how they were answered.",
+        [
+            ({"result": "member_cache"}, resolver.stats.cached),
+            ({"result": "hit"}, resolver.stats.hits),
+            ({"result": "negative_hit"}, resolver.stats.negative_hits),
+            ({"result": "miss"}, resolver.stats.misses),
+        ],
+    )
+    writer.gauge(
+        "member_resolver_hit_ratio",
+        "Share of member lookups answered without asking Discord.",
+        [({}, resolver.stats.hit_rate)],
+    )
+    writer.gauge("member_resolver_entries", "Members and absences held by the member resolver.", [({}, len(resolver))])
+
+    writer.histogram(
+        "event_loop_lag_seconds",
+        "How much later than asked the event loop resumed a sleeping task.",
+        [({}, bot.loop_monitor.histogram)],
+    )
+    writer.counter(
+        "event_loop_stalls",
+        "Times the event loop was blocked for longer than the slow callback threshold.",
+        [({}, bot.loop_monitor.stalls)],
+    )
+    return writer.text()
+
+
+class MetricsServer:
+    """
+    Serves the metrics of the bot at `/metrics` for Prometheus to scrape.
+    """
+
+    def __init__(self, bot: commands.Bot, host: str, port: int):
+        """
+        Args:
+            bot (commands.Bot): The bot instance.
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+        """
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        """Start listening."""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Render the metrics."""
+        return web.Response(
+            body=render_metrics(self.bot).encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
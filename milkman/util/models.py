@@ -5,7 +5,7 @@ SQLAlchemy models for the Discord bot database.
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Integer, String, Text, func
+from sqlalchemy import Boolean, DateTime, Index, Integer, String, Text, UniqueConstraint, func
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -19,6 +19,7 @@ class GuildWarning(Base):
     """Model for storing user warnings."""
     
     __tablename__ = "warns"
+    __table_args__ = (Index("ix_warns_guild_user_created", "guild_id", "user_id", "created_at"),)
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str] = mapped_column(String, nullable=False)
@@ -39,4 +40,168 @@ class TemporaryChannel(Base):
     creator_id: Mapped[str] = mapped_column(String, nullable=False)
     is_deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
-    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
\ No newline at end of file
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class TemporaryChannelHourlyRollup(Base):
+    """Model for storing the temporary channel usage of a guild, rolled up per hour."""
+
+    __tablename__ = "temporary_channel_hourly_rollups"
+    __table_args__ = (UniqueConstraint("guild_id", "hour_start"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    hour_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    peak_concurrent: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lifetime_seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class TemporaryChannelLifetimeRollup(Base):
+    """Model for storing a histogram of temporary channel lifetimes of a guild, rolled up per hour."""
+
+    __tablename__ = "temporary_channel_lifetime_rollups"
+    __table_args__ = (UniqueConstraint("guild_id", "hour_start", "bucket"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    hour_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    bucket: Mapped[int] = mapped_column(Integer, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class RaidProtectionSettings(Base):
+    """Model for storing the raid protection settings of a guild."""
+
+    __tablename__ = "raid_protection_settings"
+
+    guild_id: Mapped[str] = mapped_column(String, primary_key=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    join_threshold: Mapped[int] = mapped_column(Integer, nullable=False)
+    join_window: Mapped[int] = mapped_column(Integer, nullable=False)
+    duplicate_threshold: Mapped[int] = mapped_column(Integer, nullable=False)
+    duplicate_window: Mapped[int] = mapped_column(Integer, nullable=False)
+    actions: Mapped[str] = mapped_column(String, nullable=False)
+    slowmode_delay: Mapped[int] = mapped_column(Integer, nullable=False)
+    alert_channel_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+
+class AutomodRule(Base):
+    """Model for storing the automod rules of a guild."""
+
+    __tablename__ = "automod_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    pattern: Mapped[str] = mapped_column(Text, nullable=False)
+    created_by: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class WarningEscalationPolicy(Base):
+    """Model for storing the automatic actions a guild takes when a user collects warnings."""
+
+    __tablename__ = "warning_escalation_policies"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    threshold: Mapped[int] = mapped_column(Integer, nullable=False)
+    window_days: Mapped[int] = mapped_column(Integer, nullable=False)
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    duration_minutes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_by: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class EscalationAction(Base):
+    """Model for the audit record of an action taken by a warning escalation policy."""
+
+    __tablename__ = "escalation_actions"
+    __table_args__ = (Index("ix_escalation_actions_guild_user", "guild_id", "user_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[str] = mapped_column(String, nullable=False)
+    policy_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    warning_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    warning_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    window_days: Mapped[int] = mapped_column(Integer, nullable=False)
+    duration_minutes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    succeeded: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class ScheduledAction(Base):
+    """Model for storing timed moderation actions that have not been carried out yet."""
+
+    __tablename__ = "scheduled_actions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    target_id: Mapped[str] = mapped_column(String, nullable=False)
+    due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    created_by: Mapped[str] = mapped_column(String, nullable=False)
+    reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class MessageLogSettings(Base):
+    """Model for storing which channels of a guild have their deleted and edited messages logged, and where."""
+
+    __tablename__ = "message_log_settings"
+
+    guild_id: Mapped[str] = mapped_column(String, primary_key=True)
+    log_channel_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    watched_channel_ids: Mapped[str] = mapped_column(Text, nullable=False, default="")
+
+
+class ReactionRoleBinding(Base):
+    """Model for storing which role a reaction on a message gives."""
+
+    __tablename__ = "reaction_role_bindings"
+    __table_args__ = (UniqueConstraint("message_id", "emoji"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    channel_id: Mapped[str] = mapped_column(String, nullable=False)
+    message_id: Mapped[str] = mapped_column(String, nullable=False)
+    emoji: Mapped[str] = mapped_column(String, nullable=False)
+    role_id: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class Poll(Base):
+    """Model for storing a reaction poll or giveaway."""
+
+    __tablename__ = "polls"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[str] = mapped_column(String, nullable=False)
+    channel_id: Mapped[str] = mapped_column(String, nullable=False)
+    message_id: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    author_id: Mapped[str] = mapped_column(String, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    options: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    winners: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    ends_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    ended: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.current_timestamp())
+
+
+class PollVote(Base):
+    """Model for storing a vote on an option of a poll, or an entry to a giveaway."""
+
+    __tablename__ = "poll_votes"
+    __table_args__ = (UniqueConstraint("poll_id", "option", "user_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    poll_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    option: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[str] = mapped_column(String, nullable=False)
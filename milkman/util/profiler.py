@@ -0,0 +1,142 @@
+"""
+A sampling profiler for the thread running the event loop, usable while the bot runs.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import List, NamedTuple, Tuple
+
+# Leaf functions the loop thread is in while it waits for something to do
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue", "control"}
+
+
+def frame_name(frame: FrameType) -> str:
+    """Name a frame by its function and where the function is defined, without semicolons."""
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class FunctionStats(NamedTuple):
+    """The samples a function was on the stack in, and the samples it was running itself in."""
+
+    name: str
+    own: int
+    total: int
+
+
+class ProfileResult:
+    """
+    The stacks sampled by a profile, counted per unique stack.
+    """
+
+    def __init__(self):
+        self.stacks: Counter[Tuple[str, ...]] = Counter()
+        self.samples = 0
+        self.idle = 0
+        self.duration = 0.0
+        self.overhead = 0.0
+
+    @property
+    def busy(self) -> int:
+        """The number of samples in which the loop was running code rather than waiting."""
+        return self.samples - self.idle
+
+    def top(self, limit: int) -> List[FunctionStats]:
+        """
+        Get the functions the busy samples spent the most time running themselves.
+
+        Args:
+            limit (int): The number of functions.
+
+        Returns:
+            List[FunctionStats]: The functions, most samples first.
+        """
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+        return [FunctionStats(name, count, total[name]) for name, count in own.most_common(limit)]
+
+    def collapsed(self) -> str:
+        """Get the busy stacks in the collapsed format flamegraph tools read, root frame first."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of a thread from another thread at a fixed interval.
+
+    Nothing is installed in the profiled thread, so it runs at full speed between samples. The
+    sampler sleeps long enough between samples that taking them uses at most `max_overhead` of
+    the wall time, and deep stacks are cut at `max_depth` frames from the leaf.
+    """
+
+    def __init__(self, thread_id: int, *, interval: float, max_overhead: float, max_depth: int):
+        """
+        Args:
+            thread_id (int): The ID of the thread to sample.
+            interval (float): The seconds between samples when sampling is cheap.
+            max_overhead (float): The largest share of the wall time spent sampling.
+            max_depth (int): The most frames kept per sample.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.result = ProfileResult()
+        self._stop = threading.Event()
+
+    async def run(self, seconds: float) -> ProfileResult:
+        """
+        Sample for some seconds, or until stopped, without blocking the event loop.
+
+        Args:
+            seconds (float): How long to sample for.
+
+        Returns:
+            ProfileResult: The samples.
+        """
+        await asyncio.to_thread(self._sample, seconds)
+        return self.result
+
+    def stop(self) -> None:
+        """Stop sampling early, keeping the samples taken so far."""
+        self._stop.set()
+
+    def _sample(self, seconds: float) -> None:
+        result = self.result
+        started = time.perf_counter()
+        deadline = started + seconds
+        sampling = 0.0
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            sample_started = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+
+            stack: List[str] = []
+            leaf = frame.f_code.co_name
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            del frame
+
+            result.samples += 1
+            if leaf in IDLE_FUNCTIONS:
+                result.idle += 1
+            else:
+                result.stacks[tuple(reversed(stack))] += 1
+
+            cost = time.perf_counter() - sample_started
+            sampling += cost
+            self._stop.wait(max(self.interval, cost / self.max_overhead - cost))
+
+        result.duration = time.perf_counter() - started
+        result.overhead = sampling / result.duration if result.duration else 0.0
@@ -0,0 +1,82 @@
+"""
+Throttled progress messages for long-running commands.
+"""
+
+import logging
+import time
+
+import discord
+from discord.ext.commands import Context
+
+from milkman.constants import SUCCESS_COLOR
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressMessage:
+    """
+    A message that reports the progress of a long-running command, edited at most once per interval
+    so that progress updates do not compete with the work for rate limits.
+    """
+
+    def __init__(self, message: discord.Message, embed: discord.Embed, interval: float):
+        """
+        Args:
+            message (discord.Message): The message to edit.
+            embed (discord.Embed): The embed shown in the message.
+            interval (float): The minimum number of seconds between edits.
+        """
+        self.message = message
+        self.embed = embed
+        self.interval = interval
+        self._last_update = time.monotonic()
+
+    @classmethod
+    async def send(cls, ctx: Context, title: str, description: str, interval: float = 2.0) -> "ProgressMessage":
+        """
+        Send a new progress message.
+
+        Args:
+            ctx (Context): The context of the command.
+            title (str): The title of the progress embed.
+            description (str): The initial description of the progress embed.
+            interval (float): The minimum number of seconds between edits.
+
+        Returns:
+            ProgressMessage: The progress message.
+        """
+        embed = discord.Embed(title=title, description=description, color=SUCCESS_COLOR)
+        message = await ctx.send(embed=embed)
+        return cls(message, embed, interval)
+
+    async def update(self, description: str, force: bool = False) -> None:
+        """
+        Update the progress, skipping the edit if the last one was less than an interval ago.
+
+        Args:
+            description (str): The new description of the progress embed.
+            force (bool): Whether to edit the message regardless of the interval.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+
+        self.embed.description = description
+        try:
+            await self.message.edit(embed=self.embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to update progress message: {e}")
+
+    async def finish(self, embed: discord.Embed) -> None:
+        """
+        Replace the progress with a final result.
+
+        Args:
+            embed (discord.Embed): The embed with the result.
+        """
+        self.embed = embed
+        try:
+            await self.message.edit(embed=embed)
+        except discord.HTTPException:
+            await self.message.channel.send(embed=embed)
@@ -2,13 +2,55 @@
 Repository classes for database operations using SQLAlchemy.
 """
 
-from datetime import datetime
-from typing import List, Optional
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import Integer, cast, column, delete, func, literal_column, select, table, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .models import TemporaryChannel, GuildWarning
+from .models import (
+    AutomodRule,
+    EscalationAction,
+    MessageLogSettings,
+    Poll,
+    PollVote,
+    RaidProtectionSettings,
+    ReactionRoleBinding,
+    ScheduledAction,
+    TemporaryChannel,
+    TemporaryChannelHourlyRollup,
+    TemporaryChannelLifetimeRollup,
+    GuildWarning,
+    WarningEscalationPolicy,
+)
+
+# The full-text index over the warning reasons, created by DatabaseConfig.create_tables
+warning_search = table("warns_fts", column("rowid"))
+SEARCH_TOKEN_REGEX = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn a user search query into an FTS5 query that cannot be a syntax error.
+
+    Quoted text is searched as a phrase, a word ending in `*` as a prefix and `OR` between terms is
+    kept as an operator. Everything else is quoted, so punctuation is never parsed as FTS5 syntax.
+    """
+    terms = []
+    for phrase, word in SEARCH_TOKEN_REGEX.findall(query):
+        if word == "OR":
+            if terms and terms[-1] != "OR":
+                terms.append("OR")
+            continue
+        prefix = not phrase and word.endswith("*")
+        value = (phrase or word).strip().rstrip("*" if prefix else "").replace('"', "")
+        if value:
+            terms.append(f'"{value}"' + ("*" if prefix else ""))
+    while terms and terms[-1] == "OR":
+        terms.pop()
+    return " ".join(terms)
 
 
 class WarningRepository:
@@ -64,6 +106,75 @@ class WarningRepository:
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def count_recent_warnings(
+        self,
+        user_id: str,
+        guild_id: str,
+        windows: Iterable[int],
+        now: datetime,
+    ) -> Dict[int, int]:
+        """Count the warnings of a user in a guild within each window of days before now, in a single indexed query."""
+        windows = sorted(set(windows))
+        if not windows:
+            return {}
+        starts = [now - timedelta(days=days) for days in windows]
+        stmt = select(
+            *(func.count().filter(GuildWarning.created_at >= start) for start in starts)
+        ).where(
+            GuildWarning.guild_id == guild_id,
+            GuildWarning.user_id == user_id,
+            GuildWarning.created_at >= starts[-1],
+        )
+        result = await self.session.execute(stmt)
+        return dict(zip(windows, result.one()))
+
+    async def search_warnings(
+        self,
+        guild_id: str,
+        query: str,
+        user_id: Optional[str] = None,
+        moderator_id: Optional[str] = None,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> Tuple[List[Tuple[GuildWarning, str]], int]:
+        """Search the warning reasons of a guild, returning a page of warnings with highlighted snippets, best match first, and the total number of matches."""
+        fts_query = to_fts_query(query)
+        if not fts_query:
+            return [], 0
+
+        matches_query = text("warns_fts MATCH :query").bindparams(query=fts_query)
+        conditions = [GuildWarning.guild_id == guild_id]
+        if user_id is not None:
+            conditions.append(GuildWarning.user_id == user_id)
+        if moderator_id is not None:
+            conditions.append(GuildWarning.moderator_id == moderator_id)
+        if after is not None:
+            conditions.append(GuildWarning.created_at >= after)
+        if before is not None:
+            conditions.append(GuildWarning.created_at < before)
+
+        snippet = literal_column("snippet(warns_fts, 0, '**', '**', '…', 16)")
+        stmt = (
+            select(GuildWarning, snippet)
+            .select_from(warning_search.join(GuildWarning, GuildWarning.id == warning_search.c.rowid))
+            .where(matches_query, *conditions)
+            .order_by(literal_column("bm25(warns_fts)"))
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await self.session.execute(stmt)
+        matches = [tuple(row) for row in result.all()]
+
+        # Through the join SQLite may start from the guild index and run the match once per warning
+        # of the guild, matching once and filtering the matched IDs is orders of magnitude faster
+        matched_ids = select(warning_search.c.rowid).where(matches_query)
+        count = await self.session.execute(
+            select(func.count()).select_from(GuildWarning).where(GuildWarning.id.in_(matched_ids), *conditions)
+        )
+        return matches, count.scalar_one()
+
 
 class TemporaryChannelRepository:
     """Repository for temporary channel-related database operations."""
@@ -104,7 +215,22 @@ class TemporaryChannelRepository:
         )
         result = await self.session.execute(stmt)
         return result.rowcount > 0
-    
+
+    async def remove_temporary_channels(self, channel_ids: List[str]) -> int:
+        """Mark several temporary channels as deleted in a single statement."""
+        if not channel_ids:
+            return 0
+        stmt = (
+            update(TemporaryChannel)
+            .where(
+                TemporaryChannel.channel_id.in_(channel_ids),
+                TemporaryChannel.is_deleted == False
+            )
+            .values(is_deleted=True, deleted_at=datetime.now())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
     async def get_active_temporary_channels(self) -> List[TemporaryChannel]:
         """Get all temporary channels that have not been deleted."""
         stmt = select(TemporaryChannel).where(TemporaryChannel.is_deleted == False)
@@ -125,6 +251,475 @@ class TemporaryChannelRepository:
         return result.scalar_one_or_none()
 
 
+class TemporaryChannelStatsRepository:
+    """Repository for the rolled up temporary channel usage statistics."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_hourly_usage(
+        self,
+        guild_id: str,
+        hour_start: datetime,
+        created: int,
+        deleted: int,
+        peak_concurrent: int,
+        lifetime_seconds: int,
+    ) -> None:
+        """Add usage counts to the rollup of an hour, keeping the highest peak."""
+        stmt = insert(TemporaryChannelHourlyRollup).values(
+            guild_id=guild_id,
+            hour_start=hour_start,
+            created=created,
+            deleted=deleted,
+            peak_concurrent=peak_concurrent,
+            lifetime_seconds=lifetime_seconds,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["guild_id", "hour_start"],
+            set_={
+                "created": TemporaryChannelHourlyRollup.created + stmt.excluded.created,
+                "deleted": TemporaryChannelHourlyRollup.deleted + stmt.excluded.deleted,
+                "peak_concurrent": func.max(TemporaryChannelHourlyRollup.peak_concurrent, stmt.excluded.peak_concurrent),
+                "lifetime_seconds": TemporaryChannelHourlyRollup.lifetime_seconds + stmt.excluded.lifetime_seconds,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def add_lifetimes(
+        self,
+        guild_id: str,
+        hour_start: datetime,
+        counts: Dict[int, int],
+    ) -> None:
+        """Add channel lifetime histogram counts to the rollup of an hour."""
+        if not counts:
+            return
+        stmt = insert(TemporaryChannelLifetimeRollup).values(
+            [
+                {"guild_id": guild_id, "hour_start": hour_start, "bucket": bucket, "count": count}
+                for bucket, count in counts.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["guild_id", "hour_start", "bucket"],
+            set_={"count": TemporaryChannelLifetimeRollup.count + stmt.excluded.count},
+        )
+        await self.session.execute(stmt)
+
+    async def get_usage_totals(
+        self,
+        guild_id: str,
+        since: datetime,
+    ) -> Tuple[int, int, int, int]:
+        """Get the channels created, channels deleted, peak concurrent channels and total lifetime since a point in time."""
+        stmt = select(
+            func.coalesce(func.sum(TemporaryChannelHourlyRollup.created), 0),
+            func.coalesce(func.sum(TemporaryChannelHourlyRollup.deleted), 0),
+            func.coalesce(func.max(TemporaryChannelHourlyRollup.peak_concurrent), 0),
+            func.coalesce(func.sum(TemporaryChannelHourlyRollup.lifetime_seconds), 0),
+        ).where(
+            TemporaryChannelHourlyRollup.guild_id == guild_id,
+            TemporaryChannelHourlyRollup.hour_start >= since,
+        )
+        result = await self.session.execute(stmt)
+        return tuple(result.one())
+
+    async def get_busiest_hours(
+        self,
+        guild_id: str,
+        since: datetime,
+        limit: int = 3,
+    ) -> List[Tuple[int, int]]:
+        """Get the hours of the day (UTC) in which the most channels were created, with their counts."""
+        hour_of_day = cast(func.strftime("%H", TemporaryChannelHourlyRollup.hour_start), Integer)
+        created = func.sum(TemporaryChannelHourlyRollup.created)
+        stmt = (
+            select(hour_of_day, created)
+            .where(
+                TemporaryChannelHourlyRollup.guild_id == guild_id,
+                TemporaryChannelHourlyRollup.hour_start >= since,
+            )
+            .group_by(hour_of_day)
+            .having(created > 0)
+            .order_by(created.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def get_lifetime_histogram(
+        self,
+        guild_id: str,
+        since: datetime,
+    ) -> Dict[int, int]:
+        """Get the channel lifetime histogram counts since a point in time, by bucket."""
+        stmt = (
+            select(TemporaryChannelLifetimeRollup.bucket, func.sum(TemporaryChannelLifetimeRollup.count))
+            .where(
+                TemporaryChannelLifetimeRollup.guild_id == guild_id,
+                TemporaryChannelLifetimeRollup.hour_start >= since,
+            )
+            .group_by(TemporaryChannelLifetimeRollup.bucket)
+        )
+        result = await self.session.execute(stmt)
+        return {bucket: count for bucket, count in result.all()}
+
+
+class RaidProtectionRepository:
+    """Repository for raid protection settings."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all_settings(self) -> List[RaidProtectionSettings]:
+        """Get the raid protection settings of every guild that has any."""
+        result = await self.session.execute(select(RaidProtectionSettings))
+        return list(result.scalars().all())
+
+    async def save_settings(self, settings: RaidProtectionSettings) -> RaidProtectionSettings:
+        """Insert or update the raid protection settings of a guild."""
+        settings = await self.session.merge(settings)
+        await self.session.flush()
+        return settings
+
+
+class AutomodRuleRepository:
+    """Repository for automod rule-related database operations."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_rule(
+        self,
+        guild_id: str,
+        kind: str,
+        pattern: str,
+        created_by: str,
+    ) -> AutomodRule:
+        """Add an automod rule to the database."""
+        rule = AutomodRule(guild_id=guild_id, kind=kind, pattern=pattern, created_by=created_by)
+        self.session.add(rule)
+        await self.session.flush()  # Ensure ID is available
+        return rule
+
+    async def remove_rule(self, rule_id: int, guild_id: str) -> bool:
+        """Remove an automod rule from the database."""
+        stmt = delete(AutomodRule).where(AutomodRule.id == rule_id, AutomodRule.guild_id == guild_id)
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def get_all_rules(self) -> List[AutomodRule]:
+        """Get the automod rules of every guild, ordered by ID."""
+        result = await self.session.execute(select(AutomodRule).order_by(AutomodRule.id))
+        return list(result.scalars().all())
+
+
+class EscalationRepository:
+    """Repository for warning escalation policies and the actions they took."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_policy(
+        self,
+        guild_id: str,
+        threshold: int,
+        window_days: int,
+        action: str,
+        duration_minutes: Optional[int],
+        created_by: str,
+    ) -> WarningEscalationPolicy:
+        """Add a warning escalation policy to the database."""
+        policy = WarningEscalationPolicy(
+            guild_id=guild_id,
+            threshold=threshold,
+            window_days=window_days,
+            action=action,
+            duration_minutes=duration_minutes,
+            created_by=created_by,
+        )
+        self.session.add(policy)
+        await self.session.flush()  # Ensure ID is available
+        return policy
+
+    async def remove_policy(self, policy_id: int, guild_id: str) -> bool:
+        """Remove a warning escalation policy from the database."""
+        stmt = delete(WarningEscalationPolicy).where(
+            WarningEscalationPolicy.id == policy_id,
+            WarningEscalationPolicy.guild_id == guild_id,
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def get_policies(self, guild_id: str) -> List[WarningEscalationPolicy]:
+        """Get the warning escalation policies of a guild, ordered by window and threshold."""
+        stmt = (
+            select(WarningEscalationPolicy)
+            .where(WarningEscalationPolicy.guild_id == guild_id)
+            .order_by(WarningEscalationPolicy.window_days, WarningEscalationPolicy.threshold)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def add_action(
+        self,
+        policy: WarningEscalationPolicy,
+        user_id: str,
+        warning_id: int,
+        warning_count: int,
+        succeeded: bool,
+        error: Optional[str] = None,
+    ) -> EscalationAction:
+        """Record an action taken by a warning escalation policy."""
+        action = EscalationAction(
+            guild_id=policy.guild_id,
+            user_id=user_id,
+            policy_id=policy.id,
+            warning_id=warning_id,
+            action=policy.action,
+            warning_count=warning_count,
+            window_days=policy.window_days,
+            duration_minutes=policy.duration_minutes,
+            succeeded=succeeded,
+            error=error,
+        )
+        self.session.add(action)
+        await self.session.flush()
+        return action
+
+    async def get_actions(self, user_id: str, guild_id: str, limit: int = 10) -> List[EscalationAction]:
+        """Get the most recent escalation actions taken against a user in a guild, newest first."""
+        stmt = (
+            select(EscalationAction)
+            .where(EscalationAction.guild_id == guild_id, EscalationAction.user_id == user_id)
+            .order_by(EscalationAction.id.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+
+class ScheduledActionRepository:
+    """Repository for timed moderation actions."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_action(
+        self,
+        guild_id: str,
+        action: str,
+        target_id: str,
+        due_at: datetime,
+        created_by: str,
+        reason: Optional[str],
+    ) -> ScheduledAction:
+        """Add a scheduled action to the database."""
+        scheduled = ScheduledAction(
+            guild_id=guild_id,
+            action=action,
+            target_id=target_id,
+            due_at=due_at,
+            created_by=created_by,
+            reason=reason,
+            attempts=0,
+        )
+        self.session.add(scheduled)
+        await self.session.flush()  # Ensure ID is available
+        return scheduled
+
+    async def remove_actions(self, action_ids: List[int]) -> int:
+        """Remove several scheduled actions in a single statement."""
+        if not action_ids:
+            return 0
+        result = await self.session.execute(delete(ScheduledAction).where(ScheduledAction.id.in_(action_ids)))
+        return result.rowcount
+
+    async def remove_target_actions(self, guild_id: str, action: str, target_id: str) -> List[int]:
+        """Remove the scheduled actions of a kind on a target, returning their IDs."""
+        stmt = (
+            delete(ScheduledAction)
+            .where(
+                ScheduledAction.guild_id == guild_id,
+                ScheduledAction.action == action,
+                ScheduledAction.target_id == target_id,
+            )
+            .returning(ScheduledAction.id)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def retry_actions(self, action_ids: List[int], due_at: datetime) -> None:
+        """Count a failed attempt of several scheduled actions and move them to a later time."""
+        if not action_ids:
+            return
+        stmt = (
+            update(ScheduledAction)
+            .where(ScheduledAction.id.in_(action_ids))
+            .values(attempts=ScheduledAction.attempts + 1, due_at=due_at)
+        )
+        await self.session.execute(stmt)
+
+    async def get_pending_actions(self) -> List[ScheduledAction]:
+        """Get every scheduled action, earliest first."""
+        result = await self.session.execute(select(ScheduledAction).order_by(ScheduledAction.due_at))
+        return list(result.scalars().all())
+
+
+class MessageLogRepository:
+    """Repository for message log settings."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all_settings(self) -> List[MessageLogSettings]:
+        """Get the message log settings of every guild that has any."""
+        result = await self.session.execute(select(MessageLogSettings))
+        return list(result.scalars().all())
+
+    async def save_settings(self, settings: MessageLogSettings) -> MessageLogSettings:
+        """Insert or update the message log settings of a guild."""
+        settings = await self.session.merge(settings)
+        await self.session.flush()
+        return settings
+
+
+class ReactionRoleRepository:
+    """Repository for reaction role bindings."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def set_binding(
+        self,
+        guild_id: str,
+        channel_id: str,
+        message_id: str,
+        emoji: str,
+        role_id: str,
+    ) -> None:
+        """Bind a reaction on a message to a role, replacing the role it was bound to."""
+        stmt = insert(ReactionRoleBinding).values(
+            guild_id=guild_id,
+            channel_id=channel_id,
+            message_id=message_id,
+            emoji=emoji,
+            role_id=role_id,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["message_id", "emoji"],
+            set_={"role_id": stmt.excluded.role_id},
+        )
+        await self.session.execute(stmt)
+
+    async def remove_binding(self, message_id: str, emoji: str, guild_id: str) -> bool:
+        """Remove the binding of a reaction on a message."""
+        stmt = delete(ReactionRoleBinding).where(
+            ReactionRoleBinding.message_id == message_id,
+            ReactionRoleBinding.emoji == emoji,
+            ReactionRoleBinding.guild_id == guild_id,
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def remove_message_bindings(self, message_id: str) -> int:
+        """Remove every binding of a message, e.g. because it was deleted."""
+        stmt = delete(ReactionRoleBinding).where(ReactionRoleBinding.message_id == message_id)
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def get_all_bindings(self) -> List[ReactionRoleBinding]:
+        """Get the reaction role bindings of every guild."""
+        result = await self.session.execute(select(ReactionRoleBinding).order_by(ReactionRoleBinding.id))
+        return list(result.scalars().all())
+
+
+class PollRepository:
+    """Repository for polls, giveaways and their votes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_poll(
+        self,
+        guild_id: str,
+        channel_id: str,
+        message_id: str,
+        author_id: str,
+        kind: str,
+        title: str,
+        options: List[str],
+        winners: int,
+        ends_at: datetime,
+    ) -> Poll:
+        """Add a poll or giveaway."""
+        poll = Poll(
+            guild_id=guild_id,
+            channel_id=channel_id,
+            message_id=message_id,
+            author_id=author_id,
+            kind=kind,
+            title=title,
+            options="\n".join(options),
+            winners=winners,
+            ends_at=ends_at,
+        )
+        self.session.add(poll)
+        await self.session.flush()
+        return poll
+
+    async def get_poll(self, message_id: str, guild_id: str) -> Optional[Poll]:
+        """Get a poll or giveaway by the ID of its message."""
+        stmt = select(Poll).where(Poll.message_id == message_id, Poll.guild_id == guild_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_active_polls(self) -> List[Poll]:
+        """Get every poll and giveaway that has not ended."""
+        result = await self.session.execute(select(Poll).where(Poll.ended.is_(False)))
+        return list(result.scalars().all())
+
+    async def end_poll(self, poll_id: int) -> None:
+        """Mark a poll or giveaway as ended."""
+        await self.session.execute(update(Poll).where(Poll.id == poll_id).values(ended=True))
+
+    async def get_votes(self, poll_ids: List[int]) -> List[Tuple[int, int, int]]:
+        """Get the votes of polls as (poll ID, option, user ID) tuples."""
+        if not poll_ids:
+            return []
+        stmt = select(PollVote.poll_id, PollVote.option, PollVote.user_id).where(PollVote.poll_id.in_(poll_ids))
+        result = await self.session.execute(stmt)
+        return [(poll_id, option, int(user_id)) for poll_id, option, user_id in result.all()]
+
+    async def save_votes(
+        self,
+        poll_id: int,
+        added: Iterable[Tuple[int, int]],
+        removed: Iterable[Tuple[int, int]],
+    ) -> None:
+        """
+        Write the votes added and removed since the last checkpoint of a poll.
+
+        Args:
+            poll_id (int): The ID of the poll.
+            added (Iterable[Tuple[int, int]]): The (option, user ID) pairs voted for.
+            removed (Iterable[Tuple[int, int]]): The (option, user ID) pairs no longer voted for.
+        """
+        rows = [{"poll_id": poll_id, "option": option, "user_id": str(user_id)} for option, user_id in added]
+        if rows:
+            await self.session.execute(insert(PollVote).on_conflict_do_nothing(), rows)
+
+        pairs = [(option, str(user_id)) for option, user_id in removed]
+        # Stay well below the number of variables SQLite allows per statement
+        for start in range(0, len(pairs), 400):
+            stmt = delete(PollVote).where(
+                PollVote.poll_id == poll_id,
+                tuple_(PollVote.option, PollVote.user_id).in_(pairs[start:start + 400]),
+            )
+            await self.session.execute(stmt)
+
+
 class DatabaseService:
     """Service class that provides access to all repositories."""
     
@@ -132,6 +727,14 @@ class DatabaseService:
         self.session = session
         self.warnings = WarningRepository(session)
         self.temporary_channels = TemporaryChannelRepository(session)
+        self.temporary_channel_stats = TemporaryChannelStatsRepository(session)
+        self.raid_protection = RaidProtectionRepository(session)
+        self.automod_rules = AutomodRuleRepository(session)
+        self.escalations = EscalationRepository(session)
+        self.scheduled_actions = ScheduledActionRepository(session)
+        self.message_log = MessageLogRepository(session)
+        self.reaction_roles = ReactionRoleRepository(session)
+        self.polls = PollRepository(session)
     
     async def commit(self) -> None:
         """Commit the current transaction."""
@@ -0,0 +1,247 @@
+"""
+Coalescing of role changes per member, so that bursts of role changes cost one request per member.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+from discord.ext import commands
+
+from milkman.util.channel_queue import RateLimitBucket
+from milkman.util.scheduler import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+MemberKey = Tuple[int, int]
+
+
+class PendingRoles:
+    """
+    The role changes of a member waiting to be applied.
+    """
+
+    __slots__ = ("guild_id", "user_id", "member", "adds", "removes", "events")
+
+    def __init__(self, guild_id: int, user_id: int):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.member: Optional[discord.Member] = None
+        self.adds: Set[int] = set()
+        self.removes: Set[int] = set()
+        self.events = 0
+
+
+class RoleUpdateStats:
+    """
+    Counters of role change events and the requests made for them.
+    """
+
+    __slots__ = ("events", "requests", "skipped", "failed", "throttled", "throttled_seconds")
+
+    def __init__(self):
+        self.events = 0
+        self.requests = 0
+        self.skipped = 0
+        self.failed = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def saved(self) -> int:
+        """The number of requests saved compared to one request per event."""
+        return max(self.events - self.requests, 0)
+
+
+class RoleUpdateCoalescer:
+    """
+    Buffers role changes per member for a short window and applies them with a single member edit.
+
+    A member who adds and removes several reactions within the window gets one request with their
+    final roles, and changes that cancel out cost nothing. Requests are paced by a token bucket per
+    guild and run with bounded concurrency, and a rate limit response blocks the bucket of the guild
+    and requeues the change.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        window: float,
+        limit: Tuple[int, float],
+        max_concurrency: int,
+    ):
+        """
+        Args:
+            bot (commands.Bot): The bot instance.
+            window (float): Seconds the changes of a member are collected after the first one.
+            limit (Tuple[int, float]): The member edits allowed per window of seconds in each guild.
+            max_concurrency (int): The maximum number of member edits in flight across all guilds.
+        """
+        self.bot = bot
+        self.window = window
+        self.limit = limit
+        self.stats = RoleUpdateStats()
+        self.pending: Dict[MemberKey, PendingRoles] = {}
+        self.applied: Dict[MemberKey, Tuple[float, Set[int]]] = {}
+        self.buckets: Dict[int, RateLimitBucket] = {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.scheduler: DeadlineScheduler[MemberKey] = DeadlineScheduler(self.apply_due, name="role-updates")
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def start(self) -> None:
+        """Start applying role changes."""
+        self.scheduler.start()
+
+    async def stop(self) -> None:
+        """Stop the runner and apply the pending role changes right away."""
+        await self.scheduler.stop()
+        await self.apply_due(list(self.pending))
+
+    def request(self, guild_id: int, user_id: int, role_id: int, add: bool, member: Optional[discord.Member] = None) -> None:
+        """
+        Queue a role change of a member.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the member.
+            role_id (int): The ID of the role.
+            add (bool): Whether to add or remove the role.
+            member (Optional[discord.Member]): The member as sent with the event, if it was, which
+                holds the roles they had at that moment.
+        """
+        key = (guild_id, user_id)
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = PendingRoles(guild_id, user_id)
+            self.scheduler.schedule(key, self.window)
+
+        if add:
+            entry.adds.add(role_id)
+            entry.removes.discard(role_id)
+        else:
+            entry.removes.add(role_id)
+            entry.adds.discard(role_id)
+        if member is not None:
+            entry.member = member
+        entry.events += 1
+        self.stats.events += 1
+
+    async def apply_due(self, keys: list[MemberKey]) -> None:
+        """
+        Apply the role changes of the members whose window has passed.
+
+        Args:
+            keys (list[MemberKey]): The guild and user IDs of the members.
+        """
+        entries = [self.pending.pop(key) for key in keys if key in self.pending]
+        await asyncio.gather(*(self.apply(entry) for entry in entries))
+
+        cutoff = time.monotonic() - self.window * 10
+        for key in [key for key, (applied_at, _) in self.applied.items() if applied_at < cutoff]:
+            del self.applied[key]
+
+    async def apply(self, entry: PendingRoles) -> None:
+        """
+        Apply the role changes of a member with one request, or none if nothing changes.
+
+        Args:
+            entry (PendingRoles): The role changes of the member.
+        """
+        guild = self.bot.get_guild(entry.guild_id)
+        changes = len(entry.adds) + len(entry.removes)
+        if guild is None or not changes:
+            self.stats.skipped += 1
+            return
+
+        key = (entry.guild_id, entry.user_id)
+        applied = self.applied.get(key)
+        if applied is not None and applied[0] < time.monotonic() - self.window * 10:
+            del self.applied[key]
+            applied = None
+
+        # The member cache is kept up to date by the gateway, including role changes made by others
+        # since the previous update, and the whole role list is replaced below. Without a cached
+        # member, the roles this class set moments ago are newer than the member sent with an event,
+        # which may predate the previous update.
+        member = guild.get_member(entry.user_id)
+        if member is None:
+            member = entry.member if applied is None else None
+        current = applied[1] if applied is not None else None
+        if member is not None:
+            current = {role.id for role in member.roles if not role.is_default()}
+
+        try:
+            if current is None and changes > 1:
+                await self.wait_for_bucket(guild.id)
+                self.stats.requests += 1
+                member = await guild.fetch_member(entry.user_id)
+                current = {role.id for role in member.roles if not role.is_default()}
+
+            if current is None:
+                # A single change needs no knowledge of the other roles of the member
+                await self.wait_for_bucket(guild.id)
+                self.stats.requests += 1
+                async with self.semaphore:
+                    if entry.adds:
+                        await self.bot.http.add_role(guild.id, entry.user_id, next(iter(entry.adds)), reason="Reaction role")
+                    else:
+                        await self.bot.http.remove_role(guild.id, entry.user_id, next(iter(entry.removes)), reason="Reaction role")
+                return
+
+            roles = (current | entry.adds) - entry.removes
+            if roles == current:
+                self.stats.skipped += 1
+                return
+            await self.wait_for_bucket(guild.id)
+            self.stats.requests += 1
+            async with self.semaphore:
+                await self.bot.http.edit_member(guild.id, entry.user_id, roles=[str(role_id) for role_id in roles], reason="Reaction roles")
+            self.applied[key] = (time.monotonic(), roles)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                bucket = self.bucket(guild.id)
+                retry_after = float(e.response.headers.get("Retry-After", bucket.window))
+                bucket.block(retry_after)
+                logger.warning(f"Rate limited on role updates in {guild}, retrying in {retry_after:.1f}s")
+                self.requeue(entry)
+                return
+            self.stats.failed += 1
+            logger.error(f"Failed to update the roles of {entry.user_id} in {guild}: {e}")
+
+    def requeue(self, entry: PendingRoles) -> None:
+        """Put the changes of a member back, merged under any changes that came in since."""
+        key = (entry.guild_id, entry.user_id)
+        newer = self.pending.get(key)
+        if newer is not None:
+            entry.adds = (entry.adds - newer.removes) | newer.adds
+            entry.removes = (entry.removes - newer.adds) | newer.removes
+            entry.member = newer.member or entry.member
+            entry.events += newer.events
+        self.pending[key] = entry
+        self.scheduler.schedule(key, self.window)
+
+    def bucket(self, guild_id: int) -> RateLimitBucket:
+        """Get the rate limit bucket of a guild."""
+        bucket = self.buckets.get(guild_id)
+        if bucket is None:
+            bucket = self.buckets[guild_id] = RateLimitBucket(*self.limit)
+        return bucket
+
+    async def wait_for_bucket(self, guild_id: int) -> None:
+        """
+        Wait until the bucket of a guild allows a request and take a token.
+
+        discord.py retries 429 responses itself, so the waits here are what show how often role
+        updates are held back by the rate limits.
+        """
+        bucket = self.bucket(guild_id)
+        while (delay := bucket.delay()) > 0:
+            self.stats.throttled += 1
+            self.stats.throttled_seconds += delay
+            await asyncio.sleep(delay)
+        bucket.consume()
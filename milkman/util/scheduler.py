@@ -0,0 +1,145 @@
+"""
+Keyed deadline scheduling backed by a min-heap.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+
+
+class DeadlineScheduler(Generic[K]):
+    """
+    Schedules keys to expire at a point in time and hands expired keys to a callback in batches.
+
+    Each key has at most one pending deadline. Rescheduling or cancelling a key leaves a stale
+    heap entry behind which is skipped when popped, so both operations are O(log n) at worst.
+    The runner sleeps until the earliest deadline rather than polling.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[K]], Awaitable[None]],
+        *,
+        batch_window: float = 0.0,
+        name: str = "scheduler",
+    ):
+        """
+        Args:
+            callback (Callable): Coroutine function called with the list of keys that have expired.
+            batch_window (float): Extra seconds to wait after the first deadline so that nearby
+                deadlines are handled in the same batch.
+            name (str): Name used for the runner task and log messages.
+        """
+        self.callback = callback
+        self.batch_window = batch_window
+        self.name = name
+
+        self._heap: List[Tuple[float, int, K]] = []
+        self._deadlines: Dict[K, Tuple[float, int]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._deadlines
+
+    def deadline(self, key: K) -> Optional[float]:
+        """Get the UNIX timestamp at which a key is due, or None if it is not scheduled."""
+        entry = self._deadlines.get(key)
+        return entry[0] if entry else None
+
+    def schedule(self, key: K, delay: float = 0.0, *, when: Optional[float] = None) -> None:
+        """
+        Schedule a key, replacing any deadline it already had.
+
+        Args:
+            key (K): The key to schedule.
+            delay (float): Seconds from now until the key is due.
+            when (Optional[float]): Absolute UNIX timestamp at which the key is due, overrides delay.
+        """
+        deadline = when if when is not None else time.time() + delay
+        seq = next(self._counter)
+        self._deadlines[key] = (deadline, seq)
+        heapq.heappush(self._heap, (deadline, seq, key))
+
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def cancel(self, key: K) -> bool:
+        """
+        Cancel a pending key.
+
+        Returns:
+            bool: True if the key was pending, False otherwise.
+        """
+        return self._deadlines.pop(key, None) is not None
+
+    def pop_expired(self, now: Optional[float] = None) -> List[K]:
+        """Remove and return every key whose deadline has passed, earliest first."""
+        now = time.time() if now is None else now
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, seq, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) != (deadline, seq):
+                continue
+            del self._deadlines[key]
+            expired.append(key)
+        return expired
+
+    def _next_deadline(self) -> Optional[float]:
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            if self._deadlines.get(key) == (deadline, seq):
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def start(self) -> None:
+        """Start the runner task if it is not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Stop the runner task. Pending keys are kept."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+
+            expired = self.pop_expired()
+            if not expired:
+                continue
+
+            try:
+                await self.callback(expired)
+            except Exception as e:
+                logger.error(f"{self.name}: failed to handle {len(expired)} expired keys: {e}", exc_info=True)
@@ -0,0 +1,110 @@
+"""
+Constant memory sliding-window counters for event-driven detection on hot paths.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Hashable, Tuple
+
+
+class SlidingWindowCounter:
+    """
+    Counts events over a sliding window using a fixed ring of time buckets.
+
+    Memory is constant regardless of the event rate, and the count is accurate to within one
+    bucket width at the start of the window.
+    """
+
+    __slots__ = ("window", "width", "counts", "epochs")
+
+    def __init__(self, window: float, buckets: int = 10):
+        """
+        Args:
+            window (float): The length of the window in seconds.
+            buckets (int): The number of buckets the window is split into.
+        """
+        self.window = window
+        self.width = window / buckets
+        self.counts = [0] * buckets
+        self.epochs = [-1] * buckets
+
+    def add(self, now: float, amount: int = 1) -> int:
+        """
+        Count events at a point in time.
+
+        Args:
+            now (float): The time of the events in seconds.
+            amount (int): The number of events.
+
+        Returns:
+            int: The number of events in the window ending now.
+        """
+        epoch = int(now // self.width)
+        index = epoch % len(self.counts)
+        if self.epochs[index] != epoch:
+            self.epochs[index] = epoch
+            self.counts[index] = 0
+        self.counts[index] += amount
+        return self.count(now)
+
+    def count(self, now: float) -> int:
+        """Get the number of events in the window ending at a point in time."""
+        oldest = int(now // self.width) - len(self.counts)
+        return sum(count for count, epoch in zip(self.counts, self.epochs) if epoch > oldest)
+
+
+class DuplicateTracker:
+    """
+    Tracks how many distinct authors posted the same content within a sliding window.
+
+    Entries are kept in a ring buffer of fixed capacity and the per-content author counts are
+    updated as entries enter and leave it, so each message costs amortised O(1).
+    """
+
+    def __init__(self, window: float, capacity: int = 256):
+        """
+        Args:
+            window (float): The length of the window in seconds.
+            capacity (int): The maximum number of recent messages remembered.
+        """
+        self.window = window
+        self.capacity = capacity
+        self._entries: Deque[Tuple[float, Hashable, int]] = deque()
+        self._authors: Dict[Hashable, Dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        _, key, author_id = self._entries.popleft()
+        authors = self._authors[key]
+        authors[author_id] -= 1
+        if authors[author_id] == 0:
+            del authors[author_id]
+            if not authors:
+                del self._authors[key]
+
+    def add(self, now: float, key: Hashable, author_id: int) -> int:
+        """
+        Record a message.
+
+        Args:
+            now (float): The time of the message in seconds.
+            key (Hashable): Identifies the content of the message, e.g. a hash of it.
+            author_id (int): The ID of the author of the message.
+
+        Returns:
+            int: The number of distinct authors who posted the same content within the window.
+        """
+        cutoff = now - self.window
+        while self._entries and (self._entries[0][0] < cutoff or len(self._entries) >= self.capacity):
+            self._evict()
+
+        self._entries.append((now, key, author_id))
+        authors = self._authors.setdefault(key, {})
+        authors[author_id] = authors.get(author_id, 0) + 1
+        return len(authors)
+
+    def forget(self, key: Hashable) -> None:
+        """Stop counting a content, e.g. once an action has been taken on it."""
+        self._entries = deque(entry for entry in self._entries if entry[1] != key)
+        self._authors.pop(key, None)